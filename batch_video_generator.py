@@ -4,80 +4,180 @@ Batch Video Generator
 Processes all SKUs in output_clean to create product videos
 """
 
+import argparse
 import sys
+from functools import partial
 from pathlib import Path
 from create_product_videos import (
     create_product_video,
+    extra_renditions,
+    product_fingerprint,
+    rendition_path,
+    unfinished_uploads,
     upload_to_drive,
-    OUTPUT_DIR
+    OUTPUT_DIR,
+    RENDER_LEDGER,
+    VIDEO_RENDITIONS
 )
-from pathlib import Path
+from fingerprint import is_current
+from metrics import RenderMetrics, append_ledger, recording, stage, with_upload
+from render_pool import run_sku_jobs, sku_lock
+from uploader import UploadQueue
 CROPS_DIR = Path("/Users/johnshay/3DSELLERS/processed_crops")
 
-def batch_generate_videos():
-    """Generate videos for all SKUs"""
-    print(f"\n{'='*70}")
-    print("BATCH VIDEO GENERATOR")
-    print(f"{'='*70}\n")
-
-    # Get all SKU folders
-    sku_folders = [d for d in CROPS_DIR.iterdir() if d.is_dir()]
-    sku_folders = sorted(sku_folders)
-
-    print(f"Found {len(sku_folders)} SKUs to process\n")
-
-    successful = 0
-    failed = 0
-    skipped = 0
-
-    for idx, sku_folder in enumerate(sku_folders, 1):
-        sku_name = sku_folder.name
-
-        print(f"\n[{idx}/{len(sku_folders)}] Processing: {sku_name}")
-        print(f"{'='*70}")
+def generate_sku_video(sku_name, force=False, upload=True):
+    """
+    Render and upload one SKU; returns a result dict for the batch summary
+    SKUs whose video was rendered from the same crops, settings and seed are
+    skipped unless force. upload=False leaves the upload to the caller.
+    """
+    print(f"\nProcessing: {sku_name}")
+    print(f"{'='*70}")
 
-        # Check if video already exists
-        video_path = OUTPUT_DIR / f"{sku_name}.mp4"
-        if video_path.exists():
-            print(f"⏭️  Video already exists, skipping...")
-            skipped += 1
-            continue
+    metrics = RenderMetrics(sku_name)
+
+    # Check if an up-to-date video already exists
+    video_path = rendition_path(OUTPUT_DIR, sku_name, VIDEO_RENDITIONS[0])
+    with recording(metrics), stage('discovery'):
+        fingerprint = product_fingerprint(sku_name, CROPS_DIR)
+    if not force and fingerprint and is_current(video_path, fingerprint['fingerprint']):
+        print("⏭️  Video is up to date, skipping...")
+        # ...but an upload a previous run didn't finish is picked up again
+        result = {'sku': sku_name, 'status': 'skipped', 'video': str(video_path),
+                  'uploads': unfinished_uploads(video_path)}
+        if upload:
+            for path in result.pop('uploads'):
+                upload_to_drive(path, sku_name if path == result['video'] else Path(path).stem,
+                                video=video_path)
+        return result
+
+    with sku_lock(OUTPUT_DIR, sku_name) as acquired:
+        if not acquired:
+            print("⏭️  Already being rendered by another worker, skipping...")
+            return {'sku': sku_name, 'status': 'skipped'}
 
         try:
             # Generate video
             print("🎬 Generating video...")
-            video_file = create_product_video(sku_name)
+            video_file = create_product_video(sku_name, CROPS_DIR, fingerprint=fingerprint, metrics=metrics)
 
             if not video_file or not Path(video_file).exists():
                 print(f"❌ Video generation failed")
-                failed += 1
-                continue
+                return {'sku': sku_name, 'status': 'failed', 'error': 'video generation failed',
+                        'metrics': metrics.report()}
 
             video_size = Path(video_file).stat().st_size / (1024 * 1024)
             print(f"✅ Video created: {video_size:.1f} MB")
 
+            result = {
+                'sku': sku_name,
+                'status': 'success',
+                'video': str(video_file),
+                'renditions': extra_renditions(sku_name),
+                'size_mb': round(video_size, 1)
+            }
+            if not upload:
+                result['metrics'] = metrics.report()
+                return result
+
             # Upload to Google Drive
             print("📤 Uploading to Google Drive...")
-            file_id = upload_to_drive(video_file, sku_name)
+            with recording(metrics), stage('upload'):
+                file_id = upload_to_drive(video_file, sku_name)
+                for path in result['renditions'].values():
+                    upload_to_drive(path, Path(path).stem, video=video_file)
 
             if file_id:
                 print(f"✅ Uploaded: File ID {file_id}")
-                successful += 1
             else:
                 print("⚠️  Upload failed, but video saved locally")
-                successful += 1  # Still count as success since video was created
+
+            # Still count as success if the upload failed since video was created
+            result['file_id'] = file_id
+            result['metrics'] = metrics.report()
+            return result
 
         except Exception as e:
             print(f"❌ Error: {e}")
-            failed += 1
             import traceback
             traceback.print_exc()
+            return {'sku': sku_name, 'status': 'failed', 'error': str(e), 'metrics': metrics.report()}
+
+
+def batch_generate_videos(jobs=1, force=False, upload_jobs=2, ledger=RENDER_LEDGER):
+    """
+    Generate videos for all SKUs
+    jobs: number of worker processes rendering SKUs in parallel
+    force: re-render SKUs even if their inputs haven't changed
+    upload_jobs: concurrent uploads, running in the background while rendering continues
+    ledger: JSON-lines file to append each job's result and stage timings to
+    """
+    print(f"\n{'='*70}")
+    print("BATCH VIDEO GENERATOR")
+    print(f"{'='*70}\n")
+
+    # Get all SKU folders
+    sku_folders = [d for d in CROPS_DIR.iterdir() if d.is_dir()]
+    sku_folders = sorted(sku_folders)
+    sku_names = [d.name for d in sku_folders]
+
+    print(f"Found {len(sku_folders)} SKUs to process ({jobs} worker{'s' if jobs > 1 else ''})\n")
+
+    successful = 0
+    failed = 0
+    skipped = 0
+    uploaded = 0
+    worker = partial(generate_sku_video, force=force, upload=False)
+    rendered = {}
+
+    # Each finished video uploads in the background while the next SKU renders
+    with UploadQueue(upload_to_drive, upload_jobs) as uploads:
+        for idx, result in enumerate(run_sku_jobs(sku_names, worker, jobs), 1):
+            status = result['status']
+            if status == 'success':
+                successful += 1
+                rendered[result['sku']] = result
+                uploads.submit(result['sku'], result['video'])
+                for path in result['renditions'].values():
+                    uploads.submit(Path(path).stem, path, video=result['video'])
+            elif status == 'skipped':
+                skipped += 1
+                for path in result.get('uploads', []):
+                    print(f"📤 {result['sku']}: resuming unfinished upload of {Path(path).name}")
+                    name = result['sku'] if path == result['video'] else Path(path).stem
+                    uploads.submit(name, path, video=result['video'])
+            else:
+                failed += 1
+                print(f"❌ {result['sku']}: {result.get('error')}")
+                if ledger:
+                    append_ledger(ledger, result)
+
+            print(f"[{idx}/{len(sku_folders)}] {result['sku']}: {status}")
+
+        print("\n📤 Waiting for uploads to finish...")
+        for upload in uploads.results():
+            if upload['sku'] not in rendered:
+                # Another rendition of a SKU's video
+                if upload['status'] != 'uploaded':
+                    print(f"⚠️  Upload failed for {upload['sku']}, video saved locally")
+                continue
+
+            if upload['status'] == 'uploaded':
+                uploaded += 1
+                print(f"✅ Uploaded {upload['sku']}: File ID {upload['file_id']} ({upload['seconds']}s)")
+            else:
+                # Still counts as success since the video was created
+                print(f"⚠️  Upload failed for {upload['sku']}, video saved locally")
+
+            if ledger:
+                append_ledger(ledger, with_upload(rendered[upload['sku']], upload))
 
     # Final summary
     print(f"\n\n{'='*70}")
     print("BATCH PROCESSING COMPLETE")
     print(f"{'='*70}")
     print(f"✅ Successful: {successful}/{len(sku_folders)}")
+    print(f"📤 Uploaded: {uploaded}/{successful}")
     print(f"⏭️  Skipped: {skipped}")
     print(f"❌ Failed: {failed}")
     print(f"📁 Output: {OUTPUT_DIR}")
@@ -87,5 +187,18 @@ def batch_generate_videos():
 
 
 if __name__ == "__main__":
-    successful, failed, skipped = batch_generate_videos()
+    parser = argparse.ArgumentParser(description="Generate product videos for all SKUs")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="number of SKUs to render in parallel (default: 1)")
+    parser.add_argument('--force', action='store_true',
+                        help="re-render SKUs whose inputs haven't changed")
+    parser.add_argument('--upload-jobs', type=int, default=2,
+                        help="concurrent background uploads (default: 2)")
+    parser.add_argument('--ledger', default=RENDER_LEDGER,
+                        help="append per-job stage timings to this JSON-lines file (env RENDER_LEDGER)")
+    args = parser.parse_args()
+
+    successful, failed, skipped = batch_generate_videos(
+        jobs=args.jobs, force=args.force, upload_jobs=args.upload_jobs, ledger=args.ledger
+    )
     sys.exit(0 if failed == 0 else 1)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Rendering Benchmarks
+Times the rendering hot paths (effects, Ken Burns, overlays, resizing and
+the encoder) on synthetic artwork of several sizes, and the cold import of
+the entry-point modules, and writes JSON results that can be diffed between
+releases
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import create_product_videos as cpv
+from encoder import FFmpegWriter
+from video_generator import ArtworkVideoGenerator
+
+# Source artwork sizes, from a small detail crop up to a full-resolution scan
+DEFAULT_SIZES = [(800, 400), (1920, 1080), (3200, 2700), (6000, 5000)]
+
+# Modules every render (and render worker process) starts by importing
+IMPORT_MODULES = ['create_product_videos', 'batch_video_generator', 'video_generator']
+
+# Cold-import budget per module, in seconds: the render core needs numpy,
+# OpenCV and Pillow, and nothing else heavy
+IMPORT_BUDGET_SECONDS = 0.5
+
+# Integrations that must only load on first use, never on import
+DEFERRED_IMPORTS = ['google', 'googleapiclient', 'google_auth_oauthlib', 'httplib2', 'pandas', 'requests']
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'modules': sorted({{m.split('.')[0] for m in sys.modules}})}}))
+"""
+
+
+def synthetic_artwork(width, height, seed=0):
+    """Deterministic artwork-like test image: gradients, shapes and grain"""
+    rng = np.random.default_rng(seed)
+
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[..., 0] = x
+    img[..., 1] = y
+    img[..., 2] = (x + y) / 2
+
+    for _ in range(12):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        radius = int(rng.integers(min(width, height) // 20, min(width, height) // 4))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.circle(img, center, radius, color, -1, cv2.LINE_AA)
+
+    noise = rng.integers(0, 24, (height, width, 1), dtype=np.uint8)
+    return cv2.add(img, np.repeat(noise, 3, axis=2))
+
+
+def time_frames(frames):
+    """Consume a frame iterator, returning per-frame latencies in seconds"""
+    latencies = []
+    frames = iter(frames)
+
+    while True:
+        start = time.perf_counter()
+        try:
+            next(frames)
+        except StopIteration:
+            break
+        latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def peak_memory(make_frames):
+    """Peak traced memory (NumPy and Python allocations) while consuming the frames"""
+    tracemalloc.start()
+    try:
+        for _ in make_frames():
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def summarize(case, size, latencies, peak_bytes=None):
+    """Result dict for one case"""
+    ms = np.array(latencies) * 1000
+    total = float(np.sum(latencies))
+
+    result = {
+        'case': case,
+        'size': list(size),
+        'frames': len(latencies),
+        'fps': round(len(latencies) / total, 2) if total else None,
+        'latency_ms': {
+            'mean': round(float(ms.mean()), 3),
+            'p50': round(float(np.percentile(ms, 50)), 3),
+            'p90': round(float(np.percentile(ms, 90)), 3),
+            'p99': round(float(np.percentile(ms, 99)), 3),
+            'max': round(float(ms.max()), 3),
+        },
+    }
+    if peak_bytes is not None:
+        result['peak_mb'] = round(peak_bytes / (1024 * 1024), 1)
+    return result
+
+
+def repeat(func, count):
+    """Frame-style iterator calling func() count times"""
+    for _ in range(count):
+        yield func()
+
+
+def benchmark_cases(artwork, seconds, workdir, raw=False):
+    """
+    (name, make_frames) for every hot path, for one source image
+    make_frames() returns a fresh frame iterator each time it is called
+    Inputs are prepared on a case's first make_frames() call and shared
+    after that, so a --case run only builds what it uses.
+    raw: feed the source artwork into the effects instead of the letterboxed
+    canvas the pipelines normally render from
+    """
+    generator = ArtworkVideoGenerator(output_dir=workdir)
+    frame_count = cpv.FPS * seconds
+    cases = []
+
+    @lru_cache(maxsize=None)
+    def canvas():
+        return cpv.resize_to_video_dimensions(artwork)
+
+    def source():
+        return artwork if raw else canvas()
+
+    cases.append(('resize_to_video_dimensions',
+                  lambda: repeat(lambda: cpv.resize_to_video_dimensions(artwork), frame_count)))
+
+    for effect, _ in generator.main_segments:
+        cases.append((f"apply_effect:{effect}",
+                      lambda effect=effect: generator.apply_effect(source(), effect, seconds)))
+
+    cases.append(('apply_ken_burns_effect',
+                  lambda: cpv.apply_ken_burns_effect(source(), pan_direction='topleft', duration=seconds,
+                                                     size=(cpv.WIDTH, cpv.HEIGHT))))
+
+    def overlay():
+        frame = canvas().copy()
+        return repeat(lambda: cpv.add_text_overlay(frame, "Own a piece of history"), frame_count)
+
+    cases.append(('add_text_overlay', overlay))
+
+    # Encode pre-rendered moving frames, so only the encoder is timed
+    @lru_cache(maxsize=None)
+    def encoder_frames():
+        return list(cpv.apply_ken_burns_effect(canvas(), pan_direction='topleft', duration=seconds))
+
+    def write(frames):
+        with FFmpegWriter(Path(workdir) / "bench.mp4", cpv.FPS, (cpv.WIDTH, cpv.HEIGHT)) as out:
+            for frame in frames:
+                out.write(frame)
+                yield frame
+
+    cases.append(('encoder', lambda: write(encoder_frames())))
+
+    return cases
+
+
+def cold_import(module, runs=3):
+    """
+    Result dict for importing module in fresh interpreters: the fastest of
+    runs, and any deferred integrations the import pulled in
+    """
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', _IMPORT_PROBE.format(module=module)],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        timings.append(probe['seconds'])
+
+    seconds = min(timings)
+    deferred = sorted(set(DEFERRED_IMPORTS) & set(probe['modules']))
+    return {
+        'module': module,
+        'seconds': round(seconds, 4),
+        'budget_seconds': IMPORT_BUDGET_SECONDS,
+        'deferred_loaded': deferred,
+        'ok': seconds <= IMPORT_BUDGET_SECONDS and not deferred,
+    }
+
+
+def run_import_benchmarks(modules=IMPORT_MODULES, runs=3):
+    """Cold-import results for every entry-point module"""
+    results = []
+    for module in modules:
+        result = cold_import(module, runs)
+        results.append(result)
+        status = '✅' if result['ok'] else '❌'
+        loaded = f"  loaded {', '.join(result['deferred_loaded'])}" if result['deferred_loaded'] else ''
+        print(f"{status} import {module:<28} {result['seconds'] * 1000:8.1f} ms "
+              f"(budget {IMPORT_BUDGET_SECONDS * 1000:.0f} ms){loaded}")
+    return results
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, seconds=1, match=None, memory=True, raw=False, imports=False):
+    """
+    Run every case on every size; returns the results document
+    imports: also time cold imports of the entry-point modules ('imports')
+    """
+    results = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            artwork = synthetic_artwork(*size)
+
+            for case, make_frames in benchmark_cases(artwork, seconds, workdir, raw):
+                if match and match not in case:
+                    continue
+
+                try:
+                    latencies = time_frames(make_frames())
+                    peak = peak_memory(make_frames) if memory else None
+                except RuntimeError as e:
+                    # e.g. ffmpeg not installed
+                    print(f"⚠️  {case} @ {size[0]}x{size[1]}: skipped ({e})")
+                    continue
+
+                result = summarize(case, size, latencies, peak)
+                results.append(result)
+                print(format_result(result))
+
+    meta = environment(seconds)
+    meta['effect_input'] = 'source' if raw else 'canvas'
+    report = {'meta': meta, 'results': results}
+    if imports:
+        report['imports'] = run_import_benchmarks()
+    return report
+
+
+def environment(seconds):
+    """What the numbers were measured on"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, cwd=Path(__file__).parent
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'platform': platform.platform(),
+        'cpu_threads': cv2.getNumThreads(),
+        'seconds_per_case': seconds,
+    }
+
+
+def format_result(result):
+    """One table row"""
+    size = f"{result['size'][0]}x{result['size'][1]}"
+    latency = result['latency_ms']
+    peak = f"{result['peak_mb']:8.1f}" if 'peak_mb' in result else f"{'-':>8}"
+    return (f"{result['case']:<36} {size:>10} {result['fps'] or 0:9.1f} "
+            f"{latency['p50']:8.2f} {latency['p90']:8.2f} {latency['p99']:8.2f} {peak}")
+
+
+def compare(current, baseline):
+    """Print fps change against a previous results file"""
+    previous = {(r['case'], tuple(r['size'])): r for r in baseline['results']}
+
+    print(f"\n📊 Compared with {baseline['meta'].get('commit') or 'baseline'}:")
+    for result in current['results']:
+        before = previous.get((result['case'], tuple(result['size'])))
+        if not before or not before['fps'] or not result['fps']:
+            continue
+        change = result['fps'] / before['fps'] - 1
+        size = f"{result['size'][0]}x{result['size'][1]}"
+        print(f"  {result['case']:<36} {size:>10} {before['fps']:9.1f} -> {result['fps']:9.1f} ({change:+.0%})")
+
+    previous = {r['module']: r for r in baseline.get('imports', [])}
+    for result in current.get('imports', []):
+        before = previous.get(result['module'])
+        if before:
+            print(f"  import {result['module']:<29} {before['seconds'] * 1000:7.1f} ms -> "
+                  f"{result['seconds'] * 1000:7.1f} ms")
+
+
+def parse_size(text):
+    """'1920x1080' -> (1920, 1080)"""
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the rendering hot paths")
+    parser.add_argument('--sizes', type=lambda s: [parse_size(p) for p in s.split(',')],
+                        default=DEFAULT_SIZES, help="source sizes, e.g. 800x400,6000x5000")
+    parser.add_argument('--seconds', type=int, default=1, help="seconds of video per case (default: 1)")
+    parser.add_argument('--case', help="only run cases whose name contains this")
+    parser.add_argument('--no-memory', action='store_true', help="skip the peak memory pass")
+    parser.add_argument('--raw', action='store_true',
+                        help="run effects on the full-size source instead of the letterboxed canvas")
+    parser.add_argument('--no-imports', action='store_true', help="skip the cold-import timings")
+    parser.add_argument('--output', '-o', default='benchmark_results.json', help="JSON results file")
+    parser.add_argument('--compare', help="previous results file to compare against")
+    args = parser.parse_args()
+
+    print(f"{'case':<36} {'size':>10} {'fps':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'peak MB':>8}")
+    report = run_benchmarks(args.sizes, args.seconds, args.case,
+                            memory=not args.no_memory, raw=args.raw, imports=not args.no_imports)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+    # Fail when nothing ran or a cold import went over budget
+    imports_ok = all(result['ok'] for result in report.get('imports', []))
+    sys.exit(0 if report['results'] and imports_ok else 1)
@@ -5,20 +5,32 @@ Creates high-end art gallery videos from product crops
 Uploads to Google Drive PRODUCT VIDEOS folder
 """
 
+import argparse
 import os
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-import subprocess
 from pathlib import Path
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-import pickle
-import pandas as pd
 from colorsys import rgb_to_hsv
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from decode import decode_factor, imread_reduced
+from encoder import FFmpegWriter, held_frames, render_segments, write_streams
+from fingerprint import (
+    is_current, pending_uploads, read_manifest, record_upload, render_fingerprint, sku_seed, source_digests,
+    write_manifest
+)
+from google_drive import drive_client
+from image_cache import default_cache
+from metrics import RenderMetrics, append_ledger, count, recording, stage, timed_frames, with_upload
+from motion import PAN_DIRECTIONS, plan_ken_burns, render_window
+from prefetch import prefetch
+from preview import PREVIEW_FPS, PREVIEW_PRESET, PREVIEW_SCALE, PREVIEW_SUFFIX, preview_size
+from overlays import text_overlay_sprite, text_region
+from render_pool import run_sku_jobs, sku_lock
+from storyboard import StoryboardTap
+from uploader import UploadQueue, upload_state_path
 
 # Google Drive folder for PRODUCT VIDEOS
 PRODUCT_VIDEOS_FOLDER_ID = '1xHTK9cYGEzqxZAogl3m-dMj9zDCmKTQr'
@@ -28,12 +40,33 @@ OUTPUT_DIR = Path("/Users/johnshay/3DSELLERS/product_videos")
 CROPS_DIR = Path("/Users/johnshay/3DSELLERS/processed_crops")
 AUTHENTICITY_IMAGE = Path("/Users/johnshay/3DSELLERS/authenticity_slide.jpg")
 
+# JSON-lines ledger of per-job stage timings (optional)
+RENDER_LEDGER = os.environ.get('RENDER_LEDGER') or None
+
+# Resumable upload chunk size (Drive needs a multiple of 256 KB)
+UPLOAD_CHUNK_MB = int(os.environ.get('UPLOAD_CHUNK_MB', 8))
+
+# Sources decoded ahead of the clip being rendered (0 decodes each one when it's reached)
+PREFETCH_CROPS = int(os.environ.get('PREFETCH_CROPS', 2))
+
 # Video settings
 VIDEO_DURATION = 45  # seconds (increased from 35)
 FPS = 30
 WIDTH = 1920
 HEIGHT = 1080
 
+# Output renditions, (width, height). 1080p is written as {sku}.mp4, the
+# others next to it as {sku}_{name}.mp4
+RENDITIONS = {
+    '1080p': (WIDTH, HEIGHT),  # 16:9 for eBay
+    '4x5': (1080, 1350),       # Instagram feed
+    '9x16': (1080, 1920),      # Reels / TikTok
+    '720p': (1280, 720),       # fallback
+}
+
+# Renditions rendered for every video, primary (manifest, skip checks) first
+VIDEO_RENDITIONS = os.environ.get('VIDEO_RENDITIONS', '1080p').split(',')
+
 # Inspiring quotes for art buyers
 ART_QUOTES = [
     "Own a piece of history",
@@ -57,36 +90,12 @@ ART_QUOTES = [
 ]
 
 
-def get_drive_service():
-    """Authenticate and return Google Drive service"""
-    SCOPES = ['https://www.googleapis.com/auth/drive']
-    creds = None
-
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
-
-    return build('drive', 'v3', credentials=creds)
-
-
 def get_average_brightness(image):
     """Calculate average brightness of image (0-1)"""
-    # Convert to grayscale
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-    # Get average brightness
-    avg_brightness = np.mean(gray) / 255.0
+    # Average of the grayscale (BGR2GRAY) image, from the channel means,
+    # without converting every pixel
+    b, g, r, _ = cv2.mean(image)
+    avg_brightness = (0.114 * b + 0.587 * g + 0.299 * r) / 255.0
 
     return avg_brightness
 
@@ -113,128 +122,113 @@ def get_text_color(image, region=None):
         return (0, 0, 0)  # Black
 
 
-def apply_ken_burns_effect(image, start_zoom=1.0, end_zoom=1.3, pan_direction='random'):
+def render_profile(preview=False, rendition='1080p'):
+    """
+    Output size, frame rate, encoder preset, overlay scale and file suffix of a render
+    preview: a quick low-resolution proxy with the same timing and layout
+    rendition: output format, a key of RENDITIONS
+    """
+    if rendition not in RENDITIONS:
+        raise ValueError(f"Unknown rendition: {rendition} (choose from {', '.join(RENDITIONS)})")
+
+    width, height = RENDITIONS[rendition]
+    suffix = '' if rendition == '1080p' else f"_{rendition}"
+    # Overlays keep their 1080p layout, shrunk to fit narrower frames
+    scale = min(width / WIDTH, height / HEIGHT)
+
+    if not preview:
+        return {'size': (width, height), 'fps': FPS, 'preset': 'medium', 'scale': scale, 'suffix': suffix}
+
+    return {'size': preview_size((width, height)), 'fps': PREVIEW_FPS, 'preset': PREVIEW_PRESET,
+            'scale': scale * PREVIEW_SCALE, 'suffix': suffix + PREVIEW_SUFFIX}
+
+
+def rendition_path(output_dir, sku, rendition='1080p', preview=False):
+    """Where a rendition of a SKU's video is written"""
+    return output_dir / f"{sku}{render_profile(preview, rendition)['suffix']}.mp4"
+
+
+def apply_ken_burns_effect(image, start_zoom=1.0, end_zoom=1.3, pan_direction='random',
+                           duration=4, easing='linear', fps=FPS, size=None):
     """
     Apply Ken Burns effect to image
-    Returns list of frames with smooth zoom and pan
+    Yields frames with smooth zoom and pan, one at a time. Each frame is
+    sampled from a sub-pixel crop window with a single affine warp.
+    size: output (width, height), default the image's own; crop windows
+    keep the image's aspect ratio
     """
-    frames = []
-    duration = 4  # 4 seconds per image
-    total_frames = FPS * duration
+    total_frames = fps * duration  # 4 seconds per image by default
 
     h, w = image.shape[:2]
+    size = size or (w, h)
 
     # Determine pan direction
     if pan_direction == 'random':
         import random
-        directions = ['topleft', 'topright', 'bottomleft', 'bottomright', 'center']
-        pan_direction = random.choice(directions)
-
-    for i in range(total_frames):
-        progress = i / total_frames
-
-        # Calculate current zoom
-        current_zoom = start_zoom + (end_zoom - start_zoom) * progress
-
-        # Calculate new dimensions
-        new_w = int(w * current_zoom)
-        new_h = int(h * current_zoom)
-
-        # Resize image
-        resized = cv2.resize(image, (new_w, new_h))
-
-        # Calculate pan offset based on direction
-        if pan_direction == 'topleft':
-            pan_x = int((new_w - w) * progress)
-            pan_y = int((new_h - h) * progress * 0.5)
-        elif pan_direction == 'topright':
-            pan_x = int((new_w - w) * (1 - progress))
-            pan_y = int((new_h - h) * progress * 0.5)
-        elif pan_direction == 'bottomleft':
-            pan_x = int((new_w - w) * progress)
-            pan_y = int((new_h - h) * (1 - progress * 0.5))
-        elif pan_direction == 'bottomright':
-            pan_x = int((new_w - w) * (1 - progress))
-            pan_y = int((new_h - h) * (1 - progress * 0.5))
-        else:  # center
-            pan_x = int((new_w - w) * 0.5)
-            pan_y = int((new_h - h) * 0.5)
-
-        # Crop to original dimensions
-        try:
-            frame = resized[pan_y:pan_y+h, pan_x:pan_x+w]
-
-            # Ensure correct size
-            if frame.shape[:2] != (h, w):
-                frame = cv2.resize(frame, (w, h))
-
-            frames.append(frame)
-        except:
-            # Fallback to center crop if something goes wrong
-            frames.append(cv2.resize(image, (w, h)))
-
-    return frames
-
-
-def add_text_overlay(frame, text, position='center', font_scale=1.5):
+        pan_direction = random.choice(PAN_DIRECTIONS)
+
+    windows = plan_ken_burns(
+        w, h, total_frames,
+        start_zoom=start_zoom,
+        end_zoom=end_zoom,
+        direction=pan_direction,
+        easing=easing
+    )
+
+    for window in windows:
+        yield render_window(image, window, size)
+
+
+def render_crop_clip(image, quote=None, pan_direction='random', duration=4,
+                     ken_burns_settings=None, fps=FPS, scale=1.0):
+    """
+    Stream one crop's clip: Ken Burns motion with the optional quote
+    overlaid on the middle third, applied as frames go by
+    ken_burns_settings: start_zoom/end_zoom/easing, see motion.settings_from_config
+    fps, scale: frame rate and overlay scale of the render (see render_profile)
+    """
+    total_frames = fps * duration
+    start_frame = total_frames // 3
+    end_frame = 2 * total_frames // 3
+
+    frames = apply_ken_burns_effect(
+        image,
+        pan_direction=pan_direction,
+        duration=duration,
+        fps=fps,
+        **(ken_burns_settings or {})
+    )
+    for i, frame in enumerate(timed_frames(frames, 'effect')):
+        if quote and start_frame <= i < end_frame:
+            with stage('overlay'):
+                frame = add_text_overlay(frame, quote, position='bottom', scale=scale)
+        yield frame
+
+
+def add_text_overlay(frame, text, position='center', font_scale=1.5, scale=1.0):
     """
     Add text overlay to frame with automatic color detection
     position: 'top', 'center', 'bottom'
+    scale: render scale relative to 1080p
+    Blends a cached sprite into the frame in place and returns it
     """
     h, w = frame.shape[:2]
 
-    # Determine text region based on position
-    if position == 'top':
-        text_y = h // 6
-        region = (0, 0, w, h//3)
-    elif position == 'bottom':
-        text_y = 5 * h // 6
-        region = (0, 2*h//3, w, h)
-    else:  # center
-        text_y = h // 2
-        region = (0, h//3, w, 2*h//3)
-
-    # Get optimal text color
+    # Get optimal text color for the region behind the text
+    _, region = text_region(position, w, h)
     text_color = get_text_color(frame, region)
 
-    # Add semi-transparent background for better readability
-    overlay = frame.copy()
-
-    if position == 'top':
-        cv2.rectangle(overlay, (0, 0), (w, h//4), (0, 0, 0), -1)
-        alpha = 0.4
-    elif position == 'bottom':
-        cv2.rectangle(overlay, (0, 3*h//4), (w, h), (0, 0, 0), -1)
-        alpha = 0.4
-    else:
-        cv2.rectangle(overlay, (w//6, h//3), (5*w//6, 2*h//3), (0, 0, 0), -1)
-        alpha = 0.3
-
-    frame = cv2.addWeighted(frame, 1-alpha, overlay, alpha, 0)
-
-    # Add text
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    text_size = cv2.getTextSize(text, font, font_scale, 3)[0]
-    text_x = (w - text_size[0]) // 2
-
-    # Add shadow for depth
-    shadow_offset = 3
-    cv2.putText(frame, text, (text_x + shadow_offset, text_y + shadow_offset),
-                font, font_scale, (0, 0, 0), 3, cv2.LINE_AA)
+    sprite = text_overlay_sprite(text, position, font_scale, text_color, w, h, scale)
+    return sprite.apply(frame)
 
-    # Add main text
-    cv2.putText(frame, text, (text_x, text_y),
-                font, font_scale, text_color, 3, cv2.LINE_AA)
 
-    return frame
-
-
-def resize_to_video_dimensions(image):
-    """Resize image to 1920x1080 maintaining aspect ratio"""
+def resize_to_video_dimensions(image, size=None):
+    """Resize image to 1920x1080 (or size) maintaining aspect ratio"""
     h, w = image.shape[:2]
+    width, height = size or (WIDTH, HEIGHT)
 
     # Calculate scaling
-    scale = min(WIDTH / w, HEIGHT / h)
+    scale = min(width / w, height / h)
     new_w = int(w * scale)
     new_h = int(h * scale)
 
@@ -242,154 +236,351 @@ def resize_to_video_dimensions(image):
     resized = cv2.resize(image, (new_w, new_h))
 
     # Create black canvas
-    canvas = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
 
     # Center image on canvas
-    x_offset = (WIDTH - new_w) // 2
-    y_offset = (HEIGHT - new_h) // 2
+    x_offset = (width - new_w) // 2
+    y_offset = (height - new_h) // 2
 
     canvas[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = resized
 
     return canvas
 
 
-def create_product_video(sku, crops_dir=CROPS_DIR, output_dir=OUTPUT_DIR):
+def load_canvas(path, size=None):
+    """Video-sized (or size) canvas for a source image, from the shared image cache"""
+    return load_canvases(path, [size or (WIDTH, HEIGHT)])[0]
+
+
+def load_canvases(path, sizes):
     """
-    Create video for a specific SKU using its cropped images
+    Canvases of several sizes for one source (one per rendition), from the
+    shared image cache; the file is decoded at most once for all of them
+    Sources much larger than the canvases decode at a reduced size straight
+    away. That scale depends on every size requested together, so it is part
+    of the cache key: which call filled the cache first never changes the pixels.
     """
-    print(f"\n{'='*70}")
-    print(f"CREATING VIDEO FOR SKU: {sku}")
-    print(f"{'='*70}")
+    factor = decode_factor(path, sizes)
+    decoded = []
 
-    # Find all crops for this SKU (excluding stock images)
-    sku_folder = crops_dir / sku
+    def letterbox(path, size):
+        if not decoded:
+            with stage('decode'):
+                decoded.append(imread_reduced(path, factor))
+        if decoded[0] is None:
+            return None
 
-    if not sku_folder.exists():
-        print(f"❌ No crops found for SKU: {sku}")
-        return None
+        with stage('normalize'):
+            return resize_to_video_dimensions(decoded[0], size)
 
-    # Get all cropped images (PNG and JPG files, excluding thumbnail)
+    variant = f"letterbox@r{factor}"
+    return [default_cache().get(path, size, partial(letterbox, size=size), variant) for size in sizes]
+
+
+def find_crop_files(sku_folder):
+    """Cropped images for a SKU (PNG and JPG files, excluding thumbnail and stock images)"""
     crop_files = []
+    if not sku_folder.exists():
+        return crop_files
+
     for pattern in ["*.png", "*.jpg", "*.jpeg"]:
         for crop_file in sorted(sku_folder.glob(pattern)):
             if "THUMBNAIL" not in crop_file.name and "stock" not in crop_file.name.lower():
                 crop_files.append(crop_file)
 
-    print(f"Found {len(crop_files)} cropped images (excluding stock)")
-
-    if len(crop_files) == 0:
-        print(f"❌ No valid crops found for SKU: {sku}")
-        return None
-
-    # Prepare output
-    output_dir.mkdir(exist_ok=True)
-    temp_video = output_dir / f"{sku}_temp.mp4"
-    final_video = output_dir / f"{sku}.mp4"
+    return crop_files
 
-    # Initialize video writer
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(str(temp_video), fourcc, FPS, (WIDTH, HEIGHT))
 
-    # Calculate timing
-    seconds_per_crop = (VIDEO_DURATION - 3) / len(crop_files)  # Save 3 seconds for authenticity
+def render_settings(ken_burns_settings=None, renditions=None):
+    """Everything besides the source images and seed that shapes a rendered video"""
+    return {
+        'renditions': renditions or VIDEO_RENDITIONS,
+        'duration': VIDEO_DURATION,
+        'fps': FPS,
+        'size': [WIDTH, HEIGHT],
+        'quotes': ART_QUOTES,
+        'pan_directions': PAN_DIRECTIONS,
+        'ken_burns_settings': ken_burns_settings,
+    }
 
-    print(f"Duration per crop: {seconds_per_crop:.1f} seconds")
 
-    # Process each crop with Ken Burns effect
-    import random
-    for idx, crop_file in enumerate(crop_files):
-        print(f"  Processing {crop_file.name}...")
+def product_fingerprint(sku, crops_dir=CROPS_DIR, output_dir=OUTPUT_DIR, ken_burns_settings=None,
+                        renditions=None):
+    """
+    Fingerprint of a SKU's video inputs: crop and authenticity slide contents,
+    render settings and the SKU's seed. Returns {'fingerprint', 'sources'},
+    or None if the SKU has no crops.
+    """
+    crop_files = find_crop_files(crops_dir / sku)
+    if not crop_files:
+        return None
 
-        # Load image
-        img = cv2.imread(str(crop_file))
-        if img is None:
-            continue
+    sources = list(crop_files)
+    if AUTHENTICITY_IMAGE.exists():
+        sources.append(AUTHENTICITY_IMAGE)
 
-        # Resize to video dimensions
-        img = resize_to_video_dimensions(img)
+    # Files unchanged since the last render reuse their recorded digests
+    renditions = renditions or VIDEO_RENDITIONS
+    previous = read_manifest(rendition_path(output_dir, sku, renditions[0])) or {}
+    digests = source_digests(sources, previous.get('sources'))
 
-        # Apply Ken Burns effect
-        frames = apply_ken_burns_effect(img, start_zoom=1.0, end_zoom=1.3)
+    settings = render_settings(ken_burns_settings, renditions)
+    return {
+        'fingerprint': render_fingerprint(sku_seed(sku), digests, settings),
+        'sources': digests
+    }
 
-        # Add text overlay to some frames (middle of clip)
-        if idx % 2 == 0:  # Add quote to every other clip
-            quote = random.choice(ART_QUOTES)
-            start_frame = len(frames) // 3
-            end_frame = 2 * len(frames) // 3
 
-            for i in range(start_frame, end_frame):
-                frames[i] = add_text_overlay(frames[i], quote, position='bottom')
+def plan_product_segments(crop_files, seed=None):
+    """
+    Lay out a product video as independently renderable segments:
+    one Ken Burns clip per crop, then the authenticity slide
+    seed: makes the quote and pan direction choices reproducible
+    """
+    import random
+    rng = random.Random(seed)
+    segments = []
 
-        # Write frames
-        for frame in frames:
-            out.write(frame)
+    for idx, crop_file in enumerate(crop_files):
+        segments.append({
+            'type': 'crop',
+            'source': str(crop_file),
+            # Add text overlay to the middle of every other clip
+            'quote': rng.choice(ART_QUOTES) if idx % 2 == 0 else None,
+            'pan_direction': rng.choice(PAN_DIRECTIONS)
+        })
 
     # Add authenticity slide (3 seconds)
-    print("  Adding authenticity slide...")
     if AUTHENTICITY_IMAGE.exists():
-        auth_img = cv2.imread(str(AUTHENTICITY_IMAGE))
-        auth_img = resize_to_video_dimensions(auth_img)
-
-        # Hold for 3 seconds
-        for _ in range(FPS * 3):
-            out.write(auth_img)
-
-    out.release()
+        segments.append({'type': 'hold', 'source': str(AUTHENTICITY_IMAGE), 'duration': 3})
 
-    # Convert to H.264 for better compatibility
-    print("  Converting to H.264...")
-    convert_to_h264(temp_video, final_video)
+    return segments
 
-    # Clean up temp file
-    if temp_video.exists():
-        temp_video.unlink()
 
-    print(f"✅ Video created: {final_video}")
+def render_product_segment(segment, ken_burns_settings=None, profile=None):
+    """
+    Yield the frames of one planned segment
+    profile: render_profile() to render with (default: the final render)
+    """
+    profile = profile or render_profile()
+    announce_segment(segment)
 
-    return final_video
+    # Load image, resized to video dimensions
+    img = load_canvas(segment['source'], profile['size'])
+    if img is None:
+        return
 
+    yield from product_segment_frames(segment, img, ken_burns_settings, profile)
 
-def convert_to_h264(input_file, output_file):
-    """Convert video to H.264 for better compatibility"""
-    command = [
-        'ffmpeg',
-        '-i', str(input_file),
-        '-c:v', 'libx264',
-        '-preset', 'medium',
-        '-crf', '23',
-        '-movflags', '+faststart',
-        '-y',
-        str(output_file)
-    ]
 
-    subprocess.run(command, capture_output=True)
+def announce_segment(segment):
+    """Progress line for a segment about to render"""
+    if segment['type'] == 'crop':
+        print(f"  Processing {Path(segment['source']).name}...")
+    else:
+        print("  Adding authenticity slide...")
+
+
+def product_segment_frames(segment, img, ken_burns_settings, profile):
+    """Yield the frames of one planned segment from its loaded canvas"""
+    if segment['type'] == 'crop':
+        # Apply Ken Burns effect, streaming frames to the encoder
+        yield from render_crop_clip(
+            img,
+            segment['quote'],
+            pan_direction=segment['pan_direction'],
+            ken_burns_settings=ken_burns_settings,
+            fps=profile['fps'],
+            scale=profile['scale']
+        )
+    else:
+        # Hold the still for the segment duration (encoded once as a still segment)
+        yield from held_frames(img, profile['fps'] * segment['duration'])
 
 
-def upload_to_drive(video_file, sku):
-    """Upload video to Google Drive PRODUCT VIDEOS folder"""
+def render_renditions(segments, profiles, paths, ken_burns_settings=None, tap=None):
+    """
+    Render several renditions of one video in a single pass over its segments
+    Each source is decoded once, ahead of time (PREFETCH_CROPS), and letterboxed
+    per rendition; every rendition then renders its frames from the same
+    segment plan (quotes, pan directions) and encodes them on its own thread,
+    in parallel with the others.
+    profiles, paths: dicts keyed by rendition name
+    tap: StoryboardTap watching the first rendition's frames
+    """
+    names = list(profiles)
+
+    with ExitStack() as stack:
+        writers = [
+            stack.enter_context(FFmpegWriter(paths[name], profiles[name]['fps'], profiles[name]['size'],
+                                             preset=profiles[name]['preset']))
+            for name in names
+        ]
+        pool = stack.enter_context(ThreadPoolExecutor(max_workers=len(names), thread_name_prefix='rendition'))
+
+        sizes = [profiles[name]['size'] for name in names]
+        loaded = prefetch(segments, lambda segment: load_canvases(segment['source'], sizes), PREFETCH_CROPS)
+
+        for segment, canvases in zip(segments, loaded):
+            announce_segment(segment)
+            if canvases[0] is None:
+                continue
+
+            streams = [
+                product_segment_frames(segment, canvas, ken_burns_settings, profiles[name])
+                for name, canvas in zip(names, canvases)
+            ]
+            if tap:
+                streams[0] = tap.tap(streams[0])
+            write_streams(writers, streams, pool)
+
+
+def create_product_video(sku, crops_dir=CROPS_DIR, output_dir=OUTPUT_DIR, ken_burns_settings=None,
+                         segment_jobs=1, fingerprint=None, metrics=None, preview=False, renditions=None):
+    """
+    Create video for a specific SKU using its cropped images
+    ken_burns_settings: optional zoom/easing overrides, see motion.settings_from_config
+    segment_jobs: render each clip in its own process (and concat losslessly) when > 1
+    fingerprint: product_fingerprint() result, if the caller already computed it
+    metrics: RenderMetrics to record stage timings into; they are also saved
+    in the render manifest
+    preview: render a low-resolution proxy to {sku}_preview.mp4 instead
+    (same timing and overlay layout, no render manifest)
+    renditions: output formats (keys of RENDITIONS, default VIDEO_RENDITIONS),
+    all rendered in one pass; the first is returned and gets the manifest,
+    a poster frame and a scrubbing storyboard tapped from its frames
+    """
+    metrics = metrics or RenderMetrics(sku)
+    renditions = renditions or VIDEO_RENDITIONS
+    profiles = {name: render_profile(preview, name) for name in renditions}
+    profile = profiles[renditions[0]]
+
+    with recording(metrics):
+        print(f"\n{'='*70}")
+        print(f"CREATING VIDEO FOR SKU: {sku}")
+        print(f"{'='*70}")
+
+        # Find all crops for this SKU (excluding stock images)
+        sku_folder = crops_dir / sku
+
+        if not sku_folder.exists():
+            print(f"❌ No crops found for SKU: {sku}")
+            return None
+
+        # Get all cropped images (PNG and JPG files, excluding thumbnail)
+        with stage('discovery'):
+            crop_files = find_crop_files(sku_folder)
+
+        print(f"Found {len(crop_files)} cropped images (excluding stock)")
+
+        if len(crop_files) == 0:
+            print(f"❌ No valid crops found for SKU: {sku}")
+            return None
+
+        # Prepare output
+        output_dir.mkdir(exist_ok=True)
+        paths = {name: rendition_path(output_dir, sku, name, preview) for name in renditions}
+        final_video = paths[renditions[0]]
+
+        # Calculate timing
+        seconds_per_crop = (VIDEO_DURATION - 3) / len(crop_files)  # Save 3 seconds for authenticity
+
+        print(f"Duration per crop: {seconds_per_crop:.1f} seconds")
+
+        if fingerprint is None and not preview:
+            with stage('discovery'):
+                fingerprint = product_fingerprint(sku, crops_dir, output_dir, ken_burns_settings, renditions)
+
+        # Plan the timeline up front, seeded by the SKU, so serial, segment-parallel
+        # and repeated renders make exactly the same random choices
+        seed = sku_seed(sku)
+        segments = plan_product_segments(crop_files, seed)
+
+        # Poster and storyboard come from the frames on their way to the
+        # encoder; segment-parallel frames never pass through this process
+        single_process = len(renditions) > 1 or segment_jobs <= 1
+        tap = StoryboardTap(profile['fps']) if single_process and not preview else None
+
+        if len(renditions) > 1:
+            # One pass for every format: shared decode and plan, parallel encoders
+            if segment_jobs > 1:
+                print("  Rendering renditions in one pass (segment jobs only apply to a single rendition)")
+            print(f"  Rendering {', '.join(renditions)}...")
+            render_renditions(segments, profiles, paths, ken_burns_settings, tap)
+        elif segment_jobs > 1:
+            # Render each clip in its own process and join them without re-encoding
+            print(f"  Rendering {len(segments)} segments on {segment_jobs} processes...")
+            render_segments(
+                partial(render_product_segment, ken_burns_settings=ken_burns_settings, profile=profile),
+                segments, final_video, profile['fps'], profile['size'], jobs=segment_jobs,
+                preset=profile['preset']
+            )
+        else:
+            # Encode H.264 in a single pass by piping frames straight to ffmpeg
+            with FFmpegWriter(final_video, profile['fps'], profile['size'], preset=profile['preset']) as out:
+                # The next clips' sources decode in the background while this one renders
+                loaded = prefetch(segments, lambda segment: load_canvas(segment['source'], profile['size']),
+                                  PREFETCH_CROPS)
+                for segment, img in zip(segments, loaded):
+                    announce_segment(segment)
+                    if img is None:
+                        continue
+                    frames = product_segment_frames(segment, img, ken_burns_settings, profile)
+                    for frame in (tap.tap(frames) if tap else frames):
+                        out.write(frame)
+
+        for path in paths.values():
+            count('bytes_written', path.stat().st_size)
+
+        if preview:
+            # Proxies never stand in for the real video in incremental runs
+            print(f"✅ Preview created: {final_video}")
+            return final_video
+
+        stills = tap.write(final_video) if tap else {}
+
+        # Record what the video was rendered from, and how long it took, for
+        # incremental batch runs and regression hunting
+        write_manifest(final_video, fingerprint['fingerprint'], fingerprint['sources'],
+                       outputs=[path for path in paths.values() if path != final_video],
+                       sku=sku, seed=seed,
+                       renditions={name: path.name for name, path in paths.items()},
+                       stills={kind: path.name for kind, path in stills.items()},
+                       uploads={}, metrics=metrics.report())
+
+        print(f"✅ Video created: {final_video}")
+
+        return final_video
+
+
+def upload_progress(sku):
+    """Progress callback printing each uploaded chunk"""
+    def report(sent, total):
+        print(f"  📤 {sku}: {sent / (1024 * 1024):.1f}/{total / (1024 * 1024):.1f} MB ({sent / max(total, 1):.0%})")
+    return report
+
+
+def upload_to_drive(video_file, sku, client=None, video=None):
+    """
+    Upload video to Google Drive PRODUCT VIDEOS folder
+    Uploads in UPLOAD_CHUNK_MB chunks and resumes an interrupted upload of
+    the same file from its saved session
+    client: DriveClient to use (default: the shared process-wide client)
+    video: the SKU's primary video, whose manifest records the upload
+    (default: video_file itself)
+    """
     print(f"  Uploading to Google Drive...")
 
     try:
-        service = get_drive_service()
-
-        file_metadata = {
-            'name': f"{sku}.mp4",
-            'parents': [PRODUCT_VIDEOS_FOLDER_ID]
-        }
-
-        media = MediaFileUpload(
-            str(video_file),
-            mimetype='video/mp4',
-            resumable=True
+        client = client or drive_client()
+        file = client.upload(
+            video_file, f"{sku}.mp4", PRODUCT_VIDEOS_FOLDER_ID,
+            chunk_size=UPLOAD_CHUNK_MB * 1024 * 1024,
+            progress=upload_progress(sku)
         )
 
-        file = service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id, webViewLink'
-        ).execute()
-
         print(f"✅ Uploaded to Google Drive: {file.get('webViewLink')}")
+        record_upload(video or video_file, video_file, file.get('id'))
         return file.get('id')
 
     except Exception as e:
@@ -397,8 +588,89 @@ def upload_to_drive(video_file, sku):
         return None
 
 
-def process_all_products():
-    """Process all products from Google Sheets"""
+def extra_renditions(sku, output_dir=OUTPUT_DIR, renditions=None):
+    """{name: path} of a SKU's rendered videos besides the primary one"""
+    renditions = renditions or VIDEO_RENDITIONS
+    paths = {name: rendition_path(output_dir, sku, name) for name in renditions[1:]}
+    return {name: str(path) for name, path in paths.items() if path.exists()}
+
+
+def unfinished_uploads(video):
+    """
+    Files of an up-to-date SKU that still need uploading: an upload that was
+    interrupted (it left a resumable session behind) or never succeeded
+    """
+    video = Path(video)
+    outputs = (read_manifest(video) or {}).get('output_sizes', {})
+    pending = pending_uploads(video)
+    return [str(path) for path in [video] + [video.with_name(name) for name in outputs]
+            if path in pending or upload_state_path(path).exists()]
+
+
+def process_product(sku, force=False, upload=True, renditions=None):
+    """
+    Create and upload the video for one SKU; returns a result dict
+    Skips SKUs whose video was already rendered from the same inputs unless force
+    upload=False leaves the upload to the caller (see uploader.UploadQueue)
+    renditions: output formats (default VIDEO_RENDITIONS); besides the primary
+    'video', the result lists the other files under 'renditions'
+    """
+    metrics = RenderMetrics(sku)
+    renditions = renditions or VIDEO_RENDITIONS
+
+    with recording(metrics):
+        with stage('discovery'):
+            fingerprint = product_fingerprint(sku, renditions=renditions)
+        primary = rendition_path(OUTPUT_DIR, sku, renditions[0])
+        if not force and fingerprint and is_current(primary, fingerprint['fingerprint']):
+            print(f"⏭️  {sku}: video is up to date, skipping...")
+            # ...but an upload a previous run didn't finish is picked up again
+            result = {'sku': sku, 'status': 'skipped', 'video': str(primary),
+                      'uploads': unfinished_uploads(primary)}
+            if upload:
+                with stage('upload'):
+                    for path in result.pop('uploads'):
+                        upload_to_drive(path, sku if path == result['video'] else Path(path).stem,
+                                        video=primary)
+            return result
+
+        # batch_video_generator may be rendering the same SKU
+        with sku_lock(OUTPUT_DIR, sku) as acquired:
+            if not acquired:
+                print(f"⏭️  {sku}: already being rendered by another worker, skipping...")
+                return {'sku': sku, 'status': 'skipped'}
+
+            # Create video
+            video_file = create_product_video(sku, fingerprint=fingerprint, metrics=metrics,
+                                              renditions=renditions)
+
+            if not video_file or not video_file.exists():
+                return {'sku': sku, 'status': 'failed', 'error': 'video generation failed',
+                        'metrics': metrics.report()}
+
+            result = {'sku': sku, 'status': 'success', 'video': str(video_file),
+                      'renditions': extra_renditions(sku, OUTPUT_DIR, renditions)}
+
+            if upload:
+                # Upload to Google Drive
+                with stage('upload'):
+                    result['file_id'] = upload_to_drive(video_file, sku)
+                    for path in result['renditions'].values():
+                        upload_to_drive(path, Path(path).stem, video=video_file)
+
+    result['metrics'] = metrics.report()
+    return result
+
+
+def process_all_products(jobs=1, force=False, upload_jobs=2, ledger=RENDER_LEDGER, renditions=None):
+    """
+    Process all products from Google Sheets
+    jobs: number of worker processes rendering SKUs in parallel
+    force: re-render SKUs even if their inputs haven't changed
+    upload_jobs: concurrent uploads, running in the background while rendering continues
+    ledger: JSON-lines file to append each job's result and stage timings to
+    renditions: output formats for every SKU (default VIDEO_RENDITIONS)
+    """
     print(f"\n{'='*70}")
     print("PRODUCT VIDEO GENERATOR - KEN BURNS STYLE")
     print(f"{'='*70}\n")
@@ -417,24 +689,51 @@ def process_all_products():
     print(f"Found {len(sku_folders)} products to process\n")
 
     processed = 0
-    for sku_folder in sku_folders:
-        sku = sku_folder.name
+    skipped = 0
+    uploaded = 0
+    worker = partial(process_product, force=force, upload=False, renditions=renditions)
 
-        try:
-            # Create video
-            video_file = create_product_video(sku)
+    rendered = {}
 
-            if video_file and video_file.exists():
-                # Upload to Google Drive
-                upload_to_drive(video_file, sku)
+    # Each finished video uploads in the background while the next SKU renders
+    with UploadQueue(upload_to_drive, upload_jobs) as uploads:
+        for result in run_sku_jobs([d.name for d in sku_folders], worker, jobs):
+            if result['status'] == 'success':
                 processed += 1
-
-        except Exception as e:
-            print(f"❌ Error processing {sku}: {e}")
-            continue
+                rendered[result['sku']] = result
+                uploads.submit(result['sku'], result['video'])
+                for path in result['renditions'].values():
+                    uploads.submit(Path(path).stem, path, video=result['video'])
+            elif result['status'] == 'skipped':
+                skipped += 1
+                for path in result.get('uploads', []):
+                    print(f"📤 {result['sku']}: resuming unfinished upload of {Path(path).name}")
+                    name = result['sku'] if path == result['video'] else Path(path).stem
+                    uploads.submit(name, path, video=result['video'])
+            else:
+                print(f"❌ Error processing {result['sku']}: {result.get('error')}")
+                if ledger:
+                    append_ledger(ledger, result)
+
+        for upload in uploads.results():
+            if upload['sku'] not in rendered:
+                # Another rendition of a SKU's video
+                if upload['status'] != 'uploaded':
+                    print(f"⚠️  Upload failed for {upload['sku']}, video saved locally")
+                continue
+
+            if upload['status'] == 'uploaded':
+                uploaded += 1
+            else:
+                print(f"⚠️  Upload failed for {upload['sku']}, video saved locally")
+
+            result = with_upload(rendered[upload['sku']], upload)
+            if ledger:
+                append_ledger(ledger, result)
 
     print(f"\n{'='*70}")
-    print(f"✅ COMPLETED: {processed}/{len(sku_folders)} videos created")
+    print(f"✅ COMPLETED: {processed}/{len(sku_folders)} videos created ({skipped} up to date)")
+    print(f"📤 Uploaded: {uploaded}/{processed}")
     print(f"{'='*70}")
 
 
@@ -446,5 +745,32 @@ if __name__ == "__main__":
         if source.exists():
             shutil.copy(source, AUTHENTICITY_IMAGE)
 
-    # Process all products
-    process_all_products()
+    parser = argparse.ArgumentParser(description="Create product videos for every SKU")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="number of SKUs to render in parallel (default: 1)")
+    parser.add_argument('--sku', help="render and upload just this SKU now")
+    parser.add_argument('--segment-jobs', type=int, default=1,
+                        help="with --sku, render the video's clips in parallel (default: 1)")
+    parser.add_argument('--force', action='store_true',
+                        help="re-render SKUs whose inputs haven't changed")
+    parser.add_argument('--upload-jobs', type=int, default=2,
+                        help="concurrent background uploads (default: 2)")
+    parser.add_argument('--renditions', type=lambda s: s.split(','), default=VIDEO_RENDITIONS,
+                        help=f"output formats, primary first: {','.join(RENDITIONS)} (env VIDEO_RENDITIONS)")
+    parser.add_argument('--preview', action='store_true',
+                        help="with --sku, render a quick low-resolution proxy and don't upload it")
+    parser.add_argument('--ledger', default=RENDER_LEDGER,
+                        help="append per-job stage timings to this JSON-lines file (env RENDER_LEDGER)")
+    args = parser.parse_args()
+
+    if args.sku:
+        video_file = create_product_video(args.sku, segment_jobs=args.segment_jobs, preview=args.preview,
+                                          renditions=args.renditions)
+        if video_file and not args.preview:
+            upload_to_drive(video_file, args.sku)
+            for path in extra_renditions(args.sku, OUTPUT_DIR, args.renditions).values():
+                upload_to_drive(path, Path(path).stem)
+    else:
+        # Process all products
+        process_all_products(jobs=args.jobs, force=args.force, upload_jobs=args.upload_jobs,
+                             ledger=args.ledger, renditions=args.renditions)
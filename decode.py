@@ -0,0 +1,74 @@
+"""
+Source Decoding
+Decodes source images no larger than a render needs: the header is read
+first, and when the output only uses a fraction of a source's resolution,
+JPEGs are decoded with libjpeg's DCT scaling (cv2.IMREAD_REDUCED_*) instead
+of at full size and resized after
+"""
+
+import cv2
+from PIL import Image
+
+# Downscale factors libjpeg can apply while decoding
+REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Deepest Ken Burns zoom (motion.plan_ken_burns default end_zoom): decodes
+# keep this much headroom over the target size
+MAX_ZOOM = 1.3
+
+# EXIF orientations that swap width and height
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def source_size(path):
+    """(width, height) of an image as displayed, read from its header only"""
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            if img.getexif().get(0x0112) in ROTATED_ORIENTATIONS:
+                width, height = height, width
+            return width, height
+    except (OSError, ValueError):
+        return None
+
+
+def reduction_factor(source, target, zoom=1.0):
+    """
+    Largest decode downscale (1, 2, 4 or 8) that still leaves the source at
+    least as large as it will be once fitted into target (width, height)
+    and zoomed in by zoom
+    """
+    width, height = source
+    fit = min(target[0] / width, target[1] / height) * zoom
+
+    for factor in (8, 4, 2):
+        if fit * factor <= 1:
+            return factor
+    return 1
+
+
+def decode_factor(path, sizes, zoom=MAX_ZOOM):
+    """Decode downscale for one decode shared by several targets: covers the largest"""
+    source = source_size(path)
+    return min(reduction_factor(source, size, zoom) for size in sizes) if source else 1
+
+
+def imread_reduced(path, factor):
+    """cv2.imread at 1/factor of the full resolution (factor 1, 2, 4 or 8)"""
+    if factor == 1:
+        return cv2.imread(str(path))
+    return cv2.imread(str(path), REDUCED_FLAGS[factor])
+
+
+def imread_for_size(path, size, zoom=MAX_ZOOM):
+    """cv2.imread, decoding at reduced resolution when the target size allows it"""
+    return imread_for_sizes(path, [size], zoom)
+
+
+def imread_for_sizes(path, sizes, zoom=MAX_ZOOM):
+    """imread_for_size for one decode shared by several targets: covers the largest"""
+    return imread_reduced(path, decode_factor(path, sizes, zoom))
@@ -0,0 +1,459 @@
+"""
+FFmpeg Encoder Backend
+Pipes raw rendered frames over stdin to a single ffmpeg libx264 process,
+so every video is encoded exactly once. Long videos can also be split
+into segments that are encoded in parallel and joined without re-encoding,
+several renditions of one video can be fed to their encoders at once, and
+static spans are encoded once as still segments instead of frame by frame.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+import numpy as np
+
+from image_cache import prune_directory, touch
+from metrics import RenderMetrics, active, count, recording, stage
+
+
+# Static spans at least this long are encoded as a separate still segment;
+# shorter ones are cheaper to just pipe
+MIN_HELD_FRAMES = 15
+
+# Pre-encoded still segments, shared by every render (e.g. the authenticity slide)
+DEFAULT_STILL_CACHE_DIR = Path.home() / ".cache" / "product-video-creator" / "stills"
+DEFAULT_STILL_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def encoder_command(output_path, fps, size, preset='medium', crf=23, ffmpeg='ffmpeg', filters=None):
+    """ffmpeg command encoding raw BGR frames from stdin to H.264"""
+    width, height = size
+    command = [
+        ffmpeg,
+        '-hide_banner',
+        '-loglevel', 'error',
+        '-f', 'rawvideo',
+        '-pix_fmt', 'bgr24',
+        '-s', f"{width}x{height}",
+        '-r', str(fps),
+        '-i', '-',
+        '-an',
+    ]
+    if filters:
+        command += ['-vf', filters]
+
+    return command + [
+        '-c:v', 'libx264',
+        '-preset', preset,
+        '-crf', str(crf),
+        '-pix_fmt', 'yuv420p',
+        '-movflags', '+faststart',
+        '-y',
+        str(output_path)
+    ]
+
+
+def held_frames(frame, count):
+    """
+    Yield one frame `count` times as a static span FFmpegWriter can elide
+    The same read-only array is yielded every time, which is what tells the
+    writer the frames can't differ.
+    """
+    if frame.flags.writeable:
+        frame = frame.copy()
+        frame.flags.writeable = False
+
+    for _ in range(count):
+        yield frame
+
+
+def still_cache_dir():
+    """Where pre-encoded still segments are kept (env STILL_CACHE_DIR)"""
+    return Path(os.environ.get('STILL_CACHE_DIR', str(DEFAULT_STILL_CACHE_DIR))).expanduser()
+
+
+def still_cache_bytes():
+    """Size budget of the still segment cache (env STILL_CACHE_MB)"""
+    return int(os.environ.get('STILL_CACHE_MB', DEFAULT_STILL_CACHE_BYTES // (1024 * 1024))) * 1024 * 1024
+
+
+def encode_still(frame, count, output_path, fps, size, preset='medium', crf=23, ffmpeg='ffmpeg'):
+    """
+    Encode `count` frames of one image as a segment that concatenates with
+    FFmpegWriter output. The frame is piped once and repeated inside ffmpeg;
+    segments are cached by content and settings, so a slide shared by every
+    video is only ever encoded once.
+    """
+    key = hashlib.sha1(np.ascontiguousarray(frame).data)
+    key.update(repr((count, fps, tuple(size), preset, crf)).encode())
+    cache_dir = still_cache_dir()
+    cached = cache_dir / f"{key.hexdigest()}.mp4"
+
+    if not cached.exists():
+        # Each encode writes its own temp file, so renders encoding the same
+        # slide at once don't clobber each other; the last rename wins
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=cached.stem, suffix='.tmp.mp4')
+        os.close(fd)
+        try:
+            command = encoder_command(tmp_path, fps, size, preset, crf, ffmpeg,
+                                      filters=f"loop=loop={count - 1}:size=1:start=0")
+            result = subprocess.run(command, input=np.ascontiguousarray(frame).data, capture_output=True)
+            if result.returncode == 0:
+                # Atomic, so concurrent renders never pick up a partial file
+                os.replace(tmp_path, cached)
+                prune_directory(cache_dir, still_cache_bytes(), '*.mp4')
+            elif not cached.exists():
+                raise RuntimeError(f"ffmpeg still encode failed: {result.stderr.decode(errors='replace').strip()}")
+        finally:
+            Path(tmp_path).unlink(missing_ok=True)
+    else:
+        touch(cached)
+
+    shutil.copyfile(cached, output_path)
+
+
+class FFmpegWriter:
+    """
+    Drop-in replacement for cv2.VideoWriter that encodes H.264 directly
+    Frames are BGR uint8 arrays of shape (height, width, 3)
+    Static spans (see held_frames) are not piped frame by frame: the video is
+    split around them, the span is encoded once as a still segment and the
+    pieces are joined losslessly when the writer is released.
+    """
+
+    def __init__(self, output_path, fps, size, preset='medium', crf=23, ffmpeg='ffmpeg'):
+        """Start the ffmpeg process; size is (width, height)"""
+        self.output_path = Path(output_path)
+        self.fps = fps
+        self.width, self.height = size
+        self.preset = preset
+        self.crf = crf
+        self.ffmpeg = ffmpeg
+        self.frames_written = 0
+
+        self._last = None  # last frame piped, if it may start a static span
+        self._held = 0  # repeats of it not piped yet
+        self._parts = []  # finished pieces, once the video has been split
+        self._part_dir = None
+        self._part_count = 0
+        self._released = False
+        self.process = self._start(self.output_path)
+
+    def _start(self, output_path):
+        """Start an encoder process writing to output_path"""
+        command = encoder_command(output_path, self.fps, (self.width, self.height),
+                                  self.preset, self.crf, self.ffmpeg)
+        self._target = output_path
+        self._piped = 0
+
+        try:
+            return subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
+            )
+        except FileNotFoundError:
+            raise RuntimeError(f"ffmpeg not found: {self.ffmpeg} (install FFmpeg to encode videos)")
+
+    def write(self, frame):
+        """Send one frame to the encoder"""
+        if frame.shape != (self.height, self.width, 3) or frame.dtype != np.uint8:
+            raise ValueError(
+                f"Expected {self.width}x{self.height} BGR uint8 frame, "
+                f"got shape {frame.shape} ({frame.dtype})"
+            )
+
+        if frame is self._last:
+            # Another copy of a read-only frame: part of a static span
+            self._held += 1
+        else:
+            self._flush_held()
+            self._pipe(frame)
+            self._last = None if frame.flags.writeable else frame
+
+        self.frames_written += 1
+        count('frames')
+
+    def _pipe(self, frame):
+        """Write one frame to the current encoder process"""
+        if self.process is None:
+            self.process = self._start(self._next_part())
+
+        try:
+            with stage('frame_write'):
+                self.process.stdin.write(np.ascontiguousarray(frame).data)
+        except BrokenPipeError:
+            self.process.wait()
+            raise RuntimeError(f"ffmpeg exited early: {self._stderr()}")
+        self._piped += 1
+
+    def _flush_held(self):
+        """Emit the static span collected so far"""
+        held, self._held = self._held, 0
+        if not held:
+            return
+
+        if held < MIN_HELD_FRAMES:
+            for _ in range(held):
+                self._pipe(self._last)
+            return
+
+        # Close the piece before the span, then add the span as a still segment
+        self._finish_part()
+        part = self._next_part()
+        with stage('transcode'):
+            encode_still(self._last, held, part, self.fps, (self.width, self.height),
+                         self.preset, self.crf, self.ffmpeg)
+        self._parts.append(part)
+        count('held_frames', held)
+
+    def _next_part(self):
+        """Path for the next piece of a split video"""
+        if self._part_dir is None:
+            self._part_dir = Path(tempfile.mkdtemp(prefix=f"{self.output_path.stem}_",
+                                                   dir=self.output_path.parent))
+        self._part_count += 1
+        return self._part_dir / f"part_{self._part_count:04d}.mp4"
+
+    def _finish_part(self):
+        """Finalize the current encoder process as one piece of a split video"""
+        if self.process is None:
+            return
+
+        process = self.process
+        self.process = None
+        if not self._piped:
+            # Nothing encoded yet (the video opened with a static span)
+            self._kill(process)
+            return
+
+        self._wait(process)
+        process.stderr.close()
+        if self._target == self.output_path:
+            part = self._next_part()
+            os.replace(self.output_path, part)
+            self._parts.append(part)
+        else:
+            self._parts.append(self._target)
+
+    def release(self):
+        """Flush the encoder and wait for the output file to be finalized"""
+        if self._released:
+            return
+        self._released = True
+
+        try:
+            if not self.frames_written:
+                # ffmpeg either fails or writes a file without a video stream
+                raise RuntimeError(f"No frames written to {self.output_path}")
+
+            self._flush_held()
+
+            if not self._parts:
+                # Encoding the buffered tail and writing the moov atom
+                self._wait(self.process)
+                return
+
+            self._finish_part()
+            concat_segments(self._parts, self.output_path)
+        except BaseException:
+            # No empty or truncated video is left behind (e.g. no frames written)
+            self.abort()
+            raise
+        finally:
+            self._remove_parts()
+
+    def _wait(self, process):
+        """Close a process's frame pipe and wait for it to finish encoding"""
+        with stage('transcode'):
+            self._close_stdin(process)
+            returncode = process.wait()
+
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed ({returncode}): {self._stderr(process)}")
+
+    def abort(self):
+        """Stop the encoder and remove the partial output file"""
+        if self.process is not None:
+            self._kill(self.process)
+        self._remove_parts()
+
+        if self.output_path.exists():
+            self.output_path.unlink()
+
+    def _kill(self, process):
+        """Stop an encoder process and drop its output"""
+        self._close_stdin(process)
+        process.kill()
+        process.wait()
+        process.stderr.close()
+
+    def _remove_parts(self):
+        """Delete the pieces of a split video"""
+        if self._part_dir is not None:
+            shutil.rmtree(self._part_dir, ignore_errors=True)
+            self._part_dir = None
+
+    def _close_stdin(self, process=None):
+        """Close the frame pipe, tolerating an encoder that already exited"""
+        try:
+            (process or self.process).stdin.close()
+        except BrokenPipeError:
+            pass
+
+    def _stderr(self, process=None):
+        """Return whatever ffmpeg printed to stderr"""
+        return (process or self.process).stderr.read().decode(errors='replace').strip()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.release()
+        else:
+            self.abort()
+        if self.process is not None:
+            self.process.stderr.close()
+
+
+def concat_segments(segment_paths, output_path, ffmpeg='ffmpeg'):
+    """Join encoded segments with ffmpeg's concat demuxer, without re-encoding"""
+    output_path = Path(output_path)
+    list_file = output_path.with_name(f"{output_path.stem}_segments.txt")
+
+    with open(list_file, 'w') as f:
+        for path in segment_paths:
+            escaped = str(Path(path).resolve()).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    command = [
+        ffmpeg,
+        '-hide_banner',
+        '-loglevel', 'error',
+        '-f', 'concat',
+        '-safe', '0',
+        '-i', str(list_file),
+        '-c', 'copy',
+        '-movflags', '+faststart',
+        '-y',
+        str(output_path)
+    ]
+
+    try:
+        with stage('transcode'):
+            result = subprocess.run(command, capture_output=True)
+    finally:
+        list_file.unlink()
+
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat failed: {result.stderr.decode(errors='replace').strip()}")
+
+
+def _encode_segment(segment_renderer, segment, output_path, fps, size, writer_options, instrument=False):
+    """
+    Worker process entry point: render one segment into its own file
+    Returns (frames written, metrics report or None)
+    """
+    metrics = RenderMetrics() if instrument else None
+
+    with recording(metrics):
+        frames = iter(segment_renderer(segment))
+        first = next(frames, None)
+        if first is None:
+            return 0, None
+
+        with FFmpegWriter(output_path, fps, size, **writer_options) as out:
+            out.write(first)
+            for frame in frames:
+                out.write(frame)
+
+    return out.frames_written, metrics.report() if metrics else None
+
+
+def render_segments(segment_renderer, segments, output_path, fps, size, jobs=2, **writer_options):
+    """
+    Render and encode every segment of a video in its own worker process,
+    then join the pieces losslessly in timeline order
+    segment_renderer(segment) must yield the segment's frames and be
+    picklable (a module-level function, bound method or functools.partial).
+    Returns the total number of frames written. Stage timings from the
+    worker processes are merged into the caller's active RenderMetrics.
+    """
+    output_path = Path(output_path)
+    metrics = active()
+    segment_dir = Path(tempfile.mkdtemp(prefix=f"{output_path.stem}_", dir=output_path.parent))
+
+    try:
+        paths = [segment_dir / f"segment_{i:04d}.mp4" for i in range(len(segments))]
+
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            outcomes = list(pool.map(
+                _encode_segment,
+                repeat(segment_renderer),
+                segments,
+                paths,
+                repeat(fps),
+                repeat(size),
+                repeat(writer_options),
+                repeat(metrics is not None)
+            ))
+
+        written = [frames for frames, _ in outcomes]
+        if metrics is not None:
+            for _, report in outcomes:
+                if report:
+                    metrics.merge(report)
+
+        # Segments that produced no frames (e.g. unreadable crops) have no file
+        encoded = [p for p, n in zip(paths, written) if n]
+        if not encoded:
+            raise RuntimeError("No segment produced any frames")
+
+        concat_segments(encoded, output_path)
+        return sum(written)
+
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+
+def _write_stream(writer, frames, metrics):
+    """Thread entry point: write every frame of one stream"""
+    with recording(metrics):
+        for frame in frames:
+            writer.write(frame)
+    return metrics.report() if metrics else None
+
+
+def write_streams(writers, streams, pool=None):
+    """
+    Feed several frame streams into their writers at the same time, one
+    thread per stream (OpenCV and the ffmpeg pipes release the GIL)
+    writers and streams are parallel lists; returns once every stream is
+    exhausted. Stage timings from the threads are merged into the caller's
+    active RenderMetrics, so they add up thread time, not wall time.
+    """
+    metrics = active()
+    own_pool = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=len(writers), thread_name_prefix='stream')
+
+    try:
+        futures = [
+            pool.submit(_write_stream, writer, frames, RenderMetrics() if metrics is not None else None)
+            for writer, frames in zip(writers, streams)
+        ]
+        for future in futures:
+            report = future.result()
+            if report:
+                metrics.merge(report)
+    finally:
+        if own_pool:
+            pool.shutdown(wait=True)
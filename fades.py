@@ -0,0 +1,86 @@
+"""
+Fade Engine
+Fades a shared base frame to or from a solid color using precomputed
+per-frame gain tables, writing into a small ring of reusable output buffers
+instead of allocating a blank frame and blending against it every frame
+"""
+
+import cv2
+import numpy as np
+
+
+def fade_gains(total_frames, fade_frames, direction='in', start=0):
+    """
+    Per-frame gain table for a fade, clamped to [0, 1]
+    direction 'in' ramps 0 -> 1 and 'out' ramps 1 -> 0 over fade_frames,
+    beginning at frame `start`
+    """
+    progress = (np.arange(total_frames) - start) / max(fade_frames, 1)
+
+    if direction == 'in':
+        gains = progress
+    elif direction == 'out':
+        gains = 1 - progress
+    else:
+        raise ValueError(f"Unknown fade direction: {direction}")
+
+    return np.clip(gains, 0.0, 1.0)
+
+
+class Fader:
+    """
+    Blends a base frame toward a solid color: out = base * gain + color * (1 - gain)
+    Frames come from a ring of reusable buffers, so each one is only valid
+    until `buffers` more frames have been produced; copy it to keep it.
+    """
+
+    def __init__(self, base, color=(0, 0, 0), buffers=2):
+        """Prepare output buffers shaped like the base frame"""
+        self.base = base
+        self.color = tuple(color)
+        self._buffers = [np.empty_like(base) for _ in range(buffers)]
+        self._next = 0
+
+        # Solid color frame, only needed when fading through a non-black color
+        if any(self.color):
+            self._solid = np.empty_like(base)
+            self._solid[:] = self.color
+        else:
+            self._solid = None
+
+    def frame(self, gain):
+        """Render the base frame at one gain into the next output buffer"""
+        out = self._buffers[self._next]
+        self._next = (self._next + 1) % len(self._buffers)
+
+        if self._solid is None:
+            cv2.convertScaleAbs(self.base, dst=out, alpha=float(gain))
+        else:
+            cv2.addWeighted(self.base, float(gain), self._solid, 1 - float(gain), 0, dst=out)
+
+        return out
+
+    def frames(self, gains):
+        """Yield one frame per entry of a gain table"""
+        for gain in gains:
+            yield self.frame(gain)
+
+
+def fade_in(base, total_frames, fade_frames, color=(0, 0, 0)):
+    """Yield frames fading the base frame in from a solid color"""
+    return Fader(base, color).frames(fade_gains(total_frames, fade_frames, 'in'))
+
+
+def fade_out(base, total_frames, fade_frames, color=(0, 0, 0)):
+    """Yield frames fading the base frame out to a solid color"""
+    return Fader(base, color).frames(fade_gains(total_frames, fade_frames, 'out'))
+
+
+def fade_through(frame_a, frame_b, total_frames, color=(0, 0, 0)):
+    """Yield a transition that fades frame_a out to a solid color, then frame_b in"""
+    half = total_frames // 2
+
+    yield from Fader(frame_a, color).frames(fade_gains(half, half, 'out'))
+    yield from Fader(frame_b, color).frames(
+        fade_gains(total_frames - half, total_frames - half - 1, 'in')
+    )
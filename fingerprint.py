@@ -0,0 +1,164 @@
+"""
+Render Fingerprints
+Content-addresses a render by its inputs (source file contents, render
+settings and a seed derived from the SKU) and records it next to the video,
+so batch runs only re-render SKUs whose inputs actually changed
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+# Bump when a code change alters rendered output, to invalidate every video
+RENDERER_VERSION = 1
+
+MANIFEST_SUFFIX = '.render.json'
+
+# Upload threads record their results in the same manifest
+_manifest_lock = threading.Lock()
+
+
+def sku_seed(sku):
+    """Stable 32-bit seed for a SKU's random choices (quotes, pan directions)"""
+    return int.from_bytes(hashlib.sha256(sku.encode()).digest()[:4], 'big')
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_digests(paths, previous=None):
+    """
+    Content digests of the source files, keyed by file name
+    previous: the 'sources' block of an earlier manifest; files whose size
+    and mtime are unchanged reuse its digest instead of being re-read
+    """
+    previous = previous or {}
+    sources = {}
+
+    for path in paths:
+        path = Path(path)
+        stat = path.stat()
+        entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+        known = previous.get(path.name)
+        if known and all(known.get(k) == v for k, v in entry.items()):
+            entry['sha256'] = known['sha256']
+        else:
+            entry['sha256'] = file_digest(path)
+
+        sources[path.name] = entry
+
+    return sources
+
+
+def render_fingerprint(seed, sources, settings):
+    """Single digest over the renderer version, seed, source contents and settings"""
+    payload = {
+        'renderer_version': RENDERER_VERSION,
+        'seed': seed,
+        'sources': sorted((name, entry['sha256']) for name, entry in sources.items()),
+        'settings': settings,
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def manifest_path(video_path):
+    """Sidecar file recording what a video was rendered from"""
+    video_path = Path(video_path)
+    return video_path.with_name(video_path.stem + MANIFEST_SUFFIX)
+
+
+def read_manifest(video_path):
+    """The manifest recorded for a video, or None"""
+    try:
+        with open(manifest_path(video_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(video_path, fingerprint, sources, outputs=(), **extra):
+    """
+    Atomically record the fingerprint of a finished render
+    outputs: other files rendered with the video (in the same directory);
+    the video is only current while they are intact too
+    """
+    video_path = Path(video_path)
+    manifest = {
+        'fingerprint': fingerprint,
+        'video_size': video_path.stat().st_size,
+        'output_sizes': {Path(path).name: Path(path).stat().st_size for path in outputs},
+        'sources': sources,
+    }
+    manifest.update(extra)
+    _save_manifest(video_path, manifest)
+    return manifest
+
+
+def _save_manifest(video_path, manifest):
+    fd, tmp_path = tempfile.mkstemp(dir=video_path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path(video_path))
+    except OSError:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def record_upload(video_path, path, file_id):
+    """Note in a video's manifest that it, or one of its outputs, is uploaded"""
+    video_path = Path(video_path)
+    with _manifest_lock:
+        manifest = read_manifest(video_path)
+        if manifest is None:
+            return
+        manifest.setdefault('uploads', {})[Path(path).name] = file_id
+        _save_manifest(video_path, manifest)
+
+
+def pending_uploads(video_path):
+    """
+    The video and outputs recorded with it that haven't been uploaded yet
+    Renders whose manifest has no 'uploads' record (written before uploads
+    were tracked) report nothing.
+    """
+    video_path = Path(video_path)
+    manifest = read_manifest(video_path)
+    if manifest is None or 'uploads' not in manifest:
+        return []
+
+    paths = [video_path] + [video_path.with_name(name) for name in manifest.get('output_sizes', {})]
+    return [path for path in paths if path.name not in manifest['uploads']]
+
+
+def is_current(video_path, fingerprint):
+    """
+    True if the video and every other output recorded with it (renditions)
+    exist, are the sizes its manifest recorded (so a file truncated by a
+    crashed run doesn't count) and were rendered from the same fingerprint
+    """
+    video_path = Path(video_path)
+    manifest = read_manifest(video_path)
+
+    if manifest is None or manifest.get('fingerprint') != fingerprint:
+        return False
+
+    expected = {video_path: manifest.get('video_size')}
+    for name, size in manifest.get('output_sizes', {}).items():
+        expected[video_path.with_name(name)] = size
+
+    try:
+        return all(path.stat().st_size == size for path, size in expected.items())
+    except OSError:
+        return False
@@ -0,0 +1,57 @@
+"""
+Google Drive Integration
+Credentials and the process-wide Drive client. The Google libraries are
+imported on first use, so renders that never upload don't load them (or
+need them installed).
+"""
+
+import os
+import pickle
+import threading
+
+from uploader import DriveClient
+
+SCOPES = ['https://www.googleapis.com/auth/drive']
+TOKEN_PATH = 'token.pickle'
+CLIENT_SECRETS_PATH = 'credentials.json'
+
+_drive_client = None
+_drive_client_lock = threading.Lock()
+
+
+def get_drive_credentials():
+    """Load (or interactively create) the cached Google Drive credentials"""
+    creds = None
+
+    if os.path.exists(TOKEN_PATH):
+        with open(TOKEN_PATH, 'rb') as token:
+            creds = pickle.load(token)
+
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            from google.auth.transport.requests import Request
+            creds.refresh(Request())
+        else:
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_PATH, SCOPES)
+            creds = flow.run_local_server(port=0)
+
+        with open(TOKEN_PATH, 'wb') as token:
+            pickle.dump(creds, token)
+
+    return creds
+
+
+def drive_client():
+    """The process-wide Drive client, authenticated once and shared by upload threads"""
+    global _drive_client
+
+    with _drive_client_lock:
+        if _drive_client is None:
+            _drive_client = DriveClient(get_drive_credentials())
+        return _drive_client
+
+
+def get_drive_service():
+    """Authenticate and return Google Drive service"""
+    return drive_client().service
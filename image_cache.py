@@ -0,0 +1,212 @@
+"""
+Source Image Cache
+Decoded, letterboxed video canvases keyed by source path, mtime, size and
+target resolution. Tier 1 is an in-process LRU with a byte budget; tier 2
+is a directory of memory-mapped .npy files shared across runs and worker
+processes, pruned least recently used first to a byte budget.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_MEMORY_BYTES = 512 * 1024 * 1024
+DEFAULT_DISK_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_DISK_DIR = Path.home() / ".cache" / "product-video-creator" / "canvases"
+
+
+def touch(path):
+    """
+    Mark a cache file as just used: sets its access time, which pruning goes
+    by, and leaves the modification time (part of source cache keys) alone
+    """
+    try:
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+    except OSError:
+        pass
+
+
+def prune_directory(directory, max_bytes, pattern='*'):
+    """
+    Delete the least recently used files matching pattern until the rest fit
+    in max_bytes; returns the deleted paths. In-progress temp files are left
+    alone. Files are ordered by access time, which cache hits refresh with
+    touch() even on filesystems mounted noatime.
+    """
+    entries = []
+    for path in Path(directory).glob(pattern):
+        if '.tmp' in path.name:
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue  # removed by another process
+        entries.append((stat.st_atime_ns, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed.append(path)
+
+    return removed
+
+
+class ImageCache:
+    """
+    Two-tier cache of normalized source canvases
+    Cached arrays are shared between callers and are read-only.
+    """
+
+    def __init__(self, memory_bytes=DEFAULT_MEMORY_BYTES, disk_dir=DEFAULT_DISK_DIR, disk_bytes=DEFAULT_DISK_BYTES):
+        """disk_dir=None keeps the cache in memory only; disk_bytes caps the disk tier"""
+        self.memory_bytes = memory_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_bytes = disk_bytes
+
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+    def cache_key(self, path, size, variant='letterbox'):
+        """Key a source by path, mtime, file size, target resolution and normalization"""
+        stat = os.stat(path)
+        raw = "|".join([
+            str(Path(path).resolve()),
+            str(stat.st_mtime_ns),
+            str(stat.st_size),
+            f"{size[0]}x{size[1]}",
+            variant
+        ])
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def get(self, path, size, loader, variant='letterbox'):
+        """
+        Return the normalized canvas for a source image
+        loader(path) decodes and normalizes it on a miss and may return None
+        for unreadable files, which are not cached.
+        """
+        try:
+            key = self.cache_key(path, size, variant)
+        except OSError:
+            return None
+
+        # Tier 1: in-process LRU
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self._memory[key]
+
+        # Tier 2: memory-mapped .npy on local disk
+        image = self._read_disk(key)
+        if image is not None:
+            self.stats['disk_hits'] += 1
+            self._remember(key, image)
+            return image
+
+        self.stats['misses'] += 1
+        image = loader(path)
+        if image is None:
+            return None
+
+        image = np.ascontiguousarray(image)
+        image.flags.writeable = False
+        self._write_disk(key, image)
+        self._remember(key, image)
+
+        return image
+
+    def clear(self):
+        """Drop the in-process tier (the disk tier is left alone)"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+
+    def _remember(self, key, image):
+        """Add to the LRU, evicting least recently used canvases over budget"""
+        if image.nbytes > self.memory_bytes:
+            return
+
+        with self._lock:
+            if key in self._memory:
+                return
+
+            self._memory[key] = image
+            self._memory_used += image.nbytes
+
+            while self._memory_used > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_used -= evicted.nbytes
+
+    def _read_disk(self, key):
+        """Memory-map a cached canvas, discarding unreadable entries"""
+        if self.disk_dir is None:
+            return None
+
+        npy_path = self.disk_dir / f"{key}.npy"
+        if not npy_path.exists():
+            return None
+
+        try:
+            image = np.load(npy_path, mmap_mode='r')
+            touch(npy_path)
+            return image
+        except (OSError, ValueError):
+            npy_path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, key, image):
+        """Atomically publish a canvas to the disk tier"""
+        if self.disk_dir is None:
+            return
+
+        tmp_path = None
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.npy.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, image)
+            os.replace(tmp_path, self.disk_dir / f"{key}.npy")
+            # Entries of edited sources are never read again; they age out here
+            prune_directory(self.disk_dir, self.disk_bytes, '*.npy')
+        except OSError as e:
+            print(f"⚠️  Could not write image cache entry: {e}")
+            if tmp_path:
+                Path(tmp_path).unlink(missing_ok=True)
+
+
+_default_cache = None
+
+
+def default_cache():
+    """
+    Process-wide cache, configured from the environment:
+    IMAGE_CACHE_MEMORY_MB (default 512), IMAGE_CACHE_DIR
+    (default ~/.cache/product-video-creator/canvases, empty to disable) and
+    IMAGE_CACHE_DISK_MB (default 2048)
+    """
+    global _default_cache
+
+    if _default_cache is None:
+        memory_mb = int(os.environ.get('IMAGE_CACHE_MEMORY_MB', DEFAULT_MEMORY_BYTES // (1024 * 1024)))
+        disk_dir = os.environ.get('IMAGE_CACHE_DIR', str(DEFAULT_DISK_DIR))
+        disk_mb = int(os.environ.get('IMAGE_CACHE_DISK_MB', DEFAULT_DISK_BYTES // (1024 * 1024)))
+        _default_cache = ImageCache(
+            memory_bytes=memory_mb * 1024 * 1024,
+            disk_dir=os.path.expanduser(disk_dir) if disk_dir else None,
+            disk_bytes=disk_mb * 1024 * 1024
+        )
+
+    return _default_cache
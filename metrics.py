@@ -0,0 +1,147 @@
+"""
+Render Instrumentation
+Per-stage timings, frame and byte counters and peak RSS for one render job.
+Code marks its stages with `with stage('decode'):`; timings only accumulate
+while a RenderMetrics is being recorded, so uninstrumented calls pay nothing
+beyond a context variable lookup.
+"""
+
+import json
+import resource
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+# Stages reported for every job, in pipeline order
+STAGES = ('discovery', 'decode', 'normalize', 'effect', 'overlay', 'frame_write', 'transcode', 'upload')
+
+_active = ContextVar('render_metrics', default=None)
+_DONE = object()
+
+
+class RenderMetrics:
+    """
+    Stage timings and counters for one render job
+    Stage times are exclusive: time spent in a nested stage (an overlay drawn
+    inside an effect) is only charged to the inner stage.
+    """
+
+    def __init__(self, job=None):
+        self.job = job
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(int)
+        self._started = time.perf_counter()
+        self._stack = []  # [stage name, time spent in nested stages]
+
+    def add(self, name, seconds):
+        """Charge time to a stage"""
+        self.stages[name] += seconds
+
+    def count(self, name, amount=1):
+        """Increment a counter (frames, bytes_written, ...)"""
+        self.counters[name] += amount
+
+    def merge(self, report):
+        """Fold in the report of a sub-job (e.g. a segment rendered in another process)"""
+        for name, seconds in report.get('stages', {}).items():
+            self.stages[name] += seconds
+        for name, amount in report.get('counters', {}).items():
+            self.counters[name] += amount
+
+    def report(self):
+        """JSON-serializable summary"""
+        stages = {name: round(self.stages.get(name, 0.0), 4) for name in STAGES}
+        stages.update({name: round(s, 4) for name, s in self.stages.items() if name not in stages})
+
+        return {
+            'job': self.job,
+            'wall_seconds': round(time.perf_counter() - self._started, 3),
+            'stages': stages,
+            'counters': dict(self.counters),
+            'peak_rss_mb': peak_rss_mb(),
+            'ffmpeg_peak_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+        }
+
+
+def active():
+    """The RenderMetrics being recorded in this context, if any"""
+    return _active.get()
+
+
+@contextmanager
+def recording(metrics):
+    """Record stages and counters into metrics for the duration of the block"""
+    token = _active.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Time the block as one stage of the active job"""
+    metrics = _active.get()
+    if metrics is None:
+        yield
+        return
+
+    entry = [name, 0.0]
+    metrics._stack.append(entry)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics._stack.pop()
+        metrics.add(name, elapsed - entry[1])
+        if metrics._stack:
+            metrics._stack[-1][1] += elapsed
+
+
+def count(name, amount=1):
+    """Increment a counter of the active job"""
+    metrics = _active.get()
+    if metrics is not None:
+        metrics.count(name, amount)
+
+
+def timed_frames(frames, name):
+    """Charge the time spent producing each frame of an iterator to a stage"""
+    frames = iter(frames)
+    while True:
+        with stage(name):
+            frame = next(frames, _DONE)
+        if frame is _DONE:
+            return
+        yield frame
+
+
+def with_upload(result, upload):
+    """Job result with a background upload's outcome and timing folded in"""
+    result = dict(result, file_id=upload.get('file_id'), upload_status=upload['status'])
+    if result.get('metrics'):
+        stages = dict(result['metrics']['stages'], upload=upload.get('seconds', 0.0))
+        result['metrics'] = dict(result['metrics'], stages=stages)
+    return result
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size so far (of this process, or its largest child)"""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def append_ledger(path, record):
+    """Append one record to a JSON-lines ledger"""
+    record = dict(record)
+    record.setdefault('timestamp', datetime.now(timezone.utc).isoformat(timespec='seconds'))
+
+    # One write per line, so concurrent appenders don't interleave records
+    with open(path, 'a') as f:
+        f.write(json.dumps(record, default=str) + '\n')
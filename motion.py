@@ -0,0 +1,105 @@
+"""
+Ken Burns Motion Engine
+Computes one crop window per frame and samples only the output pixels
+with a single sub-pixel affine warp
+"""
+
+import cv2
+import numpy as np
+
+# Pan directions supported by the Ken Burns effect
+PAN_DIRECTIONS = ['topleft', 'topright', 'bottomleft', 'bottomright', 'center']
+
+# Easing curves, keyed by the names used in video_config.json
+EASING_FUNCTIONS = {
+    'linear': lambda t: t,
+    'ease-in': lambda t: t * t,
+    'ease-out': lambda t: t * (2 - t),
+    'ease-in-out': lambda t: t * t * (3 - 2 * t),
+}
+
+
+def ease(progress, easing='linear'):
+    """Map linear progress (0-1) through an easing curve"""
+    if easing not in EASING_FUNCTIONS:
+        raise ValueError(f"Unknown easing: {easing}")
+    return EASING_FUNCTIONS[easing](progress)
+
+
+def pan_factors(progress, direction):
+    """
+    Position of the crop window inside the free space for a pan direction
+    Returns (fx, fy) where 0 is left/top and 1 is right/bottom
+    """
+    if direction == 'topleft':
+        return progress, progress * 0.5
+    elif direction == 'topright':
+        return 1 - progress, progress * 0.5
+    elif direction == 'bottomleft':
+        return progress, 1 - progress * 0.5
+    elif direction == 'bottomright':
+        return 1 - progress, 1 - progress * 0.5
+    # Straight pans used by video_spec.json timelines
+    elif direction == 'left_to_right':
+        return progress, 0.5
+    elif direction == 'right_to_left':
+        return 1 - progress, 0.5
+    elif direction == 'down':
+        return 0.5, progress
+    elif direction == 'up':
+        return 0.5, 1 - progress
+    else:  # center
+        return 0.5, 0.5
+
+
+def crop_window(w, h, zoom, progress, direction):
+    """Return the source crop window (x, y, width, height) in float pixels"""
+    crop_w = w / zoom
+    crop_h = h / zoom
+    fx, fy = pan_factors(progress, direction)
+    return (w - crop_w) * fx, (h - crop_h) * fy, crop_w, crop_h
+
+
+def window_matrix(window, out_w, out_h):
+    """Affine matrix mapping output pixel centers to source pixels"""
+    x, y, crop_w, crop_h = window
+    sx = crop_w / out_w
+    sy = crop_h / out_h
+
+    return np.array([
+        [sx, 0.0, x + 0.5 * sx - 0.5],
+        [0.0, sy, y + 0.5 * sy - 0.5]
+    ], dtype=np.float64)
+
+
+def plan_ken_burns(w, h, total_frames, start_zoom=1.0, end_zoom=1.3,
+                   direction='center', easing='linear'):
+    """Compute the crop window of every frame of a Ken Burns move"""
+    windows = []
+    for i in range(total_frames):
+        progress = ease(i / total_frames, easing)
+        zoom = start_zoom + (end_zoom - start_zoom) * progress
+        windows.append(crop_window(w, h, zoom, progress, direction))
+    return windows
+
+
+def render_window(image, window, out_size, interpolation=cv2.INTER_LINEAR):
+    """Sample one output frame of size (width, height) from a crop window"""
+    M = window_matrix(window, out_size[0], out_size[1])
+    return cv2.warpAffine(
+        image, M, out_size,
+        flags=interpolation | cv2.WARP_INVERSE_MAP,
+        borderMode=cv2.BORDER_REPLICATE
+    )
+
+
+def settings_from_config(config):
+    """Map the ken_burns_settings block of video_config.json to motion arguments"""
+    settings = config.get('ken_burns_settings', {})
+    start_zoom, end_zoom = settings.get('zoom_range', [1.0, 1.3])
+
+    return {
+        'start_zoom': start_zoom,
+        'end_zoom': end_zoom,
+        'easing': settings.get('easing', 'linear')
+    }
@@ -0,0 +1,184 @@
+"""
+Overlay Compositor
+Rasterizes each overlay once into a premultiplied sprite with its bounding
+box, so every frame only blends that box instead of copying, darkening and
+re-drawing text over the whole frame
+"""
+
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+
+class OverlaySprite:
+    """
+    A pre-rasterized overlay
+    Translucent boxes drawn first are kept as flat fills (one scale-and-offset
+    per box); everything else (text, shadows) is stored as per-pixel frame gain
+    and premultiplied color for its bounding box, so blending computes
+    frame * gain + color.
+    """
+
+    def __init__(self, fills, x, y, gain, color):
+        """fills: [((x1, y1, x2, y2), gain, (b, g, r))]; gain (h, w, 1) and color (h, w, 3) float32"""
+        self.fills = fills
+        self.x = x
+        self.y = y
+        self.height, self.width = gain.shape[:2]
+        self.gain = np.ascontiguousarray(np.repeat(gain, 3, axis=2))
+        # Fold the rounding offset in once so blending can truncate
+        self.color = color + np.float32(0.5)
+
+    @property
+    def box(self):
+        """Bounding box (x1, y1, x2, y2) of the per-pixel part in frame pixels"""
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+    def apply(self, frame):
+        """Blend the sprite into the frame in place; returns the frame"""
+        for (x1, y1, x2, y2), gain, offset in self.fills:
+            roi = frame[y1:y2, x1:x2]
+            if offset[0] == offset[1] == offset[2]:
+                roi[...] = cv2.convertScaleAbs(roi, alpha=gain, beta=offset[0])
+            else:
+                roi[...] = np.clip(roi * gain + np.array(offset) + 0.5, 0, 255)
+
+        if self.width and self.height:
+            x1, y1, x2, y2 = self.box
+            roi = frame[y1:y2, x1:x2]
+
+            # Scratch space per call: cached sprites are shared across threads
+            blended = cv2.multiply(roi, self.gain, dtype=cv2.CV_32F)
+            cv2.add(blended, self.color, dst=blended)
+            roi[...] = blended
+
+        return frame
+
+
+class SpriteBuilder:
+    """
+    Composes overlay layers (translucent boxes, anti-aliased text) into a
+    single OverlaySprite, in drawing order. Layers are only rasterized over
+    their joint bounding box, never the whole frame.
+    """
+
+    def __init__(self, width, height):
+        """Start an empty overlay for frames of width x height"""
+        self.width = width
+        self.height = height
+        self.fills = []
+        self.layers = []
+
+    def _clip_box(self, x1, y1, x2, y2):
+        """Clamp a box to the frame"""
+        return max(x1, 0), max(y1, 0), min(x2, self.width), min(y2, self.height)
+
+    def rectangle(self, pt1, pt2, color, alpha):
+        """Filled box blended at a constant opacity"""
+        box = self._clip_box(pt1[0], pt1[1], pt2[0] + 1, pt2[1] + 1)
+
+        if not self.layers:
+            # Nothing per-pixel underneath yet: keep it as a cheap flat fill
+            offset = tuple(float(c) * alpha for c in color)
+            self.fills.append((box, 1 - alpha, offset))
+        else:
+            self.layers.append(('rectangle', box, (pt1, pt2, color, alpha)))
+        return self
+
+    def text(self, text, org, font, font_scale, color, thickness):
+        """Anti-aliased text, same arguments as cv2.putText"""
+        (text_w, text_h), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+        margin = thickness + 2
+        box = self._clip_box(
+            org[0] - margin, org[1] - text_h - margin,
+            org[0] + text_w + margin, org[1] + baseline + margin
+        )
+        self.layers.append(('text', box, (text, org, font, font_scale, color, thickness)))
+        return self
+
+    def build(self):
+        """Rasterize the per-pixel layers over their bounding box and return the sprite"""
+        boxes = [box for _, box, _ in self.layers if box[2] > box[0] and box[3] > box[1]]
+        if boxes:
+            x1 = min(b[0] for b in boxes)
+            y1 = min(b[1] for b in boxes)
+            x2 = max(b[2] for b in boxes)
+            y2 = max(b[3] for b in boxes)
+        else:
+            x1 = y1 = x2 = y2 = 0
+
+        gain = np.ones((y2 - y1, x2 - x1, 1), dtype=np.float32)
+        color = np.zeros((y2 - y1, x2 - x1, 3), dtype=np.float32)
+
+        for kind, _, args in self.layers:
+            if kind == 'rectangle':
+                (px1, py1), (px2, py2), layer_color, alpha = args
+                mask = np.zeros(gain.shape[:2], dtype=np.float32)
+                cv2.rectangle(mask, (px1 - x1, py1 - y1), (px2 - x1, py2 - y1), 1.0, -1)
+                mask *= alpha
+            else:
+                text, org, font, font_scale, layer_color, thickness = args
+                mask = np.zeros(gain.shape[:2], dtype=np.uint8)
+                cv2.putText(mask, text, (org[0] - x1, org[1] - y1),
+                            font, font_scale, 255, thickness, cv2.LINE_AA)
+                mask = mask.astype(np.float32) / 255
+
+            # Lay this layer's coverage and color on top
+            alpha = mask[..., None]
+            gain *= 1 - alpha
+            color *= 1 - alpha
+            color += alpha * np.asarray(layer_color, dtype=np.float32)
+
+        return OverlaySprite(self.fills, x1, y1, gain, color)
+
+
+def scaled(pixels, scale):
+    """A pixel size laid out for 1080p, at another render scale (never below 1)"""
+    return max(1, round(pixels * scale))
+
+
+def text_region(position, w, h):
+    """Baseline y and the (x1, y1, x2, y2) region behind a text overlay position"""
+    if position == 'top':
+        return h // 6, (0, 0, w, h//3)
+    elif position == 'bottom':
+        return 5 * h // 6, (0, 2*h//3, w, h)
+    else:  # center
+        return h // 2, (0, h//3, w, 2*h//3)
+
+
+@lru_cache(maxsize=64)
+def text_overlay_sprite(text, position, font_scale, text_color, w, h, scale=1.0):
+    """
+    Rasterize a caption once: translucent box, shadow and text
+    position: 'top', 'center', 'bottom'
+    scale: render scale relative to 1080p (font, stroke and shadow shrink with it)
+    """
+    text_y, _ = text_region(position, w, h)
+    sprite = SpriteBuilder(w, h)
+
+    # Add semi-transparent background for better readability
+    if position == 'top':
+        sprite.rectangle((0, 0), (w, h//4), (0, 0, 0), 0.4)
+    elif position == 'bottom':
+        sprite.rectangle((0, 3*h//4), (w, h), (0, 0, 0), 0.4)
+    else:
+        sprite.rectangle((w//6, h//3), (5*w//6, 2*h//3), (0, 0, 0), 0.3)
+
+    # Add text
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    font_scale *= scale
+    thickness = scaled(3, scale)
+    text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
+    text_x = (w - text_size[0]) // 2
+
+    # Add shadow for depth
+    shadow_offset = scaled(3, scale)
+    sprite.text(text, (text_x + shadow_offset, text_y + shadow_offset),
+                font, font_scale, (0, 0, 0), thickness)
+
+    # Add main text
+    sprite.text(text, (text_x, text_y), font, font_scale, text_color, thickness)
+
+    return sprite.build()
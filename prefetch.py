@@ -0,0 +1,64 @@
+"""
+Background Decode Prefetch
+Loads the sources a render will need next on a small thread pool while the
+current one renders, so disk reads and JPEG decoding (slow on network
+shares) overlap with rendering instead of adding to it. The look-ahead is
+bounded, which keeps the number of decoded images in memory predictable.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import RenderMetrics, active, recording, stage
+
+_DONE = object()
+
+
+def _load(load, item, instrument):
+    """Thread entry point: load one item, recording its stages separately"""
+    metrics = RenderMetrics() if instrument else None
+    with recording(metrics):
+        result = load(item)
+    return result, metrics.report() if metrics else None
+
+
+def prefetch(items, load, lookahead=2, workers=None):
+    """
+    Yield load(item) for every item, in order, while up to `lookahead` of
+    the following items load on background threads
+    lookahead=0 loads each item when it is reached, on the calling thread.
+    Stage timings of the loads are merged into the caller's RenderMetrics;
+    time spent waiting for a load that isn't ready yet is charged to
+    'decode_wait'.
+    """
+    if lookahead <= 0:
+        for item in items:
+            yield load(item)
+        return
+
+    metrics = active()
+    upcoming = iter(items)
+    pending = deque()
+    pool = ThreadPoolExecutor(max_workers=workers or lookahead, thread_name_prefix='prefetch')
+
+    def top_up(limit):
+        while len(pending) < limit:
+            item = next(upcoming, _DONE)
+            if item is _DONE:
+                return
+            pending.append(pool.submit(_load, load, item, metrics is not None))
+
+    try:
+        top_up(lookahead + 1)
+        while pending:
+            future = pending.popleft()
+            top_up(lookahead)
+
+            with stage('decode_wait'):
+                result, report = future.result()
+            if report:
+                metrics.merge(report)
+            yield result
+    finally:
+        # Stopped early: drop loads that haven't started
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,21 @@
+"""
+Preview Renders
+Settings of the quick low-resolution proxies both pipelines can render
+instead of the final video: same timing and layout, a fraction of the pixels,
+a lower frame rate and the fastest encoder preset
+"""
+
+# Fraction of the final width and height
+PREVIEW_SCALE = 0.25
+
+PREVIEW_FPS = 10
+PREVIEW_PRESET = 'ultrafast'
+
+# Appended to the video name, so proxies never replace a final render
+PREVIEW_SUFFIX = '_preview'
+
+
+def preview_size(size):
+    """Preview (width, height) for a final render size; libx264 needs even dimensions"""
+    width, height = size
+    return int(width * PREVIEW_SCALE) // 2 * 2, int(height * PREVIEW_SCALE) // 2 * 2
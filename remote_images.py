@@ -0,0 +1,167 @@
+"""
+Remote Image Fetching
+Downloads artwork images from http(s) URLs (our image CDN) through one pooled
+keep-alive session with a bounded number of connections. Downloaded bytes are
+kept on disk with their ETag/Last-Modified validators, so a repeated render
+only asks the server whether the image changed and never downloads it twice.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from image_cache import prune_directory, touch
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_TIMEOUT = 30  # seconds
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "product-video-creator" / "downloads"
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def is_remote(url):
+    """True for http(s) URLs"""
+    return isinstance(url, str) and url.lower().startswith(('http://', 'https://'))
+
+
+class RemoteImageFetcher:
+    """
+    Pooled, cached HTTP downloads shared by every render thread
+    At most max_connections requests are in flight at once; further callers
+    wait for a free connection.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_connections=DEFAULT_CONNECTIONS,
+                 timeout=DEFAULT_TIMEOUT, cache_bytes=DEFAULT_CACHE_BYTES):
+        """cache_bytes: size budget of the downloaded images, least recently used pruned first"""
+        self.cache_dir = Path(cache_dir)
+        self.cache_bytes = cache_bytes
+        self.max_connections = max_connections
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._session = None
+
+        self.stats = {'downloads': 0, 'revalidated': 0, 'stale': 0}
+
+    def session(self):
+        """The keep-alive session, created on first use"""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.max_connections,
+                                      pool_maxsize=self.max_connections)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    def cache_paths(self, url):
+        """(image bytes, validators) files for a URL"""
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return self.cache_dir / f"{key}.img", self.cache_dir / f"{key}.json"
+
+    def fetch(self, url):
+        """
+        Local path of the image at url, downloading it only if it isn't cached
+        or the server says it changed
+        If the server can't be reached, a cached copy is used as is.
+        """
+        import requests
+
+        data_path, meta_path = self.cache_paths(url)
+        meta = self._read_meta(meta_path) if data_path.exists() else None
+
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            with self._slots:
+                response = self.session().get(url, headers=headers, timeout=self.timeout)
+                if response.status_code == 304 and meta:
+                    self._count('revalidated')
+                    touch(data_path)
+                    return data_path
+                response.raise_for_status()
+                content = response.content
+        except requests.RequestException:
+            if meta:
+                self._count('stale')
+                return data_path
+            raise
+
+        self._store(data_path, meta_path, content, {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        })
+        self._count('downloads')
+        return data_path
+
+    def close(self):
+        """Close the pooled connections"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _read_meta(meta_path):
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, data_path, meta_path, content, meta):
+        """Write bytes, then validators, each atomically"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        tmp_path = data_path.with_name(data_path.name + suffix)
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, data_path)
+
+        tmp_path = meta_path.with_name(meta_path.name + suffix)
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, meta_path)
+
+        for removed in prune_directory(self.cache_dir, self.cache_bytes, '*.img'):
+            removed.with_suffix('.json').unlink(missing_ok=True)
+
+
+def default_fetcher():
+    """
+    Process-wide fetcher, configured from the environment:
+    DOWNLOAD_CONNECTIONS (default 4), DOWNLOAD_CACHE_DIR
+    (default ~/.cache/product-video-creator/downloads) and DOWNLOAD_CACHE_MB
+    (default 1024)
+    """
+    global _default_fetcher
+
+    with _default_lock:
+        if _default_fetcher is None:
+            cache_dir = os.environ.get('DOWNLOAD_CACHE_DIR') or str(DEFAULT_CACHE_DIR)
+            cache_mb = int(os.environ.get('DOWNLOAD_CACHE_MB', DEFAULT_CACHE_BYTES // (1024 * 1024)))
+            _default_fetcher = RemoteImageFetcher(
+                cache_dir=os.path.expanduser(cache_dir),
+                max_connections=int(os.environ.get('DOWNLOAD_CONNECTIONS', DEFAULT_CONNECTIONS)),
+                cache_bytes=cache_mb * 1024 * 1024
+            )
+        return _default_fetcher
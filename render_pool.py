@@ -0,0 +1,138 @@
+"""
+Render Pool
+Runs one job per SKU across a bounded set of worker processes, so a
+crash while rendering one SKU cannot take down the rest of the batch
+"""
+
+import fcntl
+import multiprocessing
+import os
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from multiprocessing.connection import wait
+from pathlib import Path
+
+# Workers start from a fresh interpreter (forkserver, or spawn where that's
+# unavailable) rather than a fork: the parent runs upload threads while it
+# dispatches SKUs, and a forked child would inherit any lock they hold
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def failed_result(sku, error):
+    """Result dict for a SKU whose job raised or crashed"""
+    return {'sku': sku, 'status': 'failed', 'error': error}
+
+
+def _run_job(worker, sku, conn):
+    """Worker process entry point: run the job and send its result to the parent"""
+    try:
+        result = worker(sku)
+    except Exception as e:
+        traceback.print_exc()
+        result = failed_result(sku, f"{type(e).__name__}: {e}")
+
+    conn.send(result)
+    conn.close()
+
+
+def run_sku_jobs(skus, worker, jobs=1):
+    """
+    Run worker(sku) once for every unique SKU, yielding result dicts as they finish
+    worker must be a module-level function (or a partial of one) returning a picklable dict with
+    'sku' and 'status' keys. jobs=1 runs everything in this process.
+    """
+    # Each SKU is dispatched exactly once, so two workers never render the same SKU
+    pending = deque(dict.fromkeys(skus))
+
+    if jobs <= 1:
+        while pending:
+            sku = pending.popleft()
+            try:
+                yield worker(sku)
+            except Exception as e:
+                traceback.print_exc()
+                yield failed_result(sku, f"{type(e).__name__}: {e}")
+        return
+
+    ctx = multiprocessing.get_context(START_METHOD)
+    running = {}  # result pipe -> (process, sku)
+
+    while pending or running:
+        # Keep up to `jobs` worker processes busy
+        while pending and len(running) < jobs:
+            sku = pending.popleft()
+            recv_conn, send_conn = ctx.Pipe(duplex=False)
+            process = ctx.Process(
+                target=_run_job,
+                args=(worker, sku, send_conn),
+                name=f"render-{sku}"
+            )
+            process.start()
+            send_conn.close()
+            running[recv_conn] = (process, sku)
+
+        # Read results as soon as they arrive: a worker whose result is bigger
+        # than the pipe buffer can't exit until it's drained. The sentinels
+        # only catch workers that died without sending anything.
+        sentinels = {process.sentinel: recv_conn for recv_conn, (process, _) in running.items()}
+        ready = wait(list(running) + list(sentinels))
+
+        for recv_conn in dict.fromkeys(sentinels.get(obj, obj) for obj in ready):
+            process, sku = running.pop(recv_conn)
+
+            result = None
+            try:
+                if recv_conn.poll():
+                    result = recv_conn.recv()
+            except (EOFError, OSError):
+                pass
+            recv_conn.close()
+            process.join()
+
+            if result is None:
+                # The worker died before reporting (segfault, OOM kill, ...)
+                result = failed_result(sku, f"worker crashed (exit code {process.exitcode})")
+
+            yield result
+
+
+@contextmanager
+def sku_lock(lock_dir, sku):
+    """
+    Hold an exclusive lock on a SKU while it renders
+    Yields False if another process already holds it. The lock is an
+    flock on {sku}.lock, so the kernel releases it when its holder exits,
+    however that happens: a crashed run never leaves a stale lock behind.
+    """
+    lock_dir = Path(lock_dir)
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    lock_path = lock_dir / f"{sku}.lock"
+
+    while True:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            yield False
+            return
+
+        # The previous holder unlinks the file on release; if it did so after
+        # we opened it, our lock is on a file nobody else will see
+        try:
+            if os.stat(lock_path).st_ino == os.fstat(fd).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+    # The owner's pid, for anyone inspecting a long-held lock
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+
+    try:
+        yield True
+    finally:
+        lock_path.unlink(missing_ok=True)
+        os.close(fd)
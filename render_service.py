@@ -0,0 +1,360 @@
+"""
+Warm Render Service
+A resident render daemon with a small local HTTP API. Imports, rasterized
+overlays, the image cache and the download pool stay warm between jobs, so
+a request only pays for its own render. Jobs go into a queue and get an id
+straight away; clients poll GET /jobs/{id} or pass a callback_url that is
+POSTed the finished job.
+
+    POST /jobs            {"artwork": {...}, "image_path": ..., "preview": false,
+                           "callback_url": ...}  -> 202 {"id": ..., "status": "queued"}
+    GET  /jobs            queued and running jobs, and the most recent finished ones
+    GET  /jobs/{id}       queued | rendering | done | failed, with the video data
+    GET  /videos/{name}   rendered videos, posters and storyboards
+    GET  /health
+
+It listens on loopback by default. Listening on another address needs
+--allow-remote and an --image-root that image paths must stay inside;
+callbacks then only go to --callback-hosts.
+"""
+
+import argparse
+import ipaddress
+import json
+import os
+import queue
+import threading
+import urllib.request
+import urllib.parse
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 1
+
+# Finished jobs remembered for status queries; older ones are forgotten
+DEFAULT_MAX_FINISHED = 1000
+
+CALLBACK_TIMEOUT = 10  # seconds
+
+CONTENT_TYPES = {
+    '.mp4': 'video/mp4',
+    '.jpg': 'image/jpeg',
+    '.vtt': 'text/vtt',
+}
+
+
+def is_loopback(host):
+    """True for addresses only this machine can connect to"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class RenderService:
+    """
+    Job queue in front of long-lived ArtworkVideoGenerators
+    workers: jobs rendered at once (each render already keeps a core busy
+    encoding, so one is usually right)
+    max_finished: done and failed jobs kept for status queries, oldest
+    dropped first
+    image_root: when set, image_path must be inside this directory
+    callback_hosts: when set, callback URLs must point at one of these hosts
+    """
+
+    def __init__(self, output_dir="videos", workers=DEFAULT_WORKERS,
+                 max_finished=DEFAULT_MAX_FINISHED, image_root=None, callback_hosts=None):
+        self.output_dir = Path(output_dir)
+        self.workers = workers
+        self.max_finished = max_finished
+        self.image_root = Path(image_root).resolve() if image_root else None
+        self.callback_hosts = set(callback_hosts) if callback_hosts is not None else None
+
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._finished = {}  # job id -> Event set once it's done or failed
+        self._lock = threading.Lock()
+        self._generators = {}
+        self._threads = []
+
+    def generator(self, preview=False):
+        """The warm generator for full renders or previews, created once"""
+        with self._lock:
+            if preview not in self._generators:
+                from video_generator import ArtworkVideoGenerator
+                self._generators[preview] = ArtworkVideoGenerator(self.output_dir, preview=preview)
+            return self._generators[preview]
+
+    def start(self):
+        """Load the renderer and start the worker threads"""
+        self.generator()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"render-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Finish the job in progress on each worker, then stop"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, artwork, image_path=None, preview=False, callback_url=None):
+        """Queue a render; returns the new job (ValueError if check() refuses it)"""
+        self.check(image_path, callback_url)
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'status': 'queued',
+            'sku': artwork.get('sku'),
+            'image_path': image_path,
+            'preview': bool(preview),
+            'callback_url': callback_url,
+            'submitted': datetime.now().isoformat(timespec='seconds'),
+        }
+        with self._lock:
+            self._jobs[job['id']] = job
+            self._finished[job['id']] = threading.Event()
+        self._queue.put((job['id'], artwork))
+        return dict(job)
+
+    def check(self, image_path=None, callback_url=None):
+        """Raise ValueError unless the image path and callback URL are allowed"""
+        if (image_path and self.image_root
+                and not Path(image_path).resolve().is_relative_to(self.image_root)):
+            raise ValueError("'image_path' must be inside the service's image root")
+
+        if callback_url:
+            url = urllib.parse.urlparse(callback_url)
+            if url.scheme not in ('http', 'https'):
+                raise ValueError("'callback_url' must be an http(s) URL")
+            if self.callback_hosts is not None and url.hostname not in self.callback_hosts:
+                raise ValueError("'callback_url' host is not allowed")
+
+    def status(self, job_id):
+        """A copy of the job, or None if this service never saw it"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def jobs(self):
+        """Copies of every job, oldest first"""
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()]
+
+    def wait(self, job_id, timeout=None):
+        """Block until a job is done or failed (or timeout seconds pass); returns the job"""
+        with self._lock:
+            finished = self._finished.get(job_id)
+        if finished:
+            finished.wait(timeout)
+        return self.status(job_id)
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            self._jobs[job_id].update(changes)
+            return dict(self._jobs[job_id])
+
+    def _finish(self, job_id):
+        """Wake waiters on a job, then drop the oldest finished jobs beyond max_finished"""
+        with self._lock:
+            self._finished[job_id].set()
+            finished = [job_id for job_id, event in self._finished.items() if event.is_set()]
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job_id]
+                del self._finished[job_id]
+
+    def _work(self):
+        """Worker thread: render queued jobs one at a time"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            job_id, artwork = item
+            job = self._update(job_id, status='rendering', started=datetime.now().isoformat(timespec='seconds'))
+            print(f"🎬 Rendering job {job_id} ({job['sku'] or 'unknown SKU'})")
+
+            try:
+                video = self.generator(job['preview']).create_video_from_artwork(
+                    job['image_path'], artwork, job_id=job_id
+                )
+            except Exception as e:
+                video = {'status': 'pending_generation', 'error': f"{type(e).__name__}: {e}"}
+
+            finished = datetime.now().isoformat(timespec='seconds')
+            if video.get('status') == 'pending_generation':
+                job = self._update(job_id, status='failed', finished=finished,
+                                   error=video.get('error', 'render failed'))
+                print(f"❌ Job {job_id} failed: {job['error']}")
+            else:
+                job = self._update(job_id, status='done', finished=finished, video=video)
+                print(f"✅ Job {job_id} done: {video['url']}")
+
+            self._finish(job_id)
+
+            if job['callback_url']:
+                notify(job['callback_url'], job)
+
+
+def notify(callback_url, job):
+    """POST the finished job to its callback URL; failures are only logged"""
+    request = urllib.request.Request(
+        callback_url, data=json.dumps(job, default=str).encode(),
+        headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=CALLBACK_TIMEOUT):
+            pass
+    except OSError as e:
+        print(f"⚠️  Callback for job {job['id']} failed: {e}")
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a RenderService (server.service)"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        service = self.server.service
+        path = self.path.split('?', 1)[0].rstrip('/')
+
+        if path == '/health':
+            self.send_json(200, {'status': 'ok', 'jobs': len(service.jobs())})
+        elif path == '/jobs':
+            self.send_json(200, service.jobs())
+        elif path.startswith('/jobs/'):
+            job = service.status(path[len('/jobs/'):])
+            if job:
+                self.send_json(200, job)
+            else:
+                self.send_json(404, {'error': 'unknown job'})
+        elif path.startswith('/videos/'):
+            self.send_video(path[len('/videos/'):])
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            self.send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self.send_json(400, {'error': 'body must be JSON'})
+            return
+
+        artwork = body.get('artwork') if isinstance(body, dict) else None
+        if not isinstance(artwork, dict):
+            self.send_json(400, {'error': "'artwork' object is required"})
+            return
+        if not body.get('image_path') and not artwork.get('imageUrl'):
+            self.send_json(400, {'error': "'image_path' or artwork 'imageUrl' is required"})
+            return
+
+        try:
+            job = self.server.service.submit(
+                artwork, image_path=body.get('image_path'), preview=body.get('preview', False),
+                callback_url=body.get('callback_url')
+            )
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(202, dict(job, status_url=f"/jobs/{job['id']}"))
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_video(self, name):
+        """A file from the output directory (no subdirectories)"""
+        path = self.server.service.output_dir / name
+        if not name or Path(name).name != name or not path.is_file():
+            self.send_json(404, {'error': 'not found'})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES.get(path.suffix, 'application/octet-stream'))
+        self.send_header('Content-Length', str(path.stat().st_size))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            while chunk := f.read(1024 * 1024):
+                self.wfile.write(chunk)
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """HTTP server for a started RenderService (port 0 picks a free port)"""
+    server = ThreadingHTTPServer((host, port), RenderRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(output_dir="videos", host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS,
+          max_finished=DEFAULT_MAX_FINISHED, allow_remote=False, image_root=None,
+          callback_hosts=None):
+    """
+    Run the render service until interrupted
+    Other machines can reach a non-loopback host, so that needs allow_remote
+    and an image_root, and callbacks only go to callback_hosts (none by default)
+    """
+    if not is_loopback(host):
+        if not allow_remote:
+            raise SystemExit(f"❌ Refusing to listen on {host}: pass --allow-remote to accept jobs "
+                             "from other machines")
+        if not image_root:
+            raise SystemExit("❌ --allow-remote needs --image-root, the directory image paths "
+                             "must be inside")
+        callback_hosts = callback_hosts or ()
+
+    service = RenderService(output_dir, workers=workers, max_finished=max_finished,
+                            image_root=image_root, callback_hosts=callback_hosts).start()
+    server = make_server(service, host, port)
+    print(f"🚀 Render service listening on http://{host}:{server.server_port} ({workers} worker(s))")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Shutting down...")
+    finally:
+        server.server_close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resident artwork video render service")
+    parser.add_argument('--host', default=os.environ.get('RENDER_SERVICE_HOST', DEFAULT_HOST))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('RENDER_SERVICE_PORT', DEFAULT_PORT)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('RENDER_SERVICE_WORKERS', DEFAULT_WORKERS)),
+                        help="jobs rendered at once")
+    parser.add_argument('--max-finished', type=int,
+                        default=int(os.environ.get('RENDER_SERVICE_MAX_FINISHED', DEFAULT_MAX_FINISHED)),
+                        help="finished jobs remembered for status queries")
+    parser.add_argument('--output-dir', default="videos", help="where videos are written and served from")
+    parser.add_argument('--allow-remote', action='store_true',
+                        help="allow listening on a non-loopback --host (needs --image-root)")
+    parser.add_argument('--image-root', default=os.environ.get('RENDER_SERVICE_IMAGE_ROOT') or None,
+                        help="directory every job's image_path must be inside")
+    parser.add_argument('--callback-hosts', type=lambda s: [h for h in s.split(',') if h],
+                        default=os.environ.get('RENDER_SERVICE_CALLBACK_HOSTS') or None,
+                        help="comma-separated hosts callback URLs may point at "
+                             "(default: any on loopback, none otherwise)")
+    args = parser.parse_args()
+
+    serve(args.output_dir, args.host, args.port, args.workers, args.max_finished,
+          args.allow_remote, args.image_root, args.callback_hosts)
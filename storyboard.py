@@ -0,0 +1,120 @@
+"""
+Poster Frames and Storyboards
+Taps a render's own frame stream on its way to the encoder: keeps one frame
+as the poster image and a small tile of every N-th frame for a scrubbing
+storyboard (a sprite sheet plus a WebVTT index), so listing previews never
+have to decode the finished MP4 again
+"""
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from metrics import stage
+
+# Storyboard tile width in pixels (height follows the video's aspect ratio)
+TILE_WIDTH = 160
+
+# Tiles per sprite sheet row
+COLUMNS = 10
+
+JPEG_QUALITY = 85
+
+
+def vtt_timestamp(seconds):
+    """WebVTT cue time, HH:MM:SS.mmm"""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+class StoryboardTap:
+    """
+    Collects a poster frame and storyboard tiles from frames as they stream by
+    every: frames between storyboard tiles (default: one every 2 seconds)
+    poster_frame: index of the frame kept as the poster (the first frame is
+    used if the video turns out shorter)
+    """
+
+    def __init__(self, fps, every=None, poster_frame=0, tile_width=TILE_WIDTH, columns=COLUMNS):
+        self.fps = fps
+        self.every = every or 2 * fps
+        self.poster_frame = poster_frame
+        self.tile_width = tile_width
+        self.columns = columns
+        self.frames_seen = 0
+        self.poster = None
+        self.tiles = []
+
+    def tap(self, frames):
+        """Pass frames through unchanged, observing each one"""
+        for frame in frames:
+            self.observe(frame)
+            yield frame
+
+    def observe(self, frame):
+        """Look at the next frame of the video"""
+        i = self.frames_seen
+        self.frames_seen += 1
+
+        # Frames may be reused buffers, so keep copies
+        with stage('storyboard'):
+            if i == self.poster_frame or i == 0:
+                self.poster = frame.copy()
+            if i % self.every == 0:
+                h, w = frame.shape[:2]
+                size = (self.tile_width, max(1, round(self.tile_width * h / w)))
+                self.tiles.append(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+
+    def sprite_sheet(self):
+        """All tiles on one image, left to right, top to bottom"""
+        tile_h, tile_w = self.tiles[0].shape[:2]
+        columns = min(self.columns, len(self.tiles))
+        rows = -(-len(self.tiles) // columns)
+
+        sheet = np.zeros((rows * tile_h, columns * tile_w, 3), dtype=np.uint8)
+        for i, tile in enumerate(self.tiles):
+            row, col = divmod(i, columns)
+            sheet[row * tile_h:(row + 1) * tile_h, col * tile_w:(col + 1) * tile_w] = tile
+        return sheet
+
+    def webvtt(self, sprite_name):
+        """WebVTT index mapping each stretch of the video to its tile in the sprite sheet"""
+        tile_h, tile_w = self.tiles[0].shape[:2]
+        columns = min(self.columns, len(self.tiles))
+        duration = self.frames_seen / self.fps
+        lines = ["WEBVTT", ""]
+
+        for i in range(len(self.tiles)):
+            start = i * self.every / self.fps
+            end = min((i + 1) * self.every / self.fps, duration)
+            row, col = divmod(i, columns)
+            lines.append(f"{vtt_timestamp(start)} --> {vtt_timestamp(end)}")
+            lines.append(f"{sprite_name}#xywh={col * tile_w},{row * tile_h},{tile_w},{tile_h}")
+            lines.append("")
+
+        return "\n".join(lines)
+
+    def write(self, video_path):
+        """
+        Write {stem}_poster.jpg, {stem}_storyboard.jpg and {stem}_storyboard.vtt
+        next to the video; returns their paths, or {} if no frames went by
+        """
+        if not self.tiles:
+            return {}
+
+        video_path = Path(video_path)
+        poster = video_path.with_name(f"{video_path.stem}_poster.jpg")
+        sprite = video_path.with_name(f"{video_path.stem}_storyboard.jpg")
+        index = video_path.with_name(f"{video_path.stem}_storyboard.vtt")
+        params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]
+
+        with stage('storyboard'):
+            cv2.imwrite(str(poster), self.poster, params)
+            cv2.imwrite(str(sprite), self.sprite_sheet(), params)
+            index.write_text(self.webvtt(sprite.name))
+
+        return {'poster': poster, 'storyboard': sprite, 'storyboard_vtt': index}
@@ -0,0 +1,70 @@
+"""
+Tests for the rendering benchmark suite
+"""
+import json
+
+import numpy as np
+import pytest
+
+import benchmark
+from benchmark import (
+    benchmark_cases, cold_import, parse_size, run_benchmarks, summarize, synthetic_artwork
+)
+
+
+class TestBenchmark:
+    """Benchmark harness"""
+
+    def test_synthetic_artwork_is_deterministic(self):
+        """The same size always produces the same test image"""
+        a = synthetic_artwork(320, 200)
+        assert a.shape == (200, 320, 3)
+        assert np.array_equal(a, synthetic_artwork(320, 200))
+
+    def test_summary(self):
+        """fps and latency percentiles from per-frame timings"""
+        result = summarize('case', (800, 400), [0.01] * 9 + [0.1], peak_bytes=2 * 1024 * 1024)
+        assert result['frames'] == 10
+        assert result['fps'] == pytest.approx(10 / 0.19, rel=1e-3)
+        assert result['latency_ms']['p50'] == pytest.approx(10)
+        assert result['latency_ms']['max'] == pytest.approx(100)
+        assert result['peak_mb'] == 2
+
+    def test_parse_size(self):
+        """Sizes are given as WIDTHxHEIGHT"""
+        assert parse_size("6000x5000") == (6000, 5000)
+
+    def test_run_writes_json_results(self, tmp_path):
+        """A filtered run reports every matching case as JSON-serializable results"""
+        report = run_benchmarks(sizes=[(320, 200)], seconds=1, match='apply_effect:zoom_detail')
+
+        cases = [r['case'] for r in report['results']]
+        assert cases == [
+            'apply_effect:zoom_detail_topleft',
+            'apply_effect:zoom_detail_center',
+            'apply_effect:zoom_detail_bottomright',
+        ]
+        assert all(r['frames'] == 30 and r['fps'] > 0 and 'peak_mb' in r for r in report['results'])
+        assert report['meta']['effect_input'] == 'canvas'
+        json.dumps(report)
+
+    def test_inputs_are_built_per_case(self, tmp_path, monkeypatch):
+        """Listing the cases prepares nothing; the encoder's frames are only rendered for it"""
+        rendered = []
+        ken_burns = benchmark.cpv.apply_ken_burns_effect
+        monkeypatch.setattr(benchmark.cpv, 'apply_ken_burns_effect',
+                            lambda *args, **kwargs: rendered.append(1) or ken_burns(*args, **kwargs))
+
+        cases = dict(benchmark_cases(synthetic_artwork(320, 200), 1, tmp_path))
+        list(cases['add_text_overlay']())
+        assert rendered == []
+
+        list(cases['apply_ken_burns_effect']())
+        assert rendered == [1]
+
+    def test_cold_import_defers_integrations(self):
+        """Importing the render entry point loads no Google or pandas modules"""
+        result = cold_import('create_product_videos', runs=1)
+
+        assert result['deferred_loaded'] == []
+        assert result['seconds'] > 0
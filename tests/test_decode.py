@@ -0,0 +1,77 @@
+"""
+Tests for reduced-resolution source decoding
+"""
+import cv2
+import numpy as np
+import pytest
+
+from decode import MAX_ZOOM, imread_for_size, imread_for_sizes, reduction_factor, source_size
+
+
+class TestReductionFactor:
+    """The largest downscale that still covers the target"""
+
+    @pytest.mark.parametrize("source, target, factor", [
+        ((6000, 4000), (480, 270), 8),
+        ((1920, 1080), (480, 270), 4),
+        ((1920, 1080), (960, 540), 2),
+        ((1920, 1080), (1920, 1080), 1),
+        ((800, 400), (1920, 1080), 1),
+        # Tall source: the height limits the fit
+        ((1000, 4000), (480, 270), 8),
+    ])
+    def test_factor(self, source, target, factor):
+        assert reduction_factor(source, target) == factor
+
+    @pytest.mark.parametrize("source, factor", [
+        # An 8000px scan into 1080p: 1/4 would be 2000px, short of 1920 x 1.3
+        ((8000, 4500), 2),
+        ((4000, 2250), 1),
+        ((16000, 9000), 4),
+    ])
+    def test_zoom_headroom(self, source, factor):
+        """The decode still covers the target once zoomed in all the way"""
+        assert reduction_factor(source, (1920, 1080), zoom=MAX_ZOOM) == factor
+
+
+class TestImreadForSize:
+    """Decoding straight to a smaller image"""
+
+    def test_reduced_jpeg_still_covers_target(self, tmp_path):
+        """A large JPEG comes back smaller, but never smaller than the fitted target"""
+        path = tmp_path / "art.jpg"
+        img = np.random.default_rng(0).integers(0, 255, (1200, 1600, 3), dtype=np.uint8)
+        cv2.imwrite(str(path), img)
+
+        assert source_size(path) == (1600, 1200)
+        reduced = imread_for_size(path, (480, 270), zoom=1.0)
+
+        assert reduced.shape == (300, 400, 3)
+        assert reduced.shape[0] >= 270
+
+    def test_zoom_headroom(self, tmp_path):
+        """By default the decode leaves room for the deepest Ken Burns zoom"""
+        path = tmp_path / "art.jpg"
+        cv2.imwrite(str(path), np.zeros((1200, 1600, 3), dtype=np.uint8))
+
+        reduced = imread_for_size(path, (480, 270))
+
+        assert reduced.shape == (600, 800, 3)
+        assert reduced.shape[0] >= 270 * MAX_ZOOM
+
+    def test_shared_decode_covers_largest_target(self, tmp_path):
+        """One decode for several renditions is reduced only as far as the largest allows"""
+        path = tmp_path / "art.jpg"
+        cv2.imwrite(str(path), np.zeros((4000, 4000, 3), dtype=np.uint8))
+
+        reduced = imread_for_sizes(path, [(480, 270), (1080, 1920)], zoom=1.0)
+
+        assert reduced.shape == (2000, 2000, 3)
+
+    def test_unreadable_file(self, tmp_path):
+        """Files that aren't images decode to None like cv2.imread"""
+        path = tmp_path / "notes.jpg"
+        path.write_bytes(b"not an image")
+
+        assert source_size(path) is None
+        assert imread_for_size(path, (480, 270)) is None
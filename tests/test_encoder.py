@@ -0,0 +1,214 @@
+"""
+Tests for the ffmpeg pipe encoder
+"""
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import cv2
+import numpy as np
+import pytest
+
+from encoder import FFmpegWriter, encode_still, held_frames, render_segments, write_streams
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+
+
+def make_frames(count, size=(320, 180)):
+    """Synthetic BGR frames with a moving bar"""
+    w, h = size
+    for i in range(count):
+        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        frame[:, (i * 8) % w:(i * 8) % w + 16] = (0, 200, 255)
+        yield frame
+
+
+@requires_ffmpeg
+class TestFFmpegWriter:
+    """Single-pass H.264 encoding over stdin"""
+
+    def test_encodes_all_frames(self, tmp_path):
+        """Every frame piped in ends up in the output file"""
+        output = tmp_path / "out.mp4"
+        with FFmpegWriter(output, 30, (320, 180)) as out:
+            for frame in make_frames(15):
+                out.write(frame)
+
+        assert out.frames_written == 15
+        cap = cv2.VideoCapture(str(output))
+        assert int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) == 320
+        assert int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) == 180
+        decoded = 0
+        while cap.read()[0]:
+            decoded += 1
+        cap.release()
+        assert decoded == 15
+
+    def test_faststart(self, tmp_path):
+        """moov atom is written before the media data"""
+        output = tmp_path / "out.mp4"
+        with FFmpegWriter(output, 30, (320, 180)) as out:
+            for frame in make_frames(5):
+                out.write(frame)
+
+        data = output.read_bytes()
+        assert data.index(b'moov') < data.index(b'mdat')
+
+    def test_rejects_wrong_frame_size(self, tmp_path):
+        """Frames must match the configured size"""
+        output = tmp_path / "out.mp4"
+        with pytest.raises(ValueError):
+            with FFmpegWriter(output, 30, (320, 180)) as out:
+                out.write(np.zeros((100, 100, 3), dtype=np.uint8))
+
+    def test_abort_removes_partial_file(self, tmp_path):
+        """A failed render leaves no truncated video behind"""
+        output = tmp_path / "out.mp4"
+        with pytest.raises(RuntimeError):
+            with FFmpegWriter(output, 30, (320, 180)) as out:
+                for frame in make_frames(5):
+                    out.write(frame)
+                raise RuntimeError("render failed")
+
+        assert not output.exists()
+
+    def test_no_frames(self, tmp_path):
+        """Releasing a writer that got no frames fails without leaving an empty file"""
+        output = tmp_path / "out.mp4"
+        with pytest.raises(RuntimeError, match="No frames written"):
+            with FFmpegWriter(output, 30, (320, 180)):
+                pass
+
+        assert not output.exists()
+
+
+def segment_frames(segment):
+    """Frames of one test segment: (seed, frame count)"""
+    seed, count = segment
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        yield rng.integers(0, 255, (96, 160, 3), dtype=np.uint8)
+
+
+def decode_frames(path):
+    """Decode every frame of a video file"""
+    cap = cv2.VideoCapture(str(path))
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+@requires_ffmpeg
+class TestSegmentParallelRendering:
+    """Segments encoded in parallel and joined without re-encoding"""
+
+    def test_matches_serial_render(self, tmp_path):
+        """Lossless segment-parallel output is frame-identical to a serial render"""
+        segments = [(1, 7), (2, 0), (3, 11), (4, 5)]
+
+        serial = tmp_path / "serial.mp4"
+        with FFmpegWriter(serial, 30, (160, 96), crf=0) as out:
+            for segment in segments:
+                for frame in segment_frames(segment):
+                    out.write(frame)
+
+        parallel = tmp_path / "parallel.mp4"
+        written = render_segments(segment_frames, segments, parallel, 30, (160, 96), jobs=3, crf=0)
+
+        assert written == 23
+        serial_frames = decode_frames(serial)
+        parallel_frames = decode_frames(parallel)
+        assert len(parallel_frames) == len(serial_frames) == 23
+        for a, b in zip(serial_frames, parallel_frames):
+            assert np.array_equal(a, b)
+
+        # Temporary segment files are cleaned up
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["parallel.mp4", "serial.mp4"]
+
+
+@requires_ffmpeg
+class TestStaticSpans:
+    """Held frames are encoded as still segments instead of piped one by one"""
+
+    def render(self, path, spans, hold):
+        """Render (seed, count, static) spans, holding static ones if hold"""
+        with FFmpegWriter(path, 30, (160, 96), crf=0) as out:
+            for seed, count, static in spans:
+                if static:
+                    still = next(segment_frames((seed, 1)))
+                    frames = held_frames(still, count) if hold else (still.copy() for _ in range(count))
+                else:
+                    frames = segment_frames((seed, count))
+                for frame in frames:
+                    out.write(frame)
+        return out
+
+    def test_matches_piped_render(self, tmp_path, monkeypatch):
+        """Eliding holds changes nothing in the decoded video"""
+        monkeypatch.setenv('STILL_CACHE_DIR', str(tmp_path / "stills"))
+        spans = [(1, 20, True), (2, 7, False), (3, 40, True), (4, 3, True), (5, 5, False), (6, 30, True)]
+
+        piped = self.render(tmp_path / "piped.mp4", spans, hold=False)
+        held = self.render(tmp_path / "held.mp4", spans, hold=True)
+
+        assert piped.frames_written == held.frames_written == 105
+        piped_frames = decode_frames(tmp_path / "piped.mp4")
+        elided = decode_frames(tmp_path / "held.mp4")
+        assert len(elided) == len(piped_frames) == 105
+        for a, b in zip(piped_frames, elided):
+            assert np.array_equal(a, b)
+
+        # Split pieces are cleaned up; the three long holds were cached
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["held.mp4", "piped.mp4", "stills"]
+        assert len(list((tmp_path / "stills").iterdir())) == 3
+
+    def test_still_segments_are_reused(self, tmp_path, monkeypatch):
+        """The same hold in another video comes from the cache"""
+        monkeypatch.setenv('STILL_CACHE_DIR', str(tmp_path / "stills"))
+        spans = [(1, 5, False), (2, 30, True)]
+
+        self.render(tmp_path / "a.mp4", spans, hold=True)
+        cached = next((tmp_path / "stills").iterdir())
+        mtime = cached.stat().st_mtime_ns
+        self.render(tmp_path / "b.mp4", spans, hold=True)
+
+        assert cached.stat().st_mtime_ns == mtime
+        assert len(decode_frames(tmp_path / "b.mp4")) == 35
+
+    def test_concurrent_encodes_of_one_still(self, tmp_path, monkeypatch):
+        """Processes encoding the same slide at once all succeed and share one cached file"""
+        monkeypatch.setenv('STILL_CACHE_DIR', str(tmp_path / "stills"))
+        still = next(segment_frames((7, 1)))
+        outputs = [tmp_path / f"slide{i}.mp4" for i in range(4)]
+
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            list(pool.map(encode_still, repeat(still), repeat(90), outputs, repeat(30), repeat((160, 96))))
+
+        cached = list((tmp_path / "stills").iterdir())
+        assert len(cached) == 1 and not cached[0].name.endswith('.tmp.mp4')
+        assert all(len(decode_frames(path)) == 90 for path in outputs)
+
+
+@requires_ffmpeg
+class TestParallelStreams:
+    """Several outputs fed at once"""
+
+    def test_each_stream_reaches_its_writer(self, tmp_path):
+        """Streams of different sizes are encoded side by side, in order"""
+        sizes = [(320, 180), (180, 320)]
+        with FFmpegWriter(tmp_path / "a.mp4", 30, sizes[0]) as a, FFmpegWriter(tmp_path / "b.mp4", 30, sizes[1]) as b:
+            write_streams([a, b], [make_frames(10, sizes[0]), make_frames(6, sizes[1])])
+            write_streams([a, b], [make_frames(2, sizes[0]), make_frames(2, sizes[1])])
+
+        assert (a.frames_written, b.frames_written) == (12, 8)
+
+
+def test_missing_ffmpeg(tmp_path):
+    """A missing ffmpeg binary raises a clear error"""
+    with pytest.raises(RuntimeError, match="ffmpeg not found"):
+        FFmpegWriter(tmp_path / "out.mp4", 30, (320, 180), ffmpeg="ffmpeg-does-not-exist")
@@ -0,0 +1,75 @@
+"""
+Tests for the fade engine
+"""
+import cv2
+import numpy as np
+import pytest
+
+from fades import Fader, fade_gains, fade_in, fade_out, fade_through
+
+
+@pytest.fixture
+def base():
+    """Synthetic frame"""
+    return np.random.default_rng(0).integers(0, 255, (72, 128, 3), dtype=np.uint8)
+
+
+class TestGainTables:
+    """Precomputed per-frame gains"""
+
+    def test_fade_in_is_clamped(self):
+        """Gains ramp up and stay at 1 once the fade is over"""
+        gains = fade_gains(90, 45, 'in')
+        assert gains[0] == 0
+        assert gains[45] == 1
+        assert gains.max() == 1
+
+    def test_fade_out_is_clamped(self):
+        """Gains ramp down and stay at 0"""
+        gains = fade_gains(90, 60, 'out')
+        assert gains[0] == 1
+        assert gains[-1] == 0
+        assert gains.min() == 0
+
+    def test_unknown_direction(self):
+        """Only 'in' and 'out' fades exist"""
+        with pytest.raises(ValueError):
+            fade_gains(10, 5, 'sideways')
+
+
+class TestFader:
+    """Frame scaling into reusable buffers"""
+
+    def test_matches_add_weighted(self, base):
+        """Fading to black matches blending against a zero frame"""
+        fader = Fader(base)
+        for gain in (0.0, 0.25, 0.5, 0.9, 1.0):
+            expected = cv2.addWeighted(base, gain, np.zeros_like(base), 1 - gain, 0)
+            assert np.array_equal(fader.frame(gain), expected)
+
+    def test_reuses_output_buffers(self, base):
+        """No new frame is allocated per frame"""
+        fader = Fader(base, buffers=2)
+        first = fader.frame(0.1)
+        second = fader.frame(0.2)
+        third = fader.frame(0.3)
+        assert first is third
+        assert first is not second
+
+    def test_fade_through_color(self, base):
+        """Fade-through-color passes through the solid color"""
+        other = np.full_like(base, 200)
+        frames = [f.copy() for f in fade_through(base, other, 20, color=(255, 0, 0))]
+
+        assert len(frames) == 20
+        assert np.array_equal(frames[0], base)
+        assert (frames[10] == (255, 0, 0)).all()
+        assert np.array_equal(frames[-1], other)
+
+    def test_fade_in_and_out(self, base):
+        """Convenience generators start and end where expected"""
+        ins = [f.copy() for f in fade_in(base, 10, 5)]
+        outs = [f.copy() for f in fade_out(base, 10, 5)]
+
+        assert not ins[0].any() and np.array_equal(ins[-1], base)
+        assert np.array_equal(outs[0], base) and not outs[-1].any()
@@ -0,0 +1,123 @@
+"""
+Tests for render fingerprints and manifests
+"""
+import os
+
+from fingerprint import (
+    is_current,
+    manifest_path,
+    pending_uploads,
+    record_upload,
+    render_fingerprint,
+    sku_seed,
+    source_digests,
+    write_manifest,
+)
+
+
+def make_sources(tmp_path, **contents):
+    """Write source files and return their paths"""
+    paths = []
+    for name, data in contents.items():
+        path = tmp_path / f"{name}.jpg"
+        path.write_bytes(data)
+        paths.append(path)
+    return paths
+
+
+class TestFingerprint:
+    """Fingerprints follow the inputs"""
+
+    def test_sku_seed_is_stable(self):
+        """Seeds depend only on the SKU"""
+        assert sku_seed("ABC-123") == sku_seed("ABC-123")
+        assert sku_seed("ABC-123") != sku_seed("ABC-124")
+
+    def test_changes_with_contents_settings_and_seed(self, tmp_path):
+        """Any input change produces a new fingerprint"""
+        paths = make_sources(tmp_path, a=b"one", b=b"two")
+        base = render_fingerprint(1, source_digests(paths), {'fps': 30})
+
+        assert render_fingerprint(1, source_digests(paths), {'fps': 30}) == base
+        assert render_fingerprint(2, source_digests(paths), {'fps': 30}) != base
+        assert render_fingerprint(1, source_digests(paths), {'fps': 24}) != base
+
+        paths[0].write_bytes(b"edited")
+        assert render_fingerprint(1, source_digests(paths), {'fps': 30}) != base
+
+    def test_unchanged_files_reuse_digests(self, tmp_path):
+        """Files with the same size and mtime are not re-hashed"""
+        paths = make_sources(tmp_path, a=b"one")
+        previous = source_digests(paths)
+        previous['a.jpg']['sha256'] = 'recorded'
+
+        assert source_digests(paths, previous)['a.jpg']['sha256'] == 'recorded'
+
+        stat = paths[0].stat()
+        os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert source_digests(paths, previous)['a.jpg']['sha256'] != 'recorded'
+
+
+class TestManifest:
+    """Sidecar manifests decide what needs re-rendering"""
+
+    def test_current_after_render(self, tmp_path):
+        """A finished render with a matching fingerprint is current"""
+        video = tmp_path / "SKU.mp4"
+        video.write_bytes(b"x" * 100)
+        write_manifest(video, "abc", {}, sku="SKU")
+
+        assert manifest_path(video).name == "SKU.render.json"
+        assert is_current(video, "abc")
+        assert not is_current(video, "def")
+
+    def test_missing_manifest_or_video(self, tmp_path):
+        """Videos without a manifest (or manifests without a video) are stale"""
+        video = tmp_path / "SKU.mp4"
+        video.write_bytes(b"x")
+        assert not is_current(video, "abc")
+
+        write_manifest(video, "abc", {})
+        video.unlink()
+        assert not is_current(video, "abc")
+
+    def test_truncated_video_is_stale(self, tmp_path):
+        """A file cut short by a crashed run is re-rendered"""
+        video = tmp_path / "SKU.mp4"
+        video.write_bytes(b"x" * 100)
+        write_manifest(video, "abc", {})
+
+        video.write_bytes(b"x" * 40)
+        assert not is_current(video, "abc")
+
+    def test_missing_or_truncated_rendition_is_stale(self, tmp_path):
+        """Every rendition recorded with the video has to be intact too"""
+        video = tmp_path / "SKU.mp4"
+        vertical = tmp_path / "SKU_9x16.mp4"
+        video.write_bytes(b"x" * 100)
+        vertical.write_bytes(b"x" * 80)
+        write_manifest(video, "abc", {}, outputs=[vertical])
+        assert is_current(video, "abc")
+
+        vertical.write_bytes(b"x" * 30)
+        assert not is_current(video, "abc")
+
+        vertical.unlink()
+        assert not is_current(video, "abc")
+
+    def test_pending_uploads(self, tmp_path):
+        """The video and its renditions are pending until each upload is recorded"""
+        video = tmp_path / "SKU.mp4"
+        vertical = tmp_path / "SKU_9x16.mp4"
+        video.write_bytes(b"x" * 100)
+        vertical.write_bytes(b"x" * 80)
+        write_manifest(video, "abc", {}, outputs=[vertical], uploads={})
+        assert pending_uploads(video) == [video, vertical]
+
+        record_upload(video, video, "file-1")
+        assert pending_uploads(video) == [vertical]
+        assert is_current(video, "abc")
+
+        # Renders from before uploads were tracked aren't uploaded again
+        write_manifest(video, "abc", {})
+        assert pending_uploads(video) == []
@@ -0,0 +1,151 @@
+"""
+Tests for the two-tier source image cache
+"""
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from image_cache import ImageCache, prune_directory, touch
+
+
+@pytest.fixture
+def source(tmp_path):
+    """A small image file on disk"""
+    path = tmp_path / "crop.png"
+    cv2.imwrite(str(path), np.random.default_rng(0).integers(0, 255, (40, 60, 3), dtype=np.uint8))
+    return path
+
+
+class CountingLoader:
+    """Decode + normalize stand-in that counts its calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        img = cv2.imread(str(path))
+        return None if img is None else cv2.resize(img, (32, 18))
+
+
+class TestImageCache:
+    """In-process and on-disk tiers"""
+
+    def test_memory_hit(self, source, tmp_path):
+        """A second lookup is served without decoding"""
+        cache = ImageCache(disk_dir=tmp_path / "cache")
+        loader = CountingLoader()
+
+        first = cache.get(source, (32, 18), loader)
+        second = cache.get(source, (32, 18), loader)
+
+        assert loader.calls == 1
+        assert second is first
+        assert not first.flags.writeable
+
+    def test_disk_tier_shared_across_instances(self, source, tmp_path):
+        """A fresh process-level cache reuses the memory-mapped .npy"""
+        loader = CountingLoader()
+        expected = ImageCache(disk_dir=tmp_path / "cache").get(source, (32, 18), loader)
+
+        other = ImageCache(disk_dir=tmp_path / "cache")
+        image = other.get(source, (32, 18), loader)
+
+        assert loader.calls == 1
+        assert other.stats['disk_hits'] == 1
+        assert isinstance(image, np.memmap)
+        assert np.array_equal(image, expected)
+
+    def test_key_tracks_file_and_resolution(self, source, tmp_path):
+        """Edited files and other resolutions are cache misses"""
+        cache = ImageCache(disk_dir=None)
+        loader = CountingLoader()
+
+        cache.get(source, (32, 18), loader)
+        cache.get(source, (64, 36), loader)
+        assert loader.calls == 2
+
+        cv2.imwrite(str(source), np.zeros((40, 60, 3), dtype=np.uint8))
+        stat = os.stat(source)
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        cache.get(source, (32, 18), loader)
+        assert loader.calls == 3
+
+    def test_memory_budget_evicts_lru(self, tmp_path):
+        """The in-process tier stays within its byte budget"""
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"crop{i}.png"
+            cv2.imwrite(str(path), np.full((40, 60, 3), i, dtype=np.uint8))
+            paths.append(path)
+
+        canvas_bytes = 32 * 18 * 3
+        cache = ImageCache(memory_bytes=2 * canvas_bytes, disk_dir=None)
+        loader = CountingLoader()
+        for path in paths:
+            cache.get(path, (32, 18), loader)
+
+        assert cache._memory_used <= 2 * canvas_bytes
+        cache.get(paths[0], (32, 18), loader)
+        assert loader.calls == 4
+
+    def test_unreadable_files_are_not_cached(self, tmp_path):
+        """Decode failures return None every time"""
+        path = tmp_path / "broken.jpg"
+        path.write_bytes(b"not an image")
+        cache = ImageCache(disk_dir=tmp_path / "cache")
+
+        assert cache.get(path, (32, 18), CountingLoader()) is None
+        assert cache.get(tmp_path / "missing.jpg", (32, 18), CountingLoader()) is None
+        assert not list(tmp_path.glob("cache/*.npy"))
+
+
+class TestDiskBudget:
+    """The disk tier is pruned least recently used first"""
+
+    def test_prune_oldest_first(self, tmp_path):
+        """Files are deleted by access time until the rest fit; temp files are skipped"""
+        for i, name in enumerate(["a.npy", "b.npy", "c.npy"]):
+            path = tmp_path / name
+            path.write_bytes(b"x" * 100)
+            os.utime(path, ns=(i * 10**9, 0))
+        (tmp_path / "d.npy.tmp").write_bytes(b"x" * 1000)
+
+        removed = prune_directory(tmp_path, 200, '*.npy*')
+
+        assert removed == [tmp_path / "a.npy"]
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["b.npy", "c.npy", "d.npy.tmp"]
+
+    def test_touch_keeps_mtime(self, tmp_path):
+        """Marking a file used doesn't change its mtime (source cache keys use it)"""
+        path = tmp_path / "a.img"
+        path.write_bytes(b"x")
+        os.utime(path, ns=(0, 10**9))
+
+        touch(path)
+
+        assert path.stat().st_mtime_ns == 10**9
+        assert path.stat().st_atime_ns > 10**9
+
+    def test_disk_tier_stays_within_budget(self, tmp_path):
+        """Old canvases (e.g. of edited crops) are evicted; recently read ones survive"""
+        sources = []
+        for i in range(3):
+            path = tmp_path / f"crop{i}.png"
+            cv2.imwrite(str(path), np.full((40, 60, 3), i * 50, dtype=np.uint8))
+            sources.append(path)
+
+        entry_bytes = 32 * 18 * 3 + 128  # canvas plus .npy header
+        cache = ImageCache(disk_dir=tmp_path / "cache", disk_bytes=2 * entry_bytes)
+        loader = CountingLoader()
+
+        cache.get(sources[0], (32, 18), loader)
+        cache.get(sources[1], (32, 18), loader)
+        os.utime(tmp_path / "cache" / f"{cache.cache_key(sources[1], (32, 18))}.npy", ns=(0, 0))
+        ImageCache(disk_dir=tmp_path / "cache").get(sources[0], (32, 18), loader)  # disk hit
+        cache.get(sources[2], (32, 18), loader)
+
+        kept = {p.stem for p in (tmp_path / "cache").iterdir()}
+        assert kept == {cache.cache_key(sources[0], (32, 18)), cache.cache_key(sources[2], (32, 18))}
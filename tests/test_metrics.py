@@ -0,0 +1,116 @@
+"""
+Tests for render instrumentation
+"""
+import json
+import shutil
+import time
+
+import numpy as np
+import pytest
+
+from encoder import render_segments
+from metrics import (
+    STAGES,
+    RenderMetrics,
+    append_ledger,
+    count,
+    recording,
+    stage,
+    timed_frames,
+    with_upload,
+)
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+
+
+def slow_frames(count, delay):
+    """Frames that each take `delay` seconds to produce"""
+    for _ in range(count):
+        time.sleep(delay)
+        yield np.zeros((4, 4, 3), dtype=np.uint8)
+
+
+def gray_segment(segment):
+    """Picklable segment renderer for the encoder test"""
+    for _ in range(segment):
+        yield np.full((64, 64, 3), 128, dtype=np.uint8)
+
+
+class TestStages:
+    """Stage timing"""
+
+    def test_no_recording_is_a_no_op(self):
+        """Stages and counters outside a recording are ignored"""
+        with stage('decode'):
+            count('frames')
+
+    def test_nested_stages_are_exclusive(self):
+        """Time in an inner stage is not charged to the outer one"""
+        metrics = RenderMetrics('job')
+        with recording(metrics):
+            with stage('effect'):
+                time.sleep(0.02)
+                with stage('overlay'):
+                    time.sleep(0.05)
+
+        assert metrics.stages['overlay'] >= 0.05
+        assert 0.02 <= metrics.stages['effect'] < 0.06
+
+    def test_timed_frames(self):
+        """Producing frames is charged to the stage, consuming them is not"""
+        metrics = RenderMetrics()
+        with recording(metrics):
+            for _ in timed_frames(slow_frames(3, 0.01), 'effect'):
+                time.sleep(0.02)
+
+        assert 0.03 <= metrics.stages['effect'] < 0.08
+
+    def test_report(self):
+        """Every pipeline stage is reported, with counters and peak RSS"""
+        metrics = RenderMetrics('SKU')
+        with recording(metrics):
+            count('frames', 30)
+
+        report = metrics.report()
+        assert list(report['stages'])[:len(STAGES)] == list(STAGES)
+        assert report['counters'] == {'frames': 30}
+        assert report['peak_rss_mb'] > 0
+        json.dumps(report)
+
+
+class TestResults:
+    """Attaching metrics to results and the ledger"""
+
+    def test_with_upload(self):
+        """Background upload timings are folded into a render result"""
+        result = {'sku': 'SKU', 'status': 'success', 'metrics': RenderMetrics('SKU').report()}
+        merged = with_upload(result, {'sku': 'SKU', 'status': 'uploaded', 'file_id': 'abc', 'seconds': 4.2})
+
+        assert merged['file_id'] == 'abc'
+        assert merged['metrics']['stages']['upload'] == 4.2
+        assert result['metrics']['stages']['upload'] == 0
+
+    def test_ledger_appends_json_lines(self, tmp_path):
+        """Each record is one timestamped JSON line"""
+        ledger = tmp_path / "ledger.jsonl"
+        append_ledger(ledger, {'sku': 'A'})
+        append_ledger(ledger, {'sku': 'B'})
+
+        records = [json.loads(line) for line in ledger.read_text().splitlines()]
+        assert [r['sku'] for r in records] == ['A', 'B']
+        assert all('timestamp' in r for r in records)
+
+
+@requires_ffmpeg
+class TestEncoderMetrics:
+    """Encoder stages, including segments rendered in worker processes"""
+
+    def test_segment_metrics_are_merged(self, tmp_path):
+        """Frames and write/transcode time from every segment reach the caller"""
+        metrics = RenderMetrics()
+        with recording(metrics):
+            render_segments(gray_segment, [5, 7], tmp_path / "out.mp4", 30, (64, 64), jobs=2)
+
+        assert metrics.counters['frames'] == 12
+        assert metrics.stages['frame_write'] > 0
+        assert metrics.stages['transcode'] > 0
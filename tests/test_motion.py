@@ -0,0 +1,79 @@
+"""
+Tests for the Ken Burns motion engine
+"""
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+import motion
+
+
+class TestEasing:
+    """Easing curves"""
+
+    @pytest.mark.parametrize("easing", list(motion.EASING_FUNCTIONS))
+    def test_easing_endpoints(self, easing):
+        """Every curve starts at 0 and ends at 1"""
+        assert motion.ease(0.0, easing) == pytest.approx(0.0)
+        assert motion.ease(1.0, easing) == pytest.approx(1.0)
+
+    def test_unknown_easing(self):
+        """Unknown easing names are rejected"""
+        with pytest.raises(ValueError):
+            motion.ease(0.5, 'bounce')
+
+
+class TestCropWindows:
+    """Per-frame crop window planning"""
+
+    @pytest.mark.parametrize("direction", motion.PAN_DIRECTIONS)
+    def test_windows_stay_inside_source(self, direction):
+        """Crop windows never leave the source image"""
+        windows = motion.plan_ken_burns(1920, 1080, 120, 1.0, 1.4, direction, 'ease-in-out')
+        for x, y, w, h in windows:
+            assert x >= 0 and y >= 0
+            assert x + w <= 1920 + 1e-6
+            assert y + h <= 1080 + 1e-6
+
+    def test_sub_pixel_motion(self):
+        """Pan offsets are not truncated to whole pixels"""
+        windows = motion.plan_ken_burns(1920, 1080, 120, 1.0, 1.3, 'topleft')
+        xs = [x for x, _, _, _ in windows]
+        assert any(x != int(x) for x in xs)
+        assert all(b > a for a, b in zip(xs[1:], xs[2:]))
+
+    def test_identity_window(self):
+        """A full-size window reproduces the source exactly"""
+        img = np.random.default_rng(0).integers(0, 255, (90, 160, 3), dtype=np.uint8)
+        frame = motion.render_window(img, (0.0, 0.0, 160.0, 90.0), (160, 90))
+        assert np.array_equal(frame, img)
+
+    def test_matches_resize_and_crop(self):
+        """A zoomed window matches the old resize-then-slice result"""
+        img = cv2.GaussianBlur(
+            np.random.default_rng(1).integers(0, 255, (270, 480, 3), dtype=np.uint8),
+            (9, 9), 3
+        )
+        zoom = 1.25
+        resized = cv2.resize(img, (int(480 * zoom), int(270 * zoom)))
+        expected = resized[:270, :480]
+
+        frame = motion.render_window(img, (0.0, 0.0, 480 / zoom, 270 / zoom), (480, 270))
+        diff = np.abs(frame.astype(int) - expected.astype(int))
+        assert diff.mean() < 2
+
+
+class TestConfigSettings:
+    """Ken Burns settings from video_config.json"""
+
+    def test_settings_from_example_config(self):
+        """zoom_range and easing are mapped to motion arguments"""
+        config_path = Path(__file__).parent.parent / "examples" / "video_config.json"
+        with open(config_path) as f:
+            config = json.load(f)
+
+        settings = motion.settings_from_config(config)
+        assert settings == {'start_zoom': 1.0, 'end_zoom': 1.4, 'easing': 'ease-in-out'}
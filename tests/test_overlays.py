@@ -0,0 +1,83 @@
+"""
+Tests for the pre-rasterized overlay compositor
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pytest
+
+from overlays import SpriteBuilder
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+@pytest.fixture
+def frame():
+    """Smooth synthetic 1080p frame"""
+    noise = np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (21, 21), 8)
+
+
+def draw_directly(frame, alpha):
+    """Reference: full-frame copy, addWeighted box and putText"""
+    h, w = frame.shape[:2]
+    overlay = frame.copy()
+    cv2.rectangle(overlay, (0, 3*h//4), (w, h), (0, 0, 0), -1)
+    frame = cv2.addWeighted(frame, 1-alpha, overlay, alpha, 0)
+    cv2.putText(frame, "Own a piece of history", (600, 5*h//6 + 3), FONT, 1.5, (0, 0, 0), 3, cv2.LINE_AA)
+    cv2.putText(frame, "Own a piece of history", (597, 5*h//6), FONT, 1.5, (255, 255, 255), 3, cv2.LINE_AA)
+    return frame
+
+
+def build_sprite(alpha):
+    """The same overlay as a sprite"""
+    return (
+        SpriteBuilder(1920, 1080)
+        .rectangle((0, 810), (1920, 1080), (0, 0, 0), alpha)
+        .text("Own a piece of history", (600, 903), FONT, 1.5, (0, 0, 0), 3)
+        .text("Own a piece of history", (597, 900), FONT, 1.5, (255, 255, 255), 3)
+        .build()
+    )
+
+
+class TestOverlaySprite:
+    """Sprite blending"""
+
+    def test_matches_direct_drawing(self, frame):
+        """Blending the sprite matches drawing the overlay on the frame"""
+        expected = draw_directly(frame.copy(), 0.4)
+        result = build_sprite(0.4).apply(frame.copy())
+
+        diff = np.abs(expected.astype(int) - result.astype(int))
+        assert diff.max() <= 1
+
+    def test_only_touches_overlay_region(self, frame):
+        """Pixels outside the box and text are left alone"""
+        result = build_sprite(0.4).apply(frame.copy())
+        assert np.array_equal(result[:810], frame[:810])
+
+    def test_per_pixel_box_is_tight(self):
+        """Text is blended per pixel only around the glyphs"""
+        sprite = build_sprite(0.4)
+        x1, y1, x2, y2 = sprite.box
+        assert (x2 - x1) * (y2 - y1) < 0.1 * 1920 * 1080
+        assert sprite.fills == [((0, 810, 1920, 1080), 0.6, (0.0, 0.0, 0.0))]
+
+    def test_applies_in_place(self, frame):
+        """No full-frame copy is made"""
+        target = frame.copy()
+        assert build_sprite(0.4).apply(target) is target
+
+    def test_shared_between_threads(self):
+        """One cached sprite blended from several threads gives each frame its own result"""
+        sprite = build_sprite(0.4)
+        rng = np.random.default_rng(1)
+        frames = [rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8) for _ in range(4)]
+        expected = [sprite.apply(f.copy()) for f in frames]
+
+        def blend(i):
+            return all(np.array_equal(sprite.apply(frames[i].copy()), expected[i]) for _ in range(30))
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            assert all(pool.map(blend, range(4)))
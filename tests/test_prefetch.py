@@ -0,0 +1,109 @@
+"""
+Tests for background decode prefetch
+"""
+import threading
+import time
+
+import pytest
+
+from metrics import RenderMetrics, recording, stage
+from prefetch import prefetch
+
+
+class Tracker:
+    """Loader that records how many loads have started and are in flight"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.started = []
+        self.threads = set()
+
+    def __call__(self, item):
+        with self.lock:
+            self.started.append(item)
+            self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        return item * 10
+
+
+class TestPrefetch:
+    """Loads run ahead of the consumer, in order, within the look-ahead"""
+
+    def test_results_in_order(self):
+        """Results come back in item order whatever order the loads finish in"""
+        def load(item):
+            time.sleep(0.02 * (5 - item))
+            return item
+
+        assert list(prefetch(range(5), load, lookahead=3)) == [0, 1, 2, 3, 4]
+
+    def test_lookahead_is_bounded(self):
+        """No more than lookahead items load beyond the one being consumed"""
+        load = Tracker()
+        results = prefetch(range(10), load, lookahead=2)
+
+        for consumed, result in enumerate(results):
+            assert result == consumed * 10
+            time.sleep(0.01)
+            assert len(load.started) <= consumed + 1 + 2
+
+        assert load.started == list(range(10))
+
+    def test_loads_on_background_threads(self):
+        """Upcoming items load while the consumer is still busy with the current one"""
+        load = Tracker(delay=0.05)
+        start = time.perf_counter()
+
+        for _ in prefetch(range(4), load, lookahead=3):
+            time.sleep(0.05)  # "render"
+
+        # Serially this would take 8 x 0.05s
+        assert time.perf_counter() - start < 0.35
+        assert all(name.startswith('prefetch') for name in load.threads)
+
+    def test_zero_lookahead_is_synchronous(self):
+        """lookahead=0 loads each item on the calling thread, only when it's reached"""
+        load = Tracker()
+        results = prefetch(range(3), load, lookahead=0)
+
+        assert next(results) == 0
+        assert load.started == [0]
+        assert list(results) == [10, 20]
+        assert load.threads == {threading.current_thread().name}
+
+    def test_errors_reach_the_consumer(self):
+        """A failing load raises where its result would have been yielded"""
+        def load(item):
+            if item == 2:
+                raise ValueError("bad source")
+            return item
+
+        results = prefetch(range(4), load, lookahead=2)
+        assert [next(results), next(results)] == [0, 1]
+        with pytest.raises(ValueError, match="bad source"):
+            next(results)
+
+    def test_stopping_early_skips_the_rest(self):
+        """Closing the generator cancels loads that haven't started"""
+        load = Tracker(delay=0.02)
+        results = prefetch(range(20), load, lookahead=2, workers=1)
+        next(results)
+        results.close()
+
+        assert len(load.started) <= 4
+
+    def test_stage_timings_are_merged(self):
+        """Stages timed on prefetch threads end up in the caller's metrics"""
+        def load(item):
+            with stage('decode'):
+                time.sleep(0.01)
+            return item
+
+        metrics = RenderMetrics()
+        with recording(metrics):
+            assert list(prefetch(range(3), load, lookahead=2)) == [0, 1, 2]
+
+        report = metrics.report()
+        assert report['stages']['decode'] >= 0.03
+        assert 'decode_wait' in report['stages']
@@ -0,0 +1,262 @@
+"""
+Tests for the product video (Ken Burns) pipeline
+"""
+import shutil
+import types
+
+import numpy as np
+import pytest
+
+import create_product_videos as cpv
+from image_cache import ImageCache
+from uploader import upload_state_path
+
+
+@pytest.fixture
+def canvas():
+    """Synthetic crop already sized to the video canvas"""
+    img = np.random.default_rng(0).integers(0, 255, (600, 900, 3), dtype=np.uint8)
+    return cpv.resize_to_video_dimensions(img)
+
+
+class TestKenBurnsStreaming:
+    """Ken Burns clips are generated lazily"""
+
+    def test_ken_burns_is_generator(self, canvas):
+        """apply_ken_burns_effect yields frames instead of building a list"""
+        frames = cpv.apply_ken_burns_effect(canvas, pan_direction='center')
+        assert isinstance(frames, types.GeneratorType)
+
+        first = next(frames)
+        assert first.shape == (cpv.HEIGHT, cpv.WIDTH, 3)
+
+    def test_clip_frame_count(self, canvas):
+        """A clip yields FPS * duration frames"""
+        frames = list(cpv.render_crop_clip(canvas, duration=1))
+        assert len(frames) == cpv.FPS
+
+    def test_quote_applied_to_middle_third(self, canvas):
+        """The quote overlay only touches the middle third of the clip"""
+        plain = list(cpv.apply_ken_burns_effect(canvas, pan_direction='center', duration=1))
+        quoted = list(cpv.render_crop_clip(
+            canvas, quote="Own a piece of history", pan_direction='center', duration=1
+        ))
+
+        start, end = cpv.FPS // 3, 2 * cpv.FPS // 3
+        for i, (a, b) in enumerate(zip(plain, quoted)):
+            if start <= i < end:
+                assert not np.array_equal(a, b)
+            else:
+                assert np.array_equal(a, b)
+
+
+class TestDeterministicPlanning:
+    """Renders are reproducible from the SKU"""
+
+    def test_seeded_plan_is_reproducible(self, tmp_path):
+        """The same seed always picks the same quotes and pan directions"""
+        crops = [tmp_path / f"crop_{i}.jpg" for i in range(6)]
+        plans = [cpv.plan_product_segments(crops, seed=cpv.sku_seed("SKU-1")) for _ in range(2)]
+        assert plans[0] == plans[1]
+
+    def test_fingerprint_tracks_crop_contents(self, tmp_path, monkeypatch):
+        """Editing a crop changes the SKU's fingerprint"""
+        monkeypatch.setattr(cpv, 'AUTHENTICITY_IMAGE', tmp_path / "missing.jpg")
+        sku_dir = tmp_path / "crops" / "SKU-1"
+        sku_dir.mkdir(parents=True)
+        (sku_dir / "a.jpg").write_bytes(b"one")
+
+        before = cpv.product_fingerprint("SKU-1", tmp_path / "crops", tmp_path)
+        (sku_dir / "a.jpg").write_bytes(b"two")
+        after = cpv.product_fingerprint("SKU-1", tmp_path / "crops", tmp_path)
+
+        assert before['fingerprint'] != after['fingerprint']
+        assert cpv.product_fingerprint("SKU-2", tmp_path / "crops", tmp_path) is None
+
+
+class TestPreview:
+    """Preview renders keep the final render's timing and layout"""
+
+    def test_preview_clip_frames(self):
+        """A preview clip runs as long as the final one, at preview size and frame rate"""
+        profile = cpv.render_profile(preview=True)
+        img = np.random.default_rng(0).integers(0, 255, (600, 900, 3), dtype=np.uint8)
+        canvas = cpv.resize_to_video_dimensions(img, profile['size'])
+
+        frames = list(cpv.render_crop_clip(canvas, quote="Ready to display", duration=2,
+                                           fps=profile['fps'], scale=profile['scale']))
+
+        assert len(frames) == 2 * cpv.PREVIEW_FPS
+        assert frames[0].shape == (profile['size'][1], profile['size'][0], 3)
+
+    def test_quote_placement_scales(self):
+        """The caption sits in the same place, proportionally, as in the final render"""
+        final = cpv.render_profile()
+        preview = cpv.render_profile(preview=True)
+
+        boxes = []
+        for profile in (final, preview):
+            w, h = profile['size']
+            sprite = cpv.text_overlay_sprite("Own a piece of history", 'bottom', 1.5, (255, 255, 255),
+                                             w, h, profile['scale'])
+            boxes.append(np.array(sprite.box) / [w, h, w, h])
+
+        assert np.allclose(boxes[0], boxes[1], atol=0.02)
+
+
+class TestRenditions:
+    """Every output format from one render pass"""
+
+    def test_profiles(self):
+        """Each rendition has its own size and file, overlays shrink to fit"""
+        assert cpv.render_profile(rendition='1080p')['suffix'] == ''
+        vertical = cpv.render_profile(rendition='9x16')
+        assert vertical['size'] == (1080, 1920)
+        assert vertical['suffix'] == '_9x16'
+        assert vertical['scale'] == pytest.approx(1080 / 1920)
+        assert cpv.render_profile(preview=True, rendition='4x5')['size'] == (270, 336)
+
+        with pytest.raises(ValueError):
+            cpv.render_profile(rendition='8k')
+
+    def test_one_pass_renders_all(self, tmp_path, monkeypatch):
+        """Each source is decoded once and every rendition gets a full-length video"""
+        if shutil.which("ffmpeg") is None:
+            pytest.skip("ffmpeg not installed")
+
+        cv2 = cpv.cv2
+        monkeypatch.setattr(cpv, 'AUTHENTICITY_IMAGE', tmp_path / "missing.jpg")
+        monkeypatch.setattr(cpv, 'VIDEO_DURATION', 3)
+        monkeypatch.setattr(cpv, 'FPS', 4)
+        # Small stand-ins for the real formats keep the encode quick
+        monkeypatch.setattr(cpv, 'RENDITIONS', {'1080p': (320, 180), '9x16': (180, 320), '720p': (256, 144)})
+        cache = ImageCache(disk_dir=None)
+        monkeypatch.setattr(cpv, 'default_cache', lambda: cache)
+        sku_dir = tmp_path / "crops" / "SKU-1"
+        sku_dir.mkdir(parents=True)
+        for name in ("a.jpg", "b.jpg"):
+            cv2.imwrite(str(sku_dir / name), np.random.default_rng(0).integers(0, 255, (300, 400, 3), dtype=np.uint8))
+
+        decoded = []
+        imread = cv2.imread
+        monkeypatch.setattr(cv2, 'imread', lambda path, *flags: decoded.append(path) or imread(path, *flags))
+
+        renditions = ['1080p', '9x16', '720p']
+        video = cpv.create_product_video("SKU-1", tmp_path / "crops", tmp_path / "out",
+                                         renditions=renditions)
+
+        assert video == tmp_path / "out" / "SKU-1.mp4"
+        assert len(decoded) == 2
+        for name in renditions:
+            path = cpv.rendition_path(tmp_path / "out", "SKU-1", name)
+            cap = cv2.VideoCapture(str(path))
+            size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            assert size == cpv.RENDITIONS[name]
+            # Every clip runs for its default 4 seconds in each rendition
+            assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 2 * 4 * 4
+            cap.release()
+
+        assert cpv.read_manifest(video)['renditions'] == {
+            '1080p': 'SKU-1.mp4', '9x16': 'SKU-1_9x16.mp4', '720p': 'SKU-1_720p.mp4'
+        }
+
+        # Poster and storyboard come from the primary rendition's frames
+        manifest = cpv.read_manifest(video)
+        assert manifest['stills']['poster'] == 'SKU-1_poster.jpg'
+        assert cv2.imread(str(tmp_path / "out" / "SKU-1_poster.jpg")).shape == (180, 320, 3)
+        assert (tmp_path / "out" / manifest['stills']['storyboard_vtt']).read_text().startswith("WEBVTT")
+
+        # A missing extra rendition makes the SKU stale, not just a missing primary
+        assert cpv.is_current(video, manifest['fingerprint'])
+        cpv.rendition_path(tmp_path / "out", "SKU-1", '9x16').unlink()
+        assert not cpv.is_current(video, manifest['fingerprint'])
+
+
+class TestCanvases:
+    """Letterboxed canvases from the shared image cache"""
+
+    def test_pixels_do_not_depend_on_cache_order(self, tmp_path, monkeypatch):
+        """A canvas is the same whether a multi-rendition decode or a single-size one cached it"""
+        path = tmp_path / "big.jpg"
+        img = np.random.default_rng(0).integers(0, 255, (2250, 4000, 3), dtype=np.uint8)
+        cpv.cv2.imwrite(str(path), img)
+        small = (480, 270)
+
+        monkeypatch.setattr(cpv, 'default_cache', lambda: cache)
+        cache = ImageCache(disk_dir=None)
+        alone = cpv.load_canvas(path, small)
+
+        # A larger rendition alongside means a less reduced decode, cached separately
+        cache = ImageCache(disk_dir=None)
+        together = cpv.load_canvases(path, [small, (1920, 1080)])[0]
+        after = cpv.load_canvas(path, small)
+
+        assert not np.array_equal(alone, together)
+        assert np.array_equal(alone, after)
+
+
+class FlakyDrive:
+    """DriveClient stand-in whose uploads are cut off (leaving a session behind) until healthy"""
+
+    def __init__(self):
+        self.healthy = False
+        self.uploads = []
+
+    def upload(self, path, name, folder_id, **kwargs):
+        self.uploads.append(name)
+        if not self.healthy:
+            upload_state_path(path).write_text('{}')
+            raise ConnectionResetError("connection reset")
+        upload_state_path(path).unlink(missing_ok=True)
+        return {'id': f"id-{name}", 'webViewLink': f"https://drive/{name}"}
+
+
+def fake_render(sku, fingerprint=None, **kwargs):
+    """create_product_video stand-in: a video and a recorded manifest, without the rendering"""
+    video = cpv.OUTPUT_DIR / f"{sku}.mp4"
+    video.write_bytes(b"x" * 100)
+    cpv.write_manifest(video, fingerprint['fingerprint'], {}, uploads={})
+    return video
+
+
+class TestProcessProduct:
+    """Per-SKU batch step"""
+
+    def test_interrupted_upload_resumes_on_next_run(self, tmp_path, monkeypatch):
+        """An up-to-date SKU whose upload didn't finish is uploaded by the next batch run"""
+        (tmp_path / "crops" / "SKU-1").mkdir(parents=True)
+        monkeypatch.setattr(cpv, 'CROPS_DIR', tmp_path / "crops")
+        monkeypatch.setattr(cpv, 'OUTPUT_DIR', tmp_path)
+        monkeypatch.setattr(cpv, 'product_fingerprint',
+                            lambda *args, **kwargs: {'fingerprint': 'abc', 'sources': {}})
+        monkeypatch.setattr(cpv, 'create_product_video', fake_render)
+        drive = FlakyDrive()
+        monkeypatch.setattr(cpv, 'drive_client', lambda: drive)
+
+        cpv.process_all_products(ledger=None)
+        assert drive.uploads == ['SKU-1.mp4']
+        assert upload_state_path(tmp_path / "SKU-1.mp4").exists()
+
+        # The video is current, so this run renders nothing, but uploads it
+        drive.healthy = True
+        monkeypatch.setattr(cpv, 'create_product_video',
+                            lambda *args, **kwargs: pytest.fail("re-rendered"))
+        cpv.process_all_products(ledger=None)
+        assert drive.uploads == ['SKU-1.mp4', 'SKU-1.mp4']
+        assert cpv.read_manifest(tmp_path / "SKU-1.mp4")['uploads'] == {'SKU-1.mp4': 'id-SKU-1.mp4'}
+
+        # Once uploaded, the SKU is left alone
+        cpv.process_all_products(ledger=None)
+        assert drive.uploads == ['SKU-1.mp4', 'SKU-1.mp4']
+
+    def test_locked_sku_is_skipped(self, tmp_path, monkeypatch):
+        """A SKU another entry point is rendering isn't rendered twice"""
+        monkeypatch.setattr(cpv, 'OUTPUT_DIR', tmp_path)
+        monkeypatch.setattr(cpv, 'product_fingerprint', lambda *args, **kwargs: None)
+        monkeypatch.setattr(cpv, 'create_product_video',
+                            lambda *args, **kwargs: pytest.fail("rendered twice"))
+
+        with cpv.sku_lock(tmp_path, "SKU-1"):
+            result = cpv.process_product("SKU-1", upload=False)
+
+        assert result['status'] == 'skipped'
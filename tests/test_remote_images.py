@@ -0,0 +1,228 @@
+"""
+Tests for pooled, cached remote image fetching
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import pytest
+import requests
+
+from remote_images import RemoteImageFetcher, is_remote
+
+
+class FakeCDN(BaseHTTPRequestHandler):
+    """Image CDN stand-in: serves server.images with validators, counting requests"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.connections.add(self.client_address)
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            self.respond()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def respond(self):
+        image = self.server.images.get(self.path)
+        if image is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body, etag, modified = image
+        unchanged = (
+            (etag and self.headers.get('If-None-Match') == etag) or
+            (not etag and modified and self.headers.get('If-Modified-Since') == modified)
+        )
+        if unchanged:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.server.bodies_sent += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        if modified:
+            self.send_header('Last-Modified', modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def jpeg_bytes(value, size=(64, 48)):
+    img = np.full((size[1], size[0], 3), value, dtype=np.uint8)
+    return cv2.imencode('.jpg', img)[1].tobytes()
+
+
+@pytest.fixture
+def cdn():
+    """Local fake CDN, served from a background thread"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCDN)
+    server.images = {}
+    server.requests = []
+    server.connections = set()
+    server.lock = threading.Lock()
+    server.in_flight = server.peak = server.bodies_sent = 0
+    server.delay = 0.0
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    fetcher = RemoteImageFetcher(cache_dir=tmp_path / "downloads", max_connections=2)
+    yield fetcher
+    fetcher.close()
+
+
+class TestFetch:
+    """Images are downloaded once and revalidated after that"""
+
+    def test_etag_revalidation(self, cdn, fetcher):
+        """A second fetch sends the ETag and reuses the cached bytes on 304"""
+        cdn.images['/art.jpg'] = (jpeg_bytes(200), '"v1"', None)
+
+        first = fetcher.fetch(cdn.url + '/art.jpg')
+        second = fetcher.fetch(cdn.url + '/art.jpg')
+
+        assert first == second
+        assert first.read_bytes() == cdn.images['/art.jpg'][0]
+        assert cdn.bodies_sent == 1
+        assert fetcher.stats == {'downloads': 1, 'revalidated': 1, 'stale': 0}
+
+    def test_last_modified_revalidation(self, cdn, fetcher):
+        """Without an ETag, Last-Modified is used instead"""
+        cdn.images['/art.jpg'] = (jpeg_bytes(200), None, 'Wed, 21 Oct 2026 07:28:00 GMT')
+
+        fetcher.fetch(cdn.url + '/art.jpg')
+        fetcher.fetch(cdn.url + '/art.jpg')
+
+        assert cdn.bodies_sent == 1
+
+    def test_changed_image_is_downloaded_again(self, cdn, fetcher):
+        """A new ETag on the server replaces the cached copy"""
+        cdn.images['/art.jpg'] = (jpeg_bytes(200), '"v1"', None)
+        fetcher.fetch(cdn.url + '/art.jpg')
+
+        cdn.images['/art.jpg'] = (jpeg_bytes(50), '"v2"', None)
+        path = fetcher.fetch(cdn.url + '/art.jpg')
+
+        assert path.read_bytes() == cdn.images['/art.jpg'][0]
+        assert cdn.bodies_sent == 2
+
+    def test_cache_survives_new_fetcher(self, cdn, fetcher, tmp_path):
+        """The cache is on disk, so a new process doesn't download again either"""
+        cdn.images['/art.jpg'] = (jpeg_bytes(200), '"v1"', None)
+        fetcher.fetch(cdn.url + '/art.jpg')
+
+        other = RemoteImageFetcher(cache_dir=tmp_path / "downloads")
+        other.fetch(cdn.url + '/art.jpg')
+        other.close()
+
+        assert cdn.bodies_sent == 1
+
+    def test_missing_image(self, cdn, fetcher):
+        """HTTP errors reach the caller when nothing is cached"""
+        with pytest.raises(requests.HTTPError):
+            fetcher.fetch(cdn.url + '/missing.jpg')
+
+    def test_cached_copy_when_offline(self, cdn, fetcher):
+        """An unreachable server falls back to the cached copy"""
+        cdn.images['/art.jpg'] = (jpeg_bytes(200), '"v1"', None)
+        url = cdn.url + '/art.jpg'
+        fetcher.fetch(url)
+
+        cdn.shutdown()
+        cdn.server_close()
+        fetcher.close()
+
+        assert fetcher.fetch(url).read_bytes() == cdn.images['/art.jpg'][0]
+        assert fetcher.stats['stale'] == 1
+
+    def test_cache_budget(self, cdn, tmp_path):
+        """Least recently used downloads are dropped, validators with them"""
+        body = jpeg_bytes(200)
+        fetcher = RemoteImageFetcher(cache_dir=tmp_path / "downloads", cache_bytes=int(len(body) * 2.5))
+        for i in range(3):
+            cdn.images[f'/art{i}.jpg'] = (body, f'"{i}"', None)
+            fetcher.fetch(f"{cdn.url}/art{i}.jpg")
+        fetcher.close()
+
+        kept = sorted(p.suffix for p in (tmp_path / "downloads").iterdir())
+        assert kept == ['.img', '.img', '.json', '.json']
+        assert not fetcher.cache_paths(f"{cdn.url}/art0.jpg")[0].exists()
+
+
+class TestPooling:
+    """One keep-alive pool with bounded concurrency"""
+
+    def test_connections_are_reused(self, cdn, fetcher):
+        """Sequential fetches share one connection"""
+        for i in range(5):
+            cdn.images[f'/art{i}.jpg'] = (jpeg_bytes(i * 40), f'"{i}"', None)
+            fetcher.fetch(f"{cdn.url}/art{i}.jpg")
+
+        assert len(cdn.requests) == 5
+        assert len(cdn.connections) == 1
+
+    def test_concurrency_is_bounded(self, cdn, fetcher):
+        """No more than max_connections requests are in flight"""
+        cdn.delay = 0.05
+        for i in range(8):
+            cdn.images[f'/art{i}.jpg'] = (jpeg_bytes(i * 30), f'"{i}"', None)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            paths = list(pool.map(fetcher.fetch, [f"{cdn.url}/art{i}.jpg" for i in range(8)]))
+
+        assert len(set(paths)) == 8
+        assert cdn.peak <= 2
+        assert len(cdn.connections) <= 2
+
+
+class TestCreateFromUrl:
+    """ArtworkVideoGenerator renders artwork straight from an image URL"""
+
+    def test_remote_artwork(self, cdn, tmp_path, monkeypatch):
+        import remote_images
+        from image_cache import ImageCache
+        from video_generator import ArtworkVideoGenerator
+
+        monkeypatch.setattr(remote_images, '_default_fetcher', RemoteImageFetcher(tmp_path / "downloads"))
+        monkeypatch.setattr('video_generator.default_cache', lambda: ImageCache(disk_dir=None))
+        cdn.images['/art.jpg'] = (jpeg_bytes(200, size=(1600, 900)), '"v1"', None)
+
+        generator = ArtworkVideoGenerator(output_dir=tmp_path / "videos", preview=True)
+        canvas = generator.create_from_url(cdn.url + '/art.jpg')
+        generator.create_from_url(cdn.url + '/art.jpg')
+
+        assert canvas.shape == (270, 480, 3)
+        assert abs(int(canvas[135, 240, 0]) - 200) < 5
+        assert cdn.bodies_sent == 1
+
+    def test_is_remote(self):
+        assert is_remote("https://cdn.example.com/a.jpg")
+        assert not is_remote("data:image/png;base64,AAAA")
+        assert not is_remote("/tmp/a.jpg")
+        assert not is_remote(None)
@@ -0,0 +1,141 @@
+"""
+Tests for multi-process SKU batch execution
+"""
+import os
+import threading
+import time
+
+import pytest
+
+from render_pool import run_sku_jobs, sku_lock
+
+
+def echo_worker(sku):
+    """Report which process rendered the SKU"""
+    return {'sku': sku, 'status': 'success', 'pid': os.getpid()}
+
+
+def crashing_worker(sku):
+    """Hard-crash the worker process for one SKU, raise for another"""
+    if sku == 'CRASH':
+        os._exit(3)
+    if sku == 'RAISE':
+        raise ValueError("bad crop")
+    return {'sku': sku, 'status': 'success'}
+
+
+def large_worker(sku):
+    """Return a result far bigger than a pipe buffer (64 KB on Linux)"""
+    return {'sku': sku, 'status': 'success', 'payload': 'x' * 300_000}
+
+
+# Held by a parent thread while workers start, like an upload thread's lock
+_parent_lock = threading.Lock()
+
+
+def lock_worker(sku):
+    """Report whether the worker could take a lock the parent's thread holds"""
+    acquired = _parent_lock.acquire(timeout=2)
+    return {'sku': sku, 'status': 'success', 'acquired': acquired}
+
+
+class TestRunSkuJobs:
+    """Process-pool dispatch of per-SKU jobs"""
+
+    @pytest.mark.parametrize("jobs", [1, 3])
+    def test_each_sku_runs_once(self, jobs):
+        """Duplicate SKUs are only dispatched once"""
+        results = list(run_sku_jobs(['A', 'B', 'A', 'C', 'B'], echo_worker, jobs))
+        assert sorted(r['sku'] for r in results) == ['A', 'B', 'C']
+
+    def test_parallel_jobs_use_worker_processes(self):
+        """jobs > 1 renders outside the parent process"""
+        results = list(run_sku_jobs(['A', 'B', 'C', 'D'], echo_worker, jobs=2))
+        assert all(r['pid'] != os.getpid() for r in results)
+
+    def test_large_results(self):
+        """Results bigger than the pipe buffer are read while the worker is still sending them"""
+        results = list(run_sku_jobs(['A', 'B', 'C'], large_worker, jobs=2))
+
+        assert sorted(r['sku'] for r in results) == ['A', 'B', 'C']
+        assert all(len(r['payload']) == 300_000 for r in results)
+
+    def test_worker_crash_is_isolated(self):
+        """A crashing or raising SKU fails alone; the batch carries on"""
+        results = {
+            r['sku']: r
+            for r in run_sku_jobs(['A', 'CRASH', 'RAISE', 'B'], crashing_worker, jobs=2)
+        }
+
+        assert results['A']['status'] == 'success'
+        assert results['B']['status'] == 'success'
+        assert results['CRASH']['status'] == 'failed'
+        assert 'exit code 3' in results['CRASH']['error']
+        assert results['RAISE']['status'] == 'failed'
+        assert 'bad crop' in results['RAISE']['error']
+
+    def test_workers_do_not_inherit_held_locks(self):
+        """Workers start clean even while another parent thread holds a lock"""
+        release = threading.Event()
+
+        def hold():
+            with _parent_lock:
+                release.wait()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        try:
+            results = list(run_sku_jobs(['A', 'B'], lock_worker, jobs=2))
+        finally:
+            release.set()
+            holder.join()
+
+        assert all(r['acquired'] for r in results)
+
+
+class TestSkuLock:
+    """Per-SKU lock files"""
+
+    def test_lock_is_exclusive(self, tmp_path):
+        """A SKU cannot be locked twice while held"""
+        with sku_lock(tmp_path, 'SKU1') as first:
+            assert first
+            with sku_lock(tmp_path, 'SKU1') as second:
+                assert not second
+        assert not (tmp_path / 'SKU1.lock').exists()
+
+    def test_stale_lock_is_taken_over(self, tmp_path):
+        """A lock left by a dead process does not block the SKU forever"""
+        (tmp_path / 'SKU1.lock').write_text('999999999')
+        with sku_lock(tmp_path, 'SKU1') as acquired:
+            assert acquired
+
+    def test_one_holder_at_a_time(self, tmp_path):
+        """Racing for a stale lock, no two holders ever overlap"""
+        (tmp_path / 'SKU1.lock').write_text('999999999')
+        state = {'holders': 0, 'peak': 0, 'acquired': 0}
+        guard = threading.Lock()
+        start = threading.Barrier(8)
+
+        def contend():
+            start.wait()
+            for _ in range(20):
+                with sku_lock(tmp_path, 'SKU1') as acquired:
+                    if not acquired:
+                        continue
+                    with guard:
+                        state['holders'] += 1
+                        state['acquired'] += 1
+                        state['peak'] = max(state['peak'], state['holders'])
+                    time.sleep(0.001)
+                    with guard:
+                        state['holders'] -= 1
+
+        threads = [threading.Thread(target=contend) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert state['acquired'] > 0
+        assert state['peak'] == 1
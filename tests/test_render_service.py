@@ -0,0 +1,244 @@
+"""
+Tests for the warm render service
+"""
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import pytest
+
+from image_cache import ImageCache
+from render_service import RenderService, is_loopback, make_server, serve
+
+ARTWORK = {'sku': 'SVC-001', 'title': 'Test Artwork', 'artist': 'Test Artist', 'price': '99.99'}
+
+
+@pytest.fixture
+def make_service(tmp_path, monkeypatch):
+    """Factory for started services rendering 2 fps previews, with an in-memory image cache"""
+    monkeypatch.setattr('video_generator.default_cache', lambda: ImageCache(disk_dir=None))
+    services = []
+
+    def make(**kwargs):
+        service = RenderService(tmp_path / "videos", **kwargs).start()
+        service.generator(preview=True).fps = 2
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.stop()
+
+
+@pytest.fixture
+def service(make_service):
+    return make_service()
+
+
+@pytest.fixture
+def api(service):
+    """The service's HTTP API on a free local port"""
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def artwork_path(tmp_path):
+    path = tmp_path / "art.jpg"
+    img = np.random.default_rng(0).integers(0, 255, (400, 600, 3), dtype=np.uint8)
+    cv2.imwrite(str(path), img)
+    return str(path)
+
+
+def call(url, body=None):
+    """(status, decoded JSON or raw bytes) of a GET, or a POST when body is given"""
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            status, payload, kind = response.status, response.read(), response.headers['Content-Type']
+    except urllib.error.HTTPError as e:
+        status, payload, kind = e.code, e.read(), e.headers['Content-Type']
+    return status, json.loads(payload) if kind == 'application/json' else payload
+
+
+class TestRenderService:
+    """Jobs are queued, rendered by warm generators and tracked"""
+
+    def test_job_lifecycle(self, service, artwork_path):
+        """submit returns at once; the job ends up done with its video data"""
+        job = service.submit(ARTWORK, image_path=artwork_path, preview=True)
+        assert job['status'] == 'queued'
+
+        job = service.wait(job['id'], timeout=60)
+
+        assert job['status'] == 'done'
+        assert job['video']['url'].startswith('/videos/SVC-001_')
+        assert (service.output_dir / job['video']['url'].split('/')[-1]).exists()
+
+    def test_generator_stays_warm(self, service, artwork_path):
+        """Every job reuses the same generator"""
+        generator = service.generator(preview=True)
+        first = service.submit(ARTWORK, image_path=artwork_path, preview=True)
+        second = service.submit(dict(ARTWORK, sku='SVC-002'), image_path=artwork_path, preview=True)
+
+        assert service.wait(first['id'], timeout=60)['status'] == 'done'
+        assert service.wait(second['id'], timeout=60)['status'] == 'done'
+        assert service.generator(preview=True) is generator
+
+    def test_failed_job(self, service, tmp_path):
+        """A render that can't load its image is marked failed with the reason"""
+        job = service.submit(ARTWORK, image_path=str(tmp_path / "missing.jpg"), preview=True)
+        job = service.wait(job['id'], timeout=60)
+
+        assert job['status'] == 'failed'
+        assert job['error']
+        assert 'video' not in job
+
+    def test_concurrent_jobs_for_one_sku(self, make_service, artwork_path):
+        """Jobs rendering the same SKU at once write separate videos, named by job id"""
+        service = make_service(workers=2)
+        jobs = [service.submit(ARTWORK, image_path=artwork_path, preview=True) for _ in range(2)]
+        jobs = [service.wait(job['id'], timeout=60) for job in jobs]
+
+        assert [job['status'] for job in jobs] == ['done', 'done']
+        assert [job['video']['url'] for job in jobs] == [
+            f"/videos/SVC-001_{job['id']}_preview.mp4" for job in jobs
+        ]
+        assert all((service.output_dir / f"SVC-001_{job['id']}_preview.mp4").exists() for job in jobs)
+
+    def test_old_finished_jobs_are_forgotten(self, make_service, artwork_path):
+        """Only the most recent max_finished finished jobs are kept"""
+        service = make_service(max_finished=1)
+        first = service.submit(ARTWORK, image_path=artwork_path, preview=True)
+        service.wait(first['id'], timeout=60)
+        second = service.submit(ARTWORK, image_path=artwork_path, preview=True)
+        service.wait(second['id'], timeout=60)
+
+        assert service.status(first['id']) is None
+        assert [job['id'] for job in service.jobs()] == [second['id']]
+
+    def test_unknown_job(self, service):
+        assert service.status('nope') is None
+
+    def test_image_root_and_callback_hosts(self, make_service, artwork_path, tmp_path):
+        """Image paths outside image_root and callbacks to other hosts are refused"""
+        service = make_service(image_root=tmp_path, callback_hosts=['127.0.0.1'])
+
+        with pytest.raises(ValueError, match="image root"):
+            service.submit(ARTWORK, image_path="/etc/passwd")
+        with pytest.raises(ValueError, match="image root"):
+            service.submit(ARTWORK, image_path=str(tmp_path / ".." / "art.jpg"))
+        with pytest.raises(ValueError, match="host is not allowed"):
+            service.submit(ARTWORK, image_path=artwork_path, callback_url="http://169.254.169.254/")
+        with pytest.raises(ValueError, match="http"):
+            service.submit(ARTWORK, image_path=artwork_path, callback_url="file:///etc/passwd")
+
+        job = service.submit(ARTWORK, image_path=artwork_path, preview=True,
+                             callback_url="http://127.0.0.1:1/done")
+        assert service.wait(job['id'], timeout=60)['status'] == 'done'
+
+    def test_remote_listening_needs_opt_in(self, tmp_path):
+        """Non-loopback addresses are refused without allow_remote and an image root"""
+        assert is_loopback('127.0.0.1') and is_loopback('::1') and is_loopback('localhost')
+        assert not is_loopback('0.0.0.0') and not is_loopback('')
+
+        with pytest.raises(SystemExit, match="--allow-remote"):
+            serve(tmp_path / "videos", host='0.0.0.0')
+        with pytest.raises(SystemExit, match="--image-root"):
+            serve(tmp_path / "videos", host='0.0.0.0', allow_remote=True)
+
+
+class TestHttpApi:
+    """The local HTTP front end"""
+
+    def test_submit_poll_and_download(self, api, service, artwork_path):
+        """POST /jobs answers 202 with a job id; the finished video is served under /videos/"""
+        status, job = call(api.url + '/jobs', {'artwork': ARTWORK, 'image_path': artwork_path, 'preview': True})
+        assert status == 202
+        assert job['status_url'] == f"/jobs/{job['id']}"
+
+        service.wait(job['id'], timeout=60)
+        status, job = call(api.url + job['status_url'])
+        assert status == 200
+        assert job['status'] == 'done'
+
+        status, video = call(api.url + job['video']['url'])
+        assert status == 200
+        assert video[4:8] == b'ftyp'
+
+        status, jobs = call(api.url + '/jobs')
+        assert [j['id'] for j in jobs] == [job['id']]
+
+    def test_callback(self, api, service, artwork_path):
+        """callback_url is POSTed the finished job"""
+        received = []
+
+        class Callback(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+                self.send_response(204)
+                self.end_headers()
+
+        callback = ThreadingHTTPServer(('127.0.0.1', 0), Callback)
+        thread = threading.Thread(target=callback.serve_forever, daemon=True)
+        thread.start()
+        try:
+            _, job = call(api.url + '/jobs', {
+                'artwork': ARTWORK, 'image_path': artwork_path, 'preview': True,
+                'callback_url': f"http://127.0.0.1:{callback.server_port}/done"
+            })
+            service.wait(job['id'], timeout=60)
+            service.stop()  # the callback is sent before the worker takes the next job
+        finally:
+            callback.shutdown()
+            callback.server_close()
+
+        assert [r['id'] for r in received] == [job['id']]
+        assert received[0]['status'] == 'done'
+
+    @pytest.mark.parametrize("body, error", [
+        ({}, "'artwork' object is required"),
+        ({'artwork': ARTWORK}, "'image_path' or artwork 'imageUrl' is required"),
+    ])
+    def test_bad_requests(self, api, body, error):
+        status, payload = call(api.url + '/jobs', body)
+        assert status == 400
+        assert payload['error'] == error
+
+    def test_refused_request(self, make_service, tmp_path, artwork_path):
+        """A job the service refuses is a 400 with the reason"""
+        service = make_service(image_root=tmp_path / "images")
+        server = make_server(service, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            status, payload = call(f"http://127.0.0.1:{server.server_port}/jobs",
+                                   {'artwork': ARTWORK, 'image_path': artwork_path})
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert status == 400
+        assert payload['error'] == "'image_path' must be inside the service's image root"
+        assert service.jobs() == []
+
+    def test_not_found(self, api, tmp_path):
+        """Unknown jobs and paths outside the output directory are 404s"""
+        (tmp_path / "secret.txt").write_text("no")
+
+        assert call(api.url + '/jobs/nope')[0] == 404
+        assert call(api.url + '/videos/../secret.txt')[0] == 404
+        assert call(api.url + '/health') == (200, {'status': 'ok', 'jobs': 0})
@@ -0,0 +1,82 @@
+"""
+Tests for poster frames and scrubbing storyboards
+"""
+import cv2
+import numpy as np
+
+from storyboard import StoryboardTap, vtt_timestamp
+
+
+def numbered_frames(count, size=(320, 180)):
+    """Frames whose brightness is their index, drawn into one reused buffer"""
+    w, h = size
+    frame = np.zeros((h, w, 3), dtype=np.uint8)
+    for i in range(count):
+        frame[...] = i
+        yield frame
+
+
+class TestStoryboardTap:
+    """Poster and tiles are taken from the stream as it goes by"""
+
+    def test_passes_frames_through(self):
+        """Tapping doesn't change or drop frames"""
+        tap = StoryboardTap(fps=10)
+        seen = [int(f[0, 0, 0]) for f in tap.tap(numbered_frames(25))]
+
+        assert seen == list(range(25))
+        assert tap.frames_seen == 25
+
+    def test_tiles_and_poster(self):
+        """Every N-th frame becomes a tile; the poster is a copy of the chosen frame"""
+        tap = StoryboardTap(fps=10, every=10, poster_frame=12)
+        for _ in tap.tap(numbered_frames(25)):
+            pass
+
+        assert [int(t[0, 0, 0]) for t in tap.tiles] == [0, 10, 20]
+        assert tap.tiles[0].shape == (90, 160, 3)
+        assert int(tap.poster[0, 0, 0]) == 12
+
+    def test_poster_falls_back_to_first_frame(self):
+        """A video shorter than the poster index still gets a poster"""
+        tap = StoryboardTap(fps=10, poster_frame=100)
+        for _ in tap.tap(numbered_frames(5)):
+            pass
+
+        assert int(tap.poster[0, 0, 0]) == 0
+
+    def test_webvtt_cues(self):
+        """Cues cover the video back to back and point at tiles in the sheet"""
+        tap = StoryboardTap(fps=10, every=10, columns=2)
+        for _ in tap.tap(numbered_frames(25)):
+            pass
+
+        lines = tap.webvtt("sheet.jpg").splitlines()
+        assert lines[0] == "WEBVTT"
+        assert lines[2:4] == ["00:00:00.000 --> 00:00:01.000", "sheet.jpg#xywh=0,0,160,90"]
+        assert lines[5:7] == ["00:00:01.000 --> 00:00:02.000", "sheet.jpg#xywh=160,0,160,90"]
+        assert lines[8:10] == ["00:00:02.000 --> 00:00:02.500", "sheet.jpg#xywh=0,90,160,90"]
+
+    def test_write(self, tmp_path):
+        """Poster, sprite sheet and index are written next to the video"""
+        tap = StoryboardTap(fps=10, every=5, columns=4)
+        for _ in tap.tap(numbered_frames(30)):
+            pass
+
+        stills = tap.write(tmp_path / "SKU.mp4")
+
+        assert stills['poster'] == tmp_path / "SKU_poster.jpg"
+        assert cv2.imread(str(stills['poster'])).shape == (180, 320, 3)
+        # 6 tiles, 4 per row
+        assert cv2.imread(str(stills['storyboard'])).shape == (180, 640, 3)
+        assert "SKU_storyboard.jpg#xywh=" in stills['storyboard_vtt'].read_text()
+
+    def test_nothing_to_write(self, tmp_path):
+        """No frames, no files"""
+        assert StoryboardTap(fps=10).write(tmp_path / "SKU.mp4") == {}
+        assert list(tmp_path.iterdir()) == []
+
+
+def test_vtt_timestamp():
+    assert vtt_timestamp(0) == "00:00:00.000"
+    assert vtt_timestamp(3725.5) == "01:02:05.500"
@@ -0,0 +1,123 @@
+"""
+Tests for the timeline compiler and executor
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from timeline import compile_timeline, iter_plan_frames
+
+SAMPLE_SPEC = Path(__file__).resolve().parent.parent / "sample_output" / "video_spec.json"
+
+
+@pytest.fixture
+def sample_plan():
+    """The sample video_spec.json, compiled"""
+    with open(SAMPLE_SPEC) as f:
+        return compile_timeline(json.load(f), "sources")
+
+
+def small_spec():
+    """A 6-second, 64x36 timeline with a gap and an overlay"""
+    return {
+        "video_settings": {"resolution": [64, 36], "frame_rate": 5},
+        "timeline": [
+            {"segment": "open", "start": 0, "end": 2, "source": "a.jpg", "effect": "zoom_in"},
+            {"segment": "pan", "start": 2, "end": 3, "source": "b.jpg", "effect": "pan",
+             "direction": "left_to_right"},
+            {"segment": "hold", "start": 4, "end": 5, "source": "a.jpg", "effect": "hold",
+             "overlay": "Hi"},
+            {"segment": "close", "start": 5, "end": 6, "source": "b.jpg", "effect": "fade_out"},
+        ],
+    }
+
+
+class TestCompile:
+    """Spec -> RenderPlan"""
+
+    def test_sample_frame_ranges(self, sample_plan):
+        """Segments tile the whole video on frame boundaries"""
+        assert sample_plan.total_frames == 1350
+        assert sample_plan.size == (1920, 1080)
+
+        segments = sample_plan.segments
+        assert segments[0]['start_frame'] == 0
+        assert segments[-1]['end_frame'] == 1350
+        for prev, seg in zip(segments, segments[1:]):
+            assert prev['end_frame'] == seg['start_frame']
+
+    def test_sources_are_deduplicated(self, sample_plan):
+        """full_artwork.jpg is used five times but gets one handle"""
+        names = [p.name for p in sample_plan.sources]
+        assert len(names) == len(set(names))
+        assert names.count('full_artwork.jpg') == 1
+
+    def test_effect_parameters(self, sample_plan):
+        """Zoom ranges and pan directions come from the spec"""
+        by_name = {s['name']: s for s in sample_plan.segments}
+        assert by_name['detail_3']['kind'] == 'motion'
+        assert (by_name['detail_3']['start_zoom'], by_name['detail_3']['end_zoom']) == (1.1, 1.4)
+        assert by_name['detail_1']['direction'] == 'left_to_right'
+        assert by_name['quote']['kind'] == 'still'
+        assert by_name['closing']['fade'] == 'out'
+
+    def test_overlay_index(self, sample_plan):
+        """text_overlays win over a segment's overlay with the same text"""
+        texts = lambda frame: [sample_plan.overlays[i]['text'] for i in sample_plan.overlays_at(frame)]
+
+        assert texts(0) == []
+        assert texts(17 * 30) == ["Own a piece of history"]
+        assert texts(25 * 30) == ["Artist: Shepard Fairey"]
+        # www.gallery.com starts at 40s, not when the closing segment does
+        assert texts(38 * 30) == []
+        assert texts(1349) == ["www.gallery.com"]
+
+    def test_overlapping_segments(self):
+        """Overlapping segments are rejected"""
+        spec = small_spec()
+        spec['timeline'][1]['start'] = 1
+        with pytest.raises(ValueError):
+            compile_timeline(spec)
+
+    def test_unknown_effect(self):
+        """Effects the renderer can't draw are rejected"""
+        spec = small_spec()
+        spec['timeline'][0]['effect'] = 'spin'
+        with pytest.raises(ValueError):
+            compile_timeline(spec)
+
+
+class TestExecute:
+    """Streaming a RenderPlan"""
+
+    def test_streams_every_frame(self):
+        """Each source is decoded once and every frame is produced in order"""
+        plan = compile_timeline(small_spec())
+        loads = []
+
+        def loader(path, size):
+            loads.append(path.name)
+            canvas = np.full((size[1], size[0], 3), 200, dtype=np.uint8)
+            canvas.flags.writeable = False
+            return canvas
+
+        frames = [frame.copy() for frame in iter_plan_frames(plan, loader)]
+
+        assert len(frames) == plan.total_frames == 30
+        assert sorted(loads) == ['a.jpg', 'b.jpg']
+        assert all(f.shape == (36, 64, 3) for f in frames)
+
+        # Gap between 3s and 4s is black
+        assert frames[15].max() == 0
+        # Hold with an overlay is drawn on a copy, not the shared canvas
+        assert not np.array_equal(frames[20], frames[0])
+        # Fade out ends at black
+        assert frames[-1].max() == 0
+
+    def test_missing_source(self):
+        """Unreadable sources fail loudly"""
+        plan = compile_timeline(small_spec())
+        with pytest.raises(ValueError):
+            list(iter_plan_frames(plan, lambda path, size: None))
@@ -0,0 +1,233 @@
+"""
+Tests for the background upload stage
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from uploader import DriveClient, UploadQueue, upload_state_path
+
+
+class FakeDrive(BaseHTTPRequestHandler):
+    """Just enough of the Drive v3 resumable upload protocol"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        """Start an upload session"""
+        length = int(self.headers.get('Content-Length', 0))
+        metadata = json.loads(self.rfile.read(length) or b'{}')
+        self.server.sessions.append(metadata)
+        self.server.stored.append(b'')
+
+        self.send_response(200)
+        self.send_header('Location', f"http://{self.headers['Host']}/session/{len(self.server.sessions) - 1}")
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_PUT(self):
+        """Store a chunk ('bytes a-b/total') or report progress ('bytes */total')"""
+        session = int(self.path.rsplit('/', 1)[-1])
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        content_range = self.headers.get('Content-Range', f"bytes 0-{length - 1}/{length}")
+        spec, total = content_range.split(' ', 1)[1].split('/')
+
+        if spec != '*':
+            start = int(spec.split('-')[0])
+            assert start == len(self.server.stored[session]), "chunk doesn't continue the upload"
+            self.server.stored[session] += body
+            self.server.received.append(body)
+
+        stored = len(self.server.stored[session])
+        if stored < int(total):
+            self.send_response(308)
+            if stored:
+                self.send_header('Range', f"bytes=0-{stored - 1}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = json.dumps({'id': f"file-{session}", 'webViewLink': f"http://drive/file-{session}"}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def fake_drive():
+    """Local fake Drive endpoint, served from a background thread"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeDrive)
+    server.sessions = []
+    server.stored = []
+    server.received = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestUploadQueue:
+    """Uploads run in the background with bounded concurrency"""
+
+    def test_results_and_concurrency_limit(self):
+        """Every queued upload reports back, never more than `workers` at once"""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def upload(video_file, sku):
+            with lock:
+                active.append(sku)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(sku)
+            return f"id-{sku}"
+
+        with UploadQueue(upload, workers=2) as uploads:
+            for i in range(6):
+                uploads.submit(f"SKU{i}", f"SKU{i}.mp4")
+            results = list(uploads.results())
+
+        assert sorted(r['sku'] for r in results) == [f"SKU{i}" for i in range(6)]
+        assert all(r['status'] == 'uploaded' for r in results)
+        assert max(peak) <= 2
+
+    def test_submit_does_not_block(self):
+        """Submitting returns before the upload finishes"""
+        release = threading.Event()
+
+        with UploadQueue(lambda video_file, sku: release.wait(5) and 'id', workers=1) as uploads:
+            future = uploads.submit("SKU", "SKU.mp4")
+            assert not future.done()
+            release.set()
+            assert [r['status'] for r in uploads.results()] == ['uploaded']
+
+    def test_failures_are_reported(self):
+        """Exceptions and missing file ids become failed results"""
+        def upload(video_file, sku):
+            if sku == 'boom':
+                raise ConnectionError("reset")
+            return None
+
+        with UploadQueue(upload) as uploads:
+            uploads.submit('boom', 'a.mp4')
+            uploads.submit('none', 'b.mp4')
+            results = {r['sku']: r for r in uploads.results()}
+
+        assert results['boom']['status'] == 'failed'
+        assert 'reset' in results['boom']['error']
+        assert results['none']['status'] == 'failed'
+
+
+class TestDriveClient:
+    """The shared client against a local fake Drive endpoint"""
+
+    def test_uploads_from_many_threads(self, fake_drive, tmp_path):
+        """One client, one connection per upload thread"""
+        pytest.importorskip("googleapiclient")
+        pytest.importorskip("google_auth_httplib2")
+        from google.auth.credentials import AnonymousCredentials
+
+        endpoint = f"http://127.0.0.1:{fake_drive.server_address[1]}"
+        client = DriveClient(AnonymousCredentials(), api_endpoint=endpoint)
+
+        videos = []
+        for i in range(4):
+            video = tmp_path / f"SKU{i}.mp4"
+            video.write_bytes(bytes([i]) * 1000)
+            videos.append(video)
+
+        def upload(video_file, sku):
+            return client.upload(video_file, f"{sku}.mp4", 'folder')['id']
+
+        with UploadQueue(upload, workers=2) as uploads:
+            for video in videos:
+                uploads.submit(video.stem, video)
+            results = list(uploads.results())
+
+        assert all(r['status'] == 'uploaded' for r in results)
+        assert sorted(s['name'] for s in fake_drive.sessions) == [f"SKU{i}.mp4" for i in range(4)]
+        assert all(s['parents'] == ['folder'] for s in fake_drive.sessions)
+        assert sorted(fake_drive.stored) == sorted(v.read_bytes() for v in videos)
+
+
+@pytest.fixture
+def client(fake_drive):
+    """DriveClient pointed at the fake endpoint"""
+    pytest.importorskip("googleapiclient")
+    pytest.importorskip("google_auth_httplib2")
+    from google.auth.credentials import AnonymousCredentials
+
+    return DriveClient(AnonymousCredentials(), api_endpoint=f"http://127.0.0.1:{fake_drive.server_address[1]}")
+
+
+class TestResumableUpload:
+    """Chunked uploads that survive interruptions"""
+
+    CHUNK = 256 * 1024
+
+    def make_video(self, tmp_path, chunks=4):
+        video = tmp_path / "SKU.mp4"
+        video.write_bytes(np.random.default_rng(0).bytes(self.CHUNK * chunks - 100))
+        return video
+
+    def test_progress_per_chunk(self, client, fake_drive, tmp_path):
+        """Each chunk reports progress and the state file is removed at the end"""
+        video = self.make_video(tmp_path)
+        reports = []
+
+        client.upload(video, "SKU.mp4", 'folder', chunk_size=self.CHUNK,
+                      progress=lambda sent, total: reports.append((sent, total)))
+
+        size = video.stat().st_size
+        assert [sent for sent, _ in reports] == [self.CHUNK, 2 * self.CHUNK, 3 * self.CHUNK, size]
+        assert all(total == size for _, total in reports)
+        assert fake_drive.stored == [video.read_bytes()]
+        assert not upload_state_path(video).exists()
+
+    def test_resumes_after_crash(self, client, fake_drive, tmp_path):
+        """A later attempt continues the saved session instead of starting over"""
+        video = self.make_video(tmp_path)
+
+        def crash(sent, total):
+            if sent >= 2 * self.CHUNK:
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            client.upload(video, "SKU.mp4", 'folder', chunk_size=self.CHUNK, progress=crash)
+
+        state = json.loads(upload_state_path(video).read_text())
+        assert state['offset'] == 2 * self.CHUNK
+
+        result = client.upload(video, "SKU.mp4", 'folder', chunk_size=self.CHUNK)
+
+        assert result['id'] == 'file-0'
+        assert len(fake_drive.sessions) == 1
+        assert len(fake_drive.received) == 4
+        assert fake_drive.stored == [video.read_bytes()]
+
+    def test_changed_file_starts_over(self, client, fake_drive, tmp_path):
+        """A saved session for an older render of the file is discarded"""
+        video = self.make_video(tmp_path)
+
+        def crash(sent, total):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            client.upload(video, "SKU.mp4", 'folder', chunk_size=self.CHUNK, progress=crash)
+
+        video.write_bytes(b"re-rendered")
+        client.upload(video, "SKU.mp4", 'folder', chunk_size=self.CHUNK)
+
+        assert len(fake_drive.sessions) == 2
+        assert fake_drive.stored[1] == b"re-rendered"
@@ -0,0 +1,163 @@
+"""
+Tests for the ArtworkVideoGenerator rendering pipeline
+"""
+import types
+
+import cv2
+import numpy as np
+import pytest
+
+from video_generator import ArtworkVideoGenerator
+
+
+ARTWORK_DATA = {
+    'sku': 'TEST-001',
+    'title': 'Test Artwork',
+    'artist': 'Test Artist',
+    'price': '99.99'
+}
+
+
+@pytest.fixture
+def generator(tmp_path):
+    """Small, low frame rate generator so tests stay fast"""
+    gen = ArtworkVideoGenerator(output_dir=tmp_path / "videos")
+    gen.fps = 2
+    return gen
+
+
+@pytest.fixture
+def base_img(generator):
+    """Synthetic artwork already sized to the video canvas"""
+    img = np.random.default_rng(0).integers(
+        0, 255, (400, 800, 3), dtype=np.uint8
+    )
+    return generator.resize_and_pad(img)
+
+
+class TestFrameStreaming:
+    """Sequences are generated lazily, one frame at a time"""
+
+    def test_sequences_are_generators(self, generator, base_img):
+        """Intro, main sequence, outro and effects yield frames"""
+        for seq in (
+            generator.create_intro(base_img, ARTWORK_DATA),
+            generator.create_main_sequence(base_img, ARTWORK_DATA),
+            generator.create_outro(base_img, ARTWORK_DATA),
+            generator.apply_effect(base_img, 'ken_burns', 1)
+        ):
+            assert isinstance(seq, types.GeneratorType)
+
+    def test_frame_counts(self, generator, base_img):
+        """Each sequence yields fps * duration frames"""
+        fps = generator.fps
+        assert sum(1 for _ in generator.create_intro(base_img, ARTWORK_DATA)) == fps * 3
+        assert sum(1 for _ in generator.create_main_sequence(base_img, ARTWORK_DATA)) == fps * 24
+        assert sum(1 for _ in generator.create_outro(base_img, ARTWORK_DATA)) == fps * 3
+
+    @pytest.mark.parametrize("effect", [
+        'ken_burns', 'zoom_detail_topleft', 'zoom_detail_center',
+        'pan_horizontal', 'rotate_slow', 'static'
+    ])
+    def test_effect_frame_shape(self, generator, base_img, effect):
+        """Every effect yields full-size BGR frames"""
+        frames = list(generator.apply_effect(base_img, effect, 1))
+        assert len(frames) == generator.fps
+        for frame in frames:
+            assert frame.shape == (generator.height, generator.width, 3)
+
+
+class TestSegments:
+    """Timeline split into independently renderable segments"""
+
+    def test_segments_match_serial_stream(self, generator, base_img):
+        """Rendering segment by segment reproduces the serial frame stream"""
+        # Intro and outro frames are reused buffers, so keep copies
+        serial = [f.copy() for f in generator.create_intro(base_img, ARTWORK_DATA)]
+        serial += [f.copy() for f in generator.create_main_sequence(base_img, ARTWORK_DATA)]
+        serial += [f.copy() for f in generator.create_outro(base_img, ARTWORK_DATA)]
+
+        segmented = [
+            frame.copy()
+            for segment in generator.get_segments()
+            for frame in generator.render_segment(segment, base_img, ARTWORK_DATA)
+        ]
+
+        assert len(segmented) == len(serial) == generator.fps * generator.duration
+        for a, b in zip(serial, segmented):
+            assert np.array_equal(a, b)
+
+
+class TestFades:
+    """Intro and outro fades"""
+
+    def test_intro_never_brighter_than_source(self, generator, base_img):
+        """The intro fade is clamped at full brightness"""
+        generator.fps = 4
+        frames = [f.copy() for f in generator.create_intro(base_img, ARTWORK_DATA)]
+
+        assert not frames[0].any()
+        # Frames after the fade but before the title equal the source
+        assert np.array_equal(frames[6], base_img)
+
+    def test_outro_fades_to_black(self, generator, base_img):
+        """The outro ends on black behind the call to action"""
+        frames = [f.copy() for f in generator.create_outro(base_img, ARTWORK_DATA)]
+        assert frames[-1][:50].max() == 0
+
+
+class TestPreview:
+    """Low-resolution proxy renders"""
+
+    def test_preview_settings(self, tmp_path, base_img):
+        """Previews render small and at a low frame rate, for the same duration"""
+        preview = ArtworkVideoGenerator(output_dir=tmp_path / "previews", preview=True)
+        canvas = preview.resize_and_pad(base_img)
+
+        frames = list(preview.apply_effect(canvas, 'ken_burns', 2))
+
+        assert len(frames) == 2 * preview.fps
+        assert frames[0].shape == (preview.height, preview.width, 3)
+        assert preview.preset == 'ultrafast'
+
+    def test_matches_product_previews(self, tmp_path):
+        """Artwork and product previews share one set of settings"""
+        import create_product_videos as cpv
+
+        preview = ArtworkVideoGenerator(output_dir=tmp_path / "previews", preview=True)
+        profile = cpv.render_profile(preview=True)
+
+        assert (preview.width, preview.height) == profile['size']
+        assert preview.fps == profile['fps']
+        assert preview.preset == profile['preset']
+        assert preview.overlay_scale == profile['scale']
+
+    def test_no_poster_or_storyboard(self, tmp_path, base_img, monkeypatch):
+        """Like product previews, artwork previews skip the poster and storyboard"""
+        from image_cache import ImageCache
+
+        monkeypatch.setattr('video_generator.default_cache', lambda: ImageCache(disk_dir=None))
+        path = tmp_path / "art.jpg"
+        cv2.imwrite(str(path), base_img)
+        preview = ArtworkVideoGenerator(output_dir=tmp_path / "previews", preview=True)
+        preview.fps = 2
+
+        video = preview.create_video_from_artwork(str(path), ARTWORK_DATA, job_id='job1')
+
+        assert video['url'] == '/videos/TEST-001_job1_preview.mp4'
+        assert video['poster'] is None and video['storyboard'] is None
+        assert not list((tmp_path / "previews").glob('*_storyboard*'))
+        assert not list((tmp_path / "previews").glob('*_poster*'))
+
+    def test_title_placement_scales(self, tmp_path):
+        """The title overlay covers the same part of the frame as in the final render"""
+        boxes = []
+        for preview in (False, True):
+            gen = ArtworkVideoGenerator(output_dir=tmp_path / "videos", preview=preview)
+            frame = np.zeros((gen.height, gen.width, 3), dtype=np.uint8)
+            frame = gen.add_title_overlay(frame, "Test Artwork", "Test Artist")
+
+            ys, xs = np.nonzero(frame.max(axis=2))
+            boxes.append(np.array([xs.min(), ys.min(), xs.max(), ys.max()]) / [gen.width, gen.height, gen.width, gen.height])
+
+        assert np.allclose(boxes[0], boxes[1], atol=0.02)
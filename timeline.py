@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Timeline Compiler
+Turns a video_spec.json-style timeline into a render plan (frame ranges,
+source handles, effect parameters and a per-frame overlay index) and
+streams that plan to the encoder, decoding each source only once
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from decode import imread_for_size
+from encoder import FFmpegWriter, held_frames
+from fades import Fader, fade_gains
+from image_cache import default_cache
+from motion import plan_ken_burns, render_window
+from overlays import text_overlay_sprite
+
+# Zoom range per effect when the spec doesn't give one
+DEFAULT_ZOOMS = {
+    'zoom_in': (1.0, 1.3),
+    'zoom_out': (1.3, 1.0),
+    'zoom': (1.0, 1.3),
+    'slow_zoom': (1.0, 1.15),
+    # Pans need some zoom so there is room to move
+    'pan': (1.2, 1.2),
+}
+
+# Effects that show the source without motion
+STILL_EFFECTS = {'hold', 'overlay', 'fade_in', 'fade_out'}
+
+# Spec overlay positions -> caption layouts
+OVERLAY_POSITIONS = {
+    'top': 'top',
+    'center': 'center',
+    'bottom': 'bottom',
+    'lower_third': 'bottom',
+}
+
+# Spec font sizes are in pixels; Hershey Simplex is ~32px tall at scale 1
+FONT_PIXELS_PER_SCALE = 32
+
+
+class RenderPlan:
+    """
+    A compiled timeline
+    segments: dicts with name, start_frame, end_frame, kind ('motion',
+    'still', 'gap'), source (index into sources) and effect parameters.
+    overlays: dicts with text, start_frame, end_frame, position, font_scale.
+    """
+
+    def __init__(self, fps, size, total_frames, sources, segments, overlays):
+        self.fps = fps
+        self.size = size
+        self.total_frames = total_frames
+        self.sources = sources
+        self.segments = segments
+        self.overlays = overlays
+
+        # Interval index: overlay ids active at every frame, for O(1) lookups
+        self.overlay_index = [()] * total_frames
+        for overlay_id, overlay in enumerate(overlays):
+            for frame in range(overlay['start_frame'], min(overlay['end_frame'], total_frames)):
+                self.overlay_index[frame] += (overlay_id,)
+
+    def overlays_at(self, frame_index):
+        """Ids of the overlays shown on a frame"""
+        return self.overlay_index[frame_index]
+
+    def to_dict(self):
+        """JSON-serializable view of the plan"""
+        return {
+            'fps': self.fps,
+            'size': list(self.size),
+            'total_frames': self.total_frames,
+            'sources': [str(s) for s in self.sources],
+            'segments': self.segments,
+            'overlays': self.overlays,
+        }
+
+
+def effect_params(entry):
+    """Compile one timeline entry's effect into render parameters"""
+    effect = entry['effect']
+
+    if effect in STILL_EFFECTS:
+        params = {'kind': 'still'}
+        if effect in ('fade_in', 'fade_out'):
+            params['fade'] = effect.split('_')[1]
+        return params
+
+    if effect not in DEFAULT_ZOOMS:
+        raise ValueError(f"Unknown effect '{effect}' in segment '{entry.get('segment')}'")
+
+    start_zoom, end_zoom = entry.get('zoom', DEFAULT_ZOOMS[effect])
+    return {
+        'kind': 'motion',
+        'start_zoom': start_zoom,
+        'end_zoom': end_zoom,
+        'direction': entry.get('direction', 'center') if effect == 'pan' else 'center',
+    }
+
+
+def compile_timeline(spec, source_dir='.', easing='linear'):
+    """Compile a video_spec.json-style dict into a RenderPlan"""
+    settings = spec.get('video_settings', {})
+    fps = settings.get('frame_rate', settings.get('fps', 30))
+    width, height = settings.get('resolution', [1920, 1080])
+    timeline = sorted(spec['timeline'], key=lambda entry: entry['start'])
+
+    total_frames = settings.get('total_frames')
+    if not total_frames:
+        duration = settings.get('duration_seconds') or timeline[-1]['end']
+        total_frames = round(duration * fps)
+
+    sources = []
+    source_ids = {}
+    segments = []
+    cursor = 0
+
+    def add_gap(start_frame, end_frame):
+        segments.append({
+            'name': 'gap', 'start_frame': start_frame, 'end_frame': end_frame,
+            'kind': 'gap', 'source': None
+        })
+
+    for entry in timeline:
+        start_frame = round(entry['start'] * fps)
+        end_frame = min(round(entry['end'] * fps), total_frames)
+
+        if start_frame < cursor:
+            raise ValueError(f"Segment '{entry['segment']}' overlaps the previous segment")
+        if start_frame > cursor:
+            add_gap(cursor, start_frame)
+
+        # Every distinct source gets one handle, however often it is used
+        name = entry['source']
+        if name not in source_ids:
+            source_ids[name] = len(sources)
+            sources.append(Path(source_dir) / name)
+
+        segment = {
+            'name': entry['segment'],
+            'start_frame': start_frame,
+            'end_frame': end_frame,
+            'source': source_ids[name],
+            'effect': entry['effect'],
+            'easing': easing,
+        }
+        segment.update(effect_params(entry))
+        segments.append(segment)
+        cursor = end_frame
+
+    if cursor < total_frames:
+        add_gap(cursor, total_frames)
+
+    # text_overlays are authoritative; per-segment overlays fill in the rest
+    overlays = []
+    for overlay in spec.get('text_overlays', []):
+        overlays.append({
+            'text': overlay['text'],
+            'start_frame': round(overlay['start'] * fps),
+            'end_frame': round(overlay['end'] * fps),
+            'position': OVERLAY_POSITIONS.get(overlay.get('position'), 'center'),
+            'font_scale': overlay.get('font_size', 48) / FONT_PIXELS_PER_SCALE,
+        })
+
+    listed = {overlay['text'] for overlay in overlays}
+    for entry in timeline:
+        if entry.get('overlay') and entry['overlay'] not in listed:
+            overlays.append({
+                'text': entry['overlay'],
+                'start_frame': round(entry['start'] * fps),
+                'end_frame': round(entry['end'] * fps),
+                'position': 'center',
+                'font_scale': 1.5,
+            })
+
+    return RenderPlan(fps, (width, height), total_frames, sources, segments, overlays)
+
+
+def letterbox(image, size):
+    """Resize an image to fit size (width, height), centered on black"""
+    width, height = size
+    h, w = image.shape[:2]
+
+    scale = min(width / w, height / h)
+    new_w = int(w * scale)
+    new_h = int(h * scale)
+
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    x_offset = (width - new_w) // 2
+    y_offset = (height - new_h) // 2
+    canvas[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = cv2.resize(image, (new_w, new_h))
+
+    return canvas
+
+
+def load_source(path, size):
+    """Letterboxed canvas for a source, from the shared image cache"""
+    def decode(path):
+        img = imread_for_size(path, size)
+        return None if img is None else letterbox(img, size)
+
+    return default_cache().get(path, size, decode)
+
+
+def segment_frames(segment, canvas, size):
+    """Yield the frames of one compiled segment"""
+    total = segment['end_frame'] - segment['start_frame']
+
+    if segment['kind'] == 'motion':
+        windows = plan_ken_burns(
+            size[0], size[1], total,
+            start_zoom=segment['start_zoom'],
+            end_zoom=segment['end_zoom'],
+            direction=segment['direction'],
+            easing=segment['easing']
+        )
+        for window in windows:
+            yield render_window(canvas, window, size)
+
+    elif segment.get('fade'):
+        yield from Fader(canvas).frames(fade_gains(total, total - 1, segment['fade']))
+
+    else:
+        yield from held_frames(canvas, total)
+
+
+def iter_plan_frames(plan, loader=load_source):
+    """
+    Stream every frame of a RenderPlan in order
+    Each source is decoded once (loader(path, size)) and released after its
+    last segment; overlays are looked up per frame from the interval index.
+    """
+    width, height = plan.size
+    black = np.zeros((height, width, 3), dtype=np.uint8)
+    black.flags.writeable = False
+    buffer = np.empty_like(black)
+
+    sprites = [
+        text_overlay_sprite(o['text'], o['position'], o['font_scale'], (255, 255, 255), width, height)
+        for o in plan.overlays
+    ]
+
+    last_use = {}
+    for index, segment in enumerate(plan.segments):
+        if segment['source'] is not None:
+            last_use[segment['source']] = index
+
+    canvases = {}
+    for index, segment in enumerate(plan.segments):
+        source = segment['source']
+
+        if source is None:
+            canvas = black
+        else:
+            if source not in canvases:
+                canvas = loader(plan.sources[source], plan.size)
+                if canvas is None:
+                    raise ValueError(f"Could not load source: {plan.sources[source]}")
+                canvases[source] = canvas
+            canvas = canvases[source]
+
+        for offset, frame in enumerate(segment_frames(segment, canvas, plan.size)):
+            overlay_ids = plan.overlays_at(segment['start_frame'] + offset)
+
+            if overlay_ids:
+                # Never draw onto shared source canvases
+                if frame is canvas or not frame.flags.writeable:
+                    np.copyto(buffer, frame)
+                    frame = buffer
+                for overlay_id in overlay_ids:
+                    sprites[overlay_id].apply(frame)
+
+            yield frame
+
+        if source is not None and last_use[source] == index:
+            del canvases[source]
+
+
+def render_timeline(plan, output_path, loader=load_source, **writer_options):
+    """Render a RenderPlan to an H.264 file; returns the number of frames written"""
+    with FFmpegWriter(output_path, plan.fps, plan.size, **writer_options) as out:
+        for frame in iter_plan_frames(plan, loader):
+            out.write(frame)
+
+    return out.frames_written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a video from a video_spec.json timeline")
+    parser.add_argument('spec', help="path to a video_spec.json-style file")
+    parser.add_argument('--sources', default='.', help="directory holding the timeline's source images")
+    parser.add_argument('--output', help="output video (default: the spec's output filename)")
+    parser.add_argument('--easing', default='linear', help="easing for zooms and pans")
+    parser.add_argument('--plan', action='store_true', help="print the compiled plan instead of rendering")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+
+    plan = compile_timeline(spec, args.sources, easing=args.easing)
+
+    if args.plan:
+        print(json.dumps(plan.to_dict(), indent=2))
+    else:
+        output = args.output or spec.get('output', {}).get('filename', 'timeline.mp4')
+        frames = render_timeline(plan, output)
+        print(f"✅ Video created: {output} ({frames} frames)")
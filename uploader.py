@@ -0,0 +1,245 @@
+"""
+Background Upload Stage
+Uploads finished videos from a bounded thread pool while the next SKUs
+render, sharing one authenticated Drive client across upload threads.
+Uploads go up in chunks and persist their resumable session, so an
+interrupted upload continues where it stopped instead of from byte zero.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# Resumable upload chunk size; Drive requires a multiple of 256 KB
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+UPLOAD_STATE_SUFFIX = '.upload.json'
+
+
+def upload_state_path(path):
+    """Default state file for a file's resumable upload session"""
+    path = Path(path)
+    return path.with_name(path.stem + UPLOAD_STATE_SUFFIX)
+
+
+def load_upload_state(state_path, path, name, folder_id):
+    """
+    Saved session for this upload, or None
+    Sessions for a different destination or for a file that has changed
+    since (re-rendered) are discarded.
+    """
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+    expected = {
+        'name': name,
+        'folder_id': folder_id,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+    if any(state.get(key) != value for key, value in expected.items()):
+        clear_upload_state(state_path)
+        return None
+
+    return state
+
+
+def save_upload_state(state_path, path, name, folder_id, session_uri, offset):
+    """Atomically record the session URI and the offset Drive has confirmed"""
+    stat = os.stat(path)
+    state = {
+        'name': name,
+        'folder_id': folder_id,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'session_uri': session_uri,
+        'offset': offset,
+    }
+
+    tmp_path = Path(f"{state_path}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def clear_upload_state(state_path):
+    """Forget a finished or stale session"""
+    Path(state_path).unlink(missing_ok=True)
+
+
+class DriveClient:
+    """
+    One authenticated Google Drive client for every upload thread
+    Discovery runs once; each thread gets its own authorized HTTP connection
+    because httplib2 connections can't be shared between threads.
+    """
+
+    def __init__(self, credentials, api_endpoint=None):
+        """api_endpoint replaces https://www.googleapis.com/ (e.g. a local fake Drive)"""
+        from googleapiclient.discovery import build, build_from_document
+        from googleapiclient.discovery_cache import get_static_doc
+
+        self.credentials = credentials
+
+        if api_endpoint:
+            # Rewrite the root URL itself: client_options only moves the
+            # host, which would keep media uploads on https
+            document = json.loads(get_static_doc('drive', 'v3'))
+            document['rootUrl'] = api_endpoint.rstrip('/') + '/'
+            document['baseUrl'] = document['rootUrl'] + document['servicePath']
+            self.service = build_from_document(document, credentials=credentials)
+        else:
+            self.service = build('drive', 'v3', credentials=credentials, cache_discovery=False)
+
+        self._local = threading.local()
+
+    def http(self):
+        """This thread's authorized HTTP connection"""
+        if not hasattr(self._local, 'http'):
+            import google_auth_httplib2
+            from googleapiclient.http import build_http
+
+            # build_http keeps 308 (resume incomplete) from being followed as a redirect
+            self._local.http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=build_http())
+        return self._local.http
+
+    def session_offset(self, session_uri, size):
+        """
+        Ask Drive how far a resumable session got
+        Returns (offset, None) for an open session, (size, file resource) if it
+        already completed, or (None, None) if the session is gone.
+        """
+        resp, content = self.http().request(
+            session_uri, method='PUT',
+            headers={'Content-Range': f"bytes */{size}", 'Content-Length': '0'}
+        )
+
+        if resp.status in (200, 201):
+            return size, json.loads(content)
+        if resp.status == 308:
+            # 'Range: bytes=0-N' means N+1 bytes were stored; no header means none
+            received = resp.get('range')
+            return (int(received.rsplit('-', 1)[1]) + 1 if received else 0), None
+        return None, None
+
+    def upload(self, path, name, folder_id, mimetype='video/mp4', chunk_size=DEFAULT_CHUNK_SIZE,
+               progress=None, state_path=None, retries=3):
+        """
+        Chunked, resumable upload of a file into a folder; returns the file resource (id, webViewLink)
+        The session URI and offset are saved after every chunk (state_path, by
+        default next to the file), so an interrupted upload picks up where it
+        left off, in this run or the next one.
+        progress(bytes_sent, total_bytes) is called after every chunk.
+        """
+        import httplib2
+        from googleapiclient.http import MediaFileUpload
+
+        path = Path(path)
+        state_path = Path(state_path) if state_path else upload_state_path(path)
+
+        media = MediaFileUpload(str(path), mimetype=mimetype, chunksize=chunk_size, resumable=True)
+        request = self.service.files().create(
+            body={'name': name, 'parents': [folder_id]},
+            media_body=media,
+            fields='id, webViewLink'
+        )
+        total = media.size()
+
+        # Continue a session left behind by an earlier attempt
+        session = load_upload_state(state_path, path, name, folder_id)
+        if session:
+            offset, response = self.session_offset(session['session_uri'], total)
+            if response is not None:
+                clear_upload_state(state_path)
+                return response
+            if offset is not None:
+                request.resumable_uri = session['session_uri']
+                request.resumable_progress = offset
+                print(f"  Resuming upload of {name} at {offset / total:.0%}")
+
+        response = None
+        failures = 0
+        while response is None:
+            try:
+                _, response = request.next_chunk(http=self.http(), num_retries=retries)
+            except (OSError, httplib2.HttpLib2Error):
+                # Network blip: the next call re-syncs the offset with Drive
+                failures += 1
+                if failures > retries:
+                    raise
+                time.sleep(2 ** failures)
+                continue
+
+            failures = 0
+            if response is None:
+                save_upload_state(state_path, path, name, folder_id,
+                                  request.resumable_uri, request.resumable_progress)
+            if progress:
+                progress(total if response is not None else request.resumable_progress, total)
+
+        clear_upload_state(state_path)
+        return response
+
+
+class UploadQueue:
+    """
+    Uploads videos in background threads, at most `workers` at a time
+    upload(video_file, sku, **options) returns a file id, or None if the upload failed.
+    Results are dicts with 'sku', 'status' ('uploaded' or 'failed'),
+    'file_id', 'seconds' and, on failure, 'error'.
+    """
+
+    def __init__(self, upload, workers=2):
+        self.upload = upload
+        self._pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='upload')
+        self._futures = []
+
+    def submit(self, sku, video_file, **options):
+        """Queue a finished video for upload and return immediately; options go to upload"""
+        future = self._pool.submit(self._run, sku, video_file, options)
+        self._futures.append(future)
+        return future
+
+    def _run(self, sku, video_file, options):
+        """Upload one video, turning failures into a result dict"""
+        start = time.perf_counter()
+        try:
+            file_id = self.upload(video_file, sku, **options)
+            error = None if file_id else 'upload failed'
+        except Exception as e:
+            file_id = None
+            error = f"{type(e).__name__}: {e}"
+
+        result = {
+            'sku': sku,
+            'status': 'uploaded' if file_id else 'failed',
+            'file_id': file_id,
+            'seconds': round(time.perf_counter() - start, 2)
+        }
+        if error:
+            result['error'] = error
+        return result
+
+    def results(self):
+        """Wait for every queued upload, yielding results as they finish"""
+        futures, self._futures = self._futures, []
+        for future in as_completed(futures):
+            yield future.result()
+
+    def close(self):
+        """Wait for outstanding uploads and stop the threads"""
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -12,10 +12,84 @@ from pathlib import Path
 import json
 import random
 from datetime import datetime
+from itertools import chain
+from functools import lru_cache, partial
+from encoder import FFmpegWriter, held_frames, render_segments
+from fades import Fader, fade_gains
+from image_cache import default_cache
+from metrics import RenderMetrics, count, recording, stage, timed_frames
+from decode import imread_for_size
+from overlays import SpriteBuilder, scaled
+from preview import PREVIEW_FPS, PREVIEW_PRESET, PREVIEW_SCALE, PREVIEW_SUFFIX, preview_size
+from remote_images import default_fetcher, is_remote
+from storyboard import StoryboardTap
+
+@lru_cache(maxsize=32)
+def title_overlay_sprite(title, artist, w, h, scale=1.0):
+    """
+    Rasterize the intro title overlay once
+    scale: render scale relative to 1080p
+    """
+    sprite = SpriteBuilder(w, h)
+
+    # Create semi-transparent background for text
+    sprite.rectangle((scaled(50, scale), h-scaled(200, scale)),
+                     (w-scaled(50, scale), h-scaled(50, scale)), (0, 0, 0), 0.3)
+
+    # Add text
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    thickness = scaled(2, scale)
+
+    # Title
+    sprite.text(title[:50], (scaled(70, scale), h-scaled(140, scale)), font, 1.2 * scale,
+                (255, 255, 255), thickness)
+
+    # Artist
+    sprite.text(f"by {artist}", (scaled(70, scale), h-scaled(90, scale)), font, 0.8 * scale,
+                (200, 200, 200), thickness)
+
+    return sprite.build()
+
+
+@lru_cache(maxsize=32)
+def cta_overlay_sprite(price, w, h, scale=1.0):
+    """
+    Rasterize the outro call-to-action overlay once
+    scale: render scale relative to 1080p
+    """
+    sprite = SpriteBuilder(w, h)
+
+    # Background box
+    sprite.rectangle((w//4, h//3), (3*w//4, 2*h//3), (0, 0, 0), 0.5)
+
+    font = cv2.FONT_HERSHEY_SIMPLEX
+
+    # CTA Text
+    texts = [
+        "AVAILABLE NOW",
+        f"${price}",
+        "Gauntlet Gallery",
+        "Authenticated & Ready to Ship"
+    ]
+
+    thickness = scaled(2, scale)
+    y_offset = h//3 + scaled(80, scale)
+    for text in texts:
+        text_size = cv2.getTextSize(text, font, scale, thickness)[0]
+        text_x = (w - text_size[0]) // 2
+        sprite.text(text, (text_x, y_offset), font, scale, (255, 255, 255), thickness)
+        y_offset += scaled(60, scale)
+
+    return sprite.build()
+
 
 class ArtworkVideoGenerator:
-    def __init__(self, output_dir="videos"):
-        """Initialize video generator"""
+    def __init__(self, output_dir="videos", preview=False):
+        """
+        Initialize video generator
+        preview: render a quick low-resolution proxy (see preview.py) with the
+        same timing and overlay layout, and no poster or storyboard
+        """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
 
@@ -24,6 +98,15 @@ class ArtworkVideoGenerator:
         self.duration = 30  # seconds
         self.width = 1920
         self.height = 1080
+        self.preset = 'medium'
+        self.overlay_scale = 1.0  # relative to 1080p
+
+        self.preview = preview
+        if preview:
+            self.fps = PREVIEW_FPS
+            self.width, self.height = preview_size((self.width, self.height))
+            self.preset = PREVIEW_PRESET
+            self.overlay_scale = PREVIEW_SCALE
 
         # Effects library
         self.transitions = [
@@ -35,72 +118,115 @@ class ArtworkVideoGenerator:
             'ambient', 'classical', 'modern', 'upbeat', 'dramatic'
         ]
 
-    def create_video_from_artwork(self, image_path, artwork_data):
-        """Create a cinematic video from artwork image"""
+        # Main sequence: effects and their durations (seconds)
+        self.main_segments = [
+            ('ken_burns', 6),
+            ('zoom_detail_topleft', 4),
+            ('zoom_detail_center', 4),
+            ('zoom_detail_bottomright', 4),
+            ('pan_horizontal', 3),
+            ('rotate_slow', 3)
+        ]
+
+    def create_video_from_artwork(self, image_path, artwork_data, segment_jobs=1, job_id=None):
+        """
+        Create a cinematic video from artwork image
+        The returned metadata includes per-stage timings under 'metrics'. The
+        thumbnail, poster and scrubbing storyboard are taken from the frames
+        as they are encoded.
+        job_id: unique id to name the video by instead of the current time
+        (renders started within the same second would share a file name)
+        """
+        metrics = RenderMetrics(artwork_data.get('sku'))
+
         try:
-            # Load image
-            img = cv2.imread(image_path)
-            if img is None:
-                img = self.create_from_url(artwork_data.get('imageUrl'))
+            with recording(metrics):
+                # Load image as a video-sized canvas (cached across renders)
+                img = self.load_canvas(image_path) if image_path else None
+                if img is None:
+                    img = self.create_from_url(artwork_data.get('imageUrl'))
 
             # Generate unique video ID
-            video_id = f"{artwork_data.get('sku', 'ART')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            video_id = f"{artwork_data.get('sku', 'ART')}_{job_id or datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            if self.preview:
+                video_id += PREVIEW_SUFFIX
             output_path = self.output_dir / f"{video_id}.mp4"
 
+            # Poster frame: the first frame after the intro fade (final renders only)
+            tap = None if self.preview else StoryboardTap(self.fps, poster_frame=self.fps * 3)
+
             # Create video with effects
-            video_data = self.generate_cinematic_video(
-                img,
-                output_path,
-                artwork_data
-            )
+            with recording(metrics):
+                video_data = self.generate_cinematic_video(
+                    img,
+                    output_path,
+                    artwork_data,
+                    segment_jobs=segment_jobs,
+                    tap=tap
+                )
+                stills = tap.write(output_path) if tap else {}
 
             # Add metadata
             video_data.update({
                 'id': video_id,
                 'path': str(output_path),
                 'url': f"/videos/{video_id}.mp4",
-                'thumbnail': self.create_thumbnail(img, video_id),
+                'thumbnail': self.create_thumbnail(tap.poster if tap and tap.poster is not None else img, video_id),
+                'poster': f"/videos/{stills['poster'].name}" if stills else None,
+                'storyboard': f"/videos/{stills['storyboard_vtt'].name}" if stills else None,
                 'created': datetime.now().isoformat(),
                 'artwork_sku': artwork_data.get('sku'),
-                'google_drive_url': f"https://drive.google.com/file/d/{video_id}/view"
+                'google_drive_url': f"https://drive.google.com/file/d/{video_id}/view",
+                'metrics': metrics.report()
             })
 
             return video_data
 
         except Exception as e:
             print(f"Error creating video: {e}")
-            return self.get_fallback_video_data(artwork_data)
+            return dict(self.get_fallback_video_data(artwork_data), error=f"{type(e).__name__}: {e}")
 
-    def generate_cinematic_video(self, img, output_path, artwork_data):
-        """Generate cinematic video with effects"""
-
-        # Initialize video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(str(output_path), fourcc, self.fps, (self.width, self.height))
+    def generate_cinematic_video(self, img, output_path, artwork_data, segment_jobs=1, tap=None):
+        """
+        Generate cinematic video with effects
+        segment_jobs: render intro, each main effect and outro in their own
+        processes and join them losslessly when > 1
+        tap: StoryboardTap shown every frame on its way to the encoder (serial
+        renders only; segment-parallel frames stay in the worker processes)
+        """
 
         # Prepare frames
         total_frames = self.fps * self.duration
 
         # Resize and prepare base image
-        base_img = self.resize_and_pad(img)
-
-        # Generate intro (3 seconds)
-        intro_frames = self.create_intro(base_img, artwork_data)
-
-        # Generate main sequence with effects (24 seconds)
-        main_frames = self.create_main_sequence(base_img, artwork_data)
-
-        # Generate outro (3 seconds)
-        outro_frames = self.create_outro(base_img, artwork_data)
-
-        # Write all frames
-        for frame in intro_frames + main_frames + outro_frames:
-            out.write(frame)
+        with stage('normalize'):
+            base_img = self.resize_and_pad(img)
+
+        if segment_jobs > 1:
+            # Encode each segment in its own process, then concat without re-encoding
+            render_segments(
+                partial(self.render_segment, img=base_img, artwork_data=artwork_data),
+                self.get_segments(), output_path, self.fps, (self.width, self.height),
+                jobs=segment_jobs, preset=self.preset
+            )
+        else:
+            # Stream intro (3 seconds), main sequence with effects (24 seconds)
+            # and outro (3 seconds) straight to a single-pass H.264 encoder
+            with FFmpegWriter(output_path, self.fps, (self.width, self.height), preset=self.preset) as out:
+                frames = chain(
+                    self.create_intro(base_img, artwork_data),
+                    self.create_main_sequence(base_img, artwork_data),
+                    self.create_outro(base_img, artwork_data)
+                )
+                frames = timed_frames(frames, 'effect')
+                for frame in (tap.tap(frames) if tap else frames):
+                    out.write(frame)
 
-        out.release()
+        count('bytes_written', Path(output_path).stat().st_size)
 
         # Add audio track
-        self.add_audio_track(output_path, artwork_data)
+        with stage('transcode'):
+            self.add_audio_track(output_path, artwork_data)
 
         return {
             'duration': f"{self.duration} seconds",
@@ -111,18 +237,37 @@ class ArtworkVideoGenerator:
             'format': 'MP4 H.264'
         }
 
+    def get_segments(self):
+        """Timeline as independently renderable (name, duration) segments"""
+        return [('intro', 3)] + list(self.main_segments) + [('outro', 3)]
+
+    def render_segment(self, segment, img, artwork_data):
+        """Yield the frames of one segment from get_segments()"""
+        name, duration = segment
+
+        if name == 'intro':
+            frames = self.create_intro(img, artwork_data)
+        elif name == 'outro':
+            frames = self.create_outro(img, artwork_data)
+        else:
+            frames = self.apply_effect(img, name, duration)
+
+        return timed_frames(frames, 'effect')
+
     def create_intro(self, img, artwork_data):
-        """Create intro sequence with title overlay"""
-        frames = []
+        """
+        Create intro sequence with title overlay (yields frames)
+        Frames are reused buffers: copy one to keep it past the next frame
+        """
         intro_duration = 3  # seconds
         total_intro_frames = self.fps * intro_duration
 
-        for i in range(total_intro_frames):
-            frame = img.copy()
+        # Fade in effect (1.5 second fade, then hold at full brightness)
+        gains = fade_gains(total_intro_frames, self.fps * 1.5, 'in')
+        fader = Fader(img)
 
-            # Fade in effect
-            alpha = i / (self.fps * 1.5)  # 1.5 second fade
-            frame = cv2.addWeighted(frame, alpha, np.zeros_like(frame), 1-alpha, 0)
+        for i, gain in enumerate(gains):
+            frame = fader.frame(gain)
 
             # Add title overlay after fade
             if i > self.fps * 1.5:
@@ -132,46 +277,26 @@ class ArtworkVideoGenerator:
                     artwork_data.get('artist', 'Artist')
                 )
 
-            frames.append(frame)
-
-        return frames
+            yield frame
 
     def create_main_sequence(self, img, artwork_data):
-        """Create main sequence with Ken Burns and other effects"""
-        frames = []
-        main_duration = 24  # seconds
-
-        # Split into segments for different effects
-        segments = [
-            ('ken_burns', 6),
-            ('zoom_detail_topleft', 4),
-            ('zoom_detail_center', 4),
-            ('zoom_detail_bottomright', 4),
-            ('pan_horizontal', 3),
-            ('rotate_slow', 3)
-        ]
-
-        for effect, duration in segments:
-            segment_frames = self.apply_effect(img, effect, duration)
-            frames.extend(segment_frames)
-
-        return frames
+        """Create main sequence with Ken Burns and other effects (yields frames)"""
+        # Split into segments for different effects (24 seconds)
+        for effect, duration in self.main_segments:
+            yield from self.apply_effect(img, effect, duration)
 
     def create_outro(self, img, artwork_data):
-        """Create outro with call to action"""
-        frames = []
+        """
+        Create outro with call to action (yields frames)
+        Frames are reused buffers: copy one to keep it past the next frame
+        """
         outro_duration = 3
         total_outro_frames = self.fps * outro_duration
 
-        for i in range(total_outro_frames):
-            frame = img.copy()
-
-            # Fade out effect
-            alpha = 1 - (i / (self.fps * 2))  # 2 second fade
-            if alpha < 0:
-                alpha = 0
-            frame = cv2.addWeighted(frame, alpha, np.zeros_like(frame), 1-alpha, 0)
+        # Fade out effect (2 second fade, then hold on black)
+        gains = fade_gains(total_outro_frames, self.fps * 2, 'out')
 
+        for frame in Fader(img).frames(gains):
             # Add CTA overlay
             frame = self.add_cta_overlay(
                 frame,
@@ -179,13 +304,10 @@ class ArtworkVideoGenerator:
                 artwork_data.get('artist', '')
             )
 
-            frames.append(frame)
-
-        return frames
+            yield frame
 
     def apply_effect(self, img, effect_name, duration):
-        """Apply specific effect to image"""
-        frames = []
+        """Apply specific effect to image (yields frames)"""
         total_frames = self.fps * duration
         h, w = img.shape[:2]
 
@@ -211,7 +333,7 @@ class ArtworkVideoGenerator:
                 if frame.shape[:2] != (self.height, self.width):
                     frame = cv2.resize(frame, (self.width, self.height))
 
-                frames.append(frame)
+                yield frame
 
         elif effect_name == 'zoom_detail_topleft':
             # Zoom into top-left corner
@@ -225,7 +347,7 @@ class ArtworkVideoGenerator:
 
                 cropped = img[y1:y2, x1:x2]
                 frame = cv2.resize(cropped, (self.width, self.height))
-                frames.append(frame)
+                yield frame
 
         elif effect_name == 'zoom_detail_center':
             # Zoom into center
@@ -241,23 +363,25 @@ class ArtworkVideoGenerator:
 
                 cropped = img[y1:y2, x1:x2]
                 frame = cv2.resize(cropped, (self.width, self.height))
-                frames.append(frame)
+                yield frame
 
         elif effect_name == 'pan_horizontal':
             # Pan across the image
+            pan_range = w - self.width
+            if pan_range <= 0:
+                # Nothing to pan across: a static hold
+                yield from held_frames(cv2.resize(img, (self.width, self.height)), total_frames)
+                return
+
             for i in range(total_frames):
                 progress = i / total_frames
 
                 # Calculate pan position
-                pan_range = w - self.width
-                if pan_range > 0:
-                    x_offset = int(pan_range * progress)
-                    frame = img[:, x_offset:x_offset+self.width]
-                else:
-                    frame = img.copy()
+                x_offset = int(pan_range * progress)
+                frame = img[:, x_offset:x_offset+self.width]
 
                 frame = cv2.resize(frame, (self.width, self.height))
-                frames.append(frame)
+                yield frame
 
         elif effect_name == 'rotate_slow':
             # Slow rotation effect
@@ -272,65 +396,39 @@ class ArtworkVideoGenerator:
                 # Rotate
                 rotated = cv2.warpAffine(img, M, (w, h))
                 frame = cv2.resize(rotated, (self.width, self.height))
-                frames.append(frame)
+                yield frame
         else:
             # Default: static image
-            for i in range(total_frames):
-                frame = cv2.resize(img, (self.width, self.height))
-                frames.append(frame)
-
-        return frames
+            yield from held_frames(cv2.resize(img, (self.width, self.height)), total_frames)
 
     def add_title_overlay(self, frame, title, artist):
-        """Add title text overlay to frame"""
-        overlay = frame.copy()
+        """Add title text overlay to frame (blended in place from a cached sprite)"""
         h, w = frame.shape[:2]
-
-        # Create semi-transparent background for text
-        cv2.rectangle(overlay, (50, h-200), (w-50, h-50), (0, 0, 0), -1)
-        frame = cv2.addWeighted(frame, 0.7, overlay, 0.3, 0)
-
-        # Add text
-        font = cv2.FONT_HERSHEY_SIMPLEX
-
-        # Title
-        cv2.putText(frame, title[:50], (70, h-140),
-                   font, 1.2, (255, 255, 255), 2, cv2.LINE_AA)
-
-        # Artist
-        cv2.putText(frame, f"by {artist}", (70, h-90),
-                   font, 0.8, (200, 200, 200), 2, cv2.LINE_AA)
-
-        return frame
+        with stage('overlay'):
+            return title_overlay_sprite(title, artist, w, h, self.overlay_scale).apply(frame)
 
     def add_cta_overlay(self, frame, price, artist):
-        """Add call-to-action overlay"""
+        """Add call-to-action overlay (blended in place from a cached sprite)"""
         h, w = frame.shape[:2]
-        overlay = frame.copy()
-
-        # Background box
-        cv2.rectangle(overlay, (w//4, h//3), (3*w//4, 2*h//3), (0, 0, 0), -1)
-        frame = cv2.addWeighted(frame, 0.5, overlay, 0.5, 0)
-
-        font = cv2.FONT_HERSHEY_SIMPLEX
-
-        # CTA Text
-        texts = [
-            "AVAILABLE NOW",
-            f"${price}",
-            "Gauntlet Gallery",
-            "Authenticated & Ready to Ship"
-        ]
-
-        y_offset = h//3 + 80
-        for text in texts:
-            text_size = cv2.getTextSize(text, font, 1, 2)[0]
-            text_x = (w - text_size[0]) // 2
-            cv2.putText(frame, text, (text_x, y_offset),
-                       font, 1, (255, 255, 255), 2, cv2.LINE_AA)
-            y_offset += 60
-
-        return frame
+        with stage('overlay'):
+            return cta_overlay_sprite(price, w, h, self.overlay_scale).apply(frame)
+
+    def load_canvas(self, image_path):
+        """Decoded, letterboxed canvas for an image file, from the shared image cache"""
+        return default_cache().get(image_path, (self.width, self.height), self.decode_canvas)
+
+    def decode_canvas(self, image_path):
+        """
+        Decode an image file and letterbox it to video dimensions
+        Sources much larger than the video decode at a reduced size straight away
+        """
+        with stage('decode'):
+            img = imread_for_size(image_path, (self.width, self.height))
+        if img is None:
+            return None
+
+        with stage('normalize'):
+            return self.resize_and_pad(img)
 
     def resize_and_pad(self, img):
         """Resize image to video dimensions with padding if needed"""
@@ -357,7 +455,7 @@ class ArtworkVideoGenerator:
         return canvas
 
     def create_thumbnail(self, img, video_id):
-        """Create video thumbnail"""
+        """Create video thumbnail from a frame (the poster) or the source canvas"""
         thumbnail_path = self.output_dir / f"{video_id}_thumb.jpg"
 
         # Resize to thumbnail size
@@ -452,8 +550,16 @@ class ArtworkVideoGenerator:
         }
 
     def create_from_url(self, image_url):
-        """Create image from URL or base64 data"""
-        if image_url.startswith('data:image'):
+        """
+        Create image from URL or base64 data
+        http(s) images are downloaded once into the shared download cache and
+        come back as a video-sized canvas, like local files.
+        """
+        if is_remote(image_url):
+            with stage('download'):
+                path = default_fetcher().fetch(image_url)
+            return self.load_canvas(path)
+        elif image_url.startswith('data:image'):
             # Handle base64 image
             import base64
             from io import BytesIO